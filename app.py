@@ -9,12 +9,33 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import folium
-from folium.plugins import FastMarkerCluster, MiniMap, Fullscreen, MeasureControl
+from folium.plugins import MiniMap, Fullscreen, MeasureControl
+from folium.utilities import JsCode
+from branca.colormap import StepColormap
+from branca.utilities import color_brewer
+import branca.colormap
+import streamlit_folium
 from streamlit_folium import st_folium
 import plotly.express as px
 import plotly.graph_objects as go
 from pathlib import Path
+from collections import OrderedDict
+from functools import partial
+import hashlib
 import json
+import logging
+
+from schoolzone import (
+    bitmap, build, cities, counterfactual, cube, geometry, hotspots, images, models, optimize, profiling, scoring,
+    similarity, spatial, warmup,
+)
+from schoolzone.config import FACILITY_COLS, GRADE_COLORS, GRADE_LABELS
+from schoolzone.store import read_table
+
+# 실행 계측 (opt-in: SCHOOLZONE_PROFILE=1 또는 ?profile=1 — 사이드바 워터폴, =log 면 구조화 로그도)
+profiling.start(profiling.resolve_mode(st.query_params.to_dict()))
+cache_data = profiling.cached(st.cache_data)
+cache_resource = profiling.cached(st.cache_resource)
 
 # ──────────────────────────────────────────────
 # 1. Page Config & Custom CSS
@@ -102,29 +123,15 @@ section[data-testid="stSidebar"] .stCheckbox label span { font-size: 14px !impor
 BASE_DIR = Path(__file__).resolve().parent
 DATA_DIR = BASE_DIR / "data"
 
-GRADE_COLORS = {"A": "#27AE60", "B": "#F1C40F", "C": "#E67E22", "D": "#E74C3C"}
-GRADE_LABELS = {"A": "A (우수)", "B": "B (양호)", "C": "C (보통)", "D": "D (주의)"}
-
-CITY_CONFIG = {
-    "성남시": {
-        "center": [37.42, 127.13],
-        "zoom": 12,
-        "geojson": "성남시_행정동_경계.geojson",
-        "population": "연령별인구_성남시_행정동.csv",
-    },
-    "광명시": {
-        "center": [37.445, 126.870],
-        "zoom": 13,
-        "geojson": "광명시_행정동_경계.geojson",
-        "population": "광명시_인구_행정동.csv",
-    },
-}
-
-FACILITY_COLS = [
-    "도로적색표면", "신호등", "횡단보도", "도로안전표지",
-    "생활안전CCTV", "무인교통단속카메라",
-    "보호구역표지판", "옐로카펫", "무단횡단방지펜스",
-]
+# 도시 설정은 data/cities/*.json 매니페스트 (schoolzone.cities) — 도시 추가는 파일 하나로
+CITY_CONFIG = cities.load_registry()
+# 도시별 로더 캐시 상한 — 도시 프레임 LRU 와 같은 도시 수 (내려간 도시의 색인·텐서가 남지 않게)
+CITY_ENTRIES = cities.CITY_CACHE_MAX_CITIES
+# 반경 재집계 캐시 상한 — 슬라이더 19단계마다 도시 프레임·색인·큐브·텐서가 쌓이지 않게 최근 반경만
+# (반경별 키가 섞이는 색인·큐브·텐서 로더는 CITY_ENTRIES + RADIUS_ENTRIES: 도시별 기본 + 최근 반경)
+RADIUS_ENTRIES = 8
+# 배치 최적화에 한 번에 넣는 도시 수 상한 — 한 번의 실행이 도시 LRU 를 비우지 않게 절반까지만
+OPT_MAX_CITIES = max(1, CITY_ENTRIES // 2)
 
 PLOTLY_LAYOUT = dict(
     font=dict(family="Noto Sans KR, sans-serif"),
@@ -133,221 +140,247 @@ PLOTLY_LAYOUT = dict(
     title_font=dict(size=18, color="#2C3E50"),
 )
 
+# Plotly 차트 출력 — 계측이 켜지면 차트별 시간·JSON 바이트 기록
+plotly_chart = profiling.traced(
+    st.plotly_chart, kind="chart",
+    name=lambda fig, *a, **k: f"plotly · {fig.layout.title.text or '(제목 없음)'}",
+    payload=lambda _, fig, *a, **k: len(fig.to_json()),
+)
+
 # ──────────────────────────────────────────────
 # 3. Data Loading (cached)
 # ──────────────────────────────────────────────
+# 모든 CSV는 schoolzone.store 의 Parquet 캐시를 거쳐 읽는다.
+# 지도 오버레이용 포인트 레이어는 좌표 컬럼만 projection.
+_LATLON = ["위도", "경도"]
 
-@st.cache_data
+@cache_data
 def load_data():
-    return pd.read_csv(DATA_DIR / "스쿨존_팀통합_최종.csv", encoding="utf-8-sig")
+    return read_table("스쿨존_팀통합_최종.csv")
 
 
-@st.cache_data
-def load_guardhouses():
-    return pd.read_csv(DATA_DIR / "아동안전지킴이집_성남시.csv", encoding="utf-8-sig")
+@cache_data
+def load_points(name, name_col=None):
+    """오버레이 포인트 파일 (좌표 + 이름 컬럼만)"""
+    return read_table(name, columns=_LATLON + ([name_col] if name_col else []))
 
 
-@st.cache_data
-def load_accidents():
-    return pd.read_csv(DATA_DIR / "사고다발지_성남시.csv", encoding="utf-8-sig")
+@cache_data(max_entries=CITY_ENTRIES)
+def load_city_population(city):
+    name = CITY_CONFIG[city].get("population")
+    if name and (DATA_DIR / name).exists():
+        return read_table(name)
+    return pd.DataFrame()
 
 
-@st.cache_data
-def load_cctv():
-    return pd.read_csv(DATA_DIR / "생활안전CCTV_정제.csv", encoding="utf-8-sig")
+@cache_data
+def load_city_geojson(city, zoom=12):
+    # 줌 단계별 단순화본 (공유 경계 보존) — 원본 대비 1/6~1/10 크기
+    name = CITY_CONFIG[city].get("geojson")
+    if name and (DATA_DIR / name).exists():
+        return geometry.load_simplified(name, zoom)
+    return None
 
 
-@st.cache_data
-def load_cameras():
-    return pd.read_csv(DATA_DIR / "무인교통단속카메라_정제.csv", encoding="utf-8-sig")
+@cache_data
+def load_national_stats():
+    return read_table("전국_어린이보호구역_5년통계.csv")
 
 
-@st.cache_data
-def load_signs():
-    return pd.read_csv(DATA_DIR / "도로안전표지_정제.csv", encoding="utf-8-sig")
+@cache_data
+def load_traffic(name):
+    return read_table(name)
 
 
-@st.cache_data
-def load_red_surface():
-    return pd.read_csv(DATA_DIR / "도로적색표면_전처리1.csv", encoding="utf-8-sig")
+@cache_data
+def load_2nd_dataset():
+    """2차 모델 학습 데이터 (117개소, structure_risk 포함)"""
+    return read_table("2_DatasetFor2ndData.csv")
 
-@st.cache_data
-def load_traffic_lights():
-    return pd.read_csv(DATA_DIR / "신호등_전처리1.csv", encoding="utf-8-sig")
 
-@st.cache_data
-def load_crosswalks():
-    return pd.read_csv(DATA_DIR / "횡단보도_전처리1.csv", encoding="utf-8-sig")
+@cache_resource
+def train_safety_model():
+    """성남시 V6 안전점수 회귀 (광명 이식 · 반경 재집계 점수용)"""
+    return models.load_or_train(models.train_safety_model, load_data())
 
-@st.cache_data
-def load_zone_signs():
-    return pd.read_csv(DATA_DIR / "보호구역표지판_전처리1.csv", encoding="utf-8-sig")
 
-@st.cache_data
-def load_yellow_carpet():
-    return pd.read_csv(DATA_DIR / "옐로카펫_전처리1.csv", encoding="utf-8-sig")
+@cache_resource
+def train_integrated_model():
+    """2차 통합 모델: 구조위험 + 시설 + 어린이비율 → 사고 발생 여부 (이진 분류, 개선)"""
+    return models.load_or_train(models.train_integrated_model, load_2nd_dataset())
 
-@st.cache_data
-def load_fences():
-    return pd.read_csv(DATA_DIR / "무단횡단방지펜스_전처리1.csv", encoding="utf-8-sig")
 
+@profiling.traced
+def city_frame(city):
+    """도시 점수 프레임 — 처음 선택될 때 그 도시 샤드만 로드, 프로세스 공유 LRU (schoolzone.cities)"""
+    return cities.city_frame(city, CITY_CONFIG)
 
-@st.cache_data
-def load_population():
-    return pd.read_csv(DATA_DIR / "연령별인구_성남시_행정동.csv", encoding="utf-8-sig")
 
+@cache_resource
+def load_build_meta():
+    """모델 지표·등급 기준 (빌드 메타) — 프로세스당 한 번"""
+    return build.load_meta() or build.load_or_build()[1]
 
-@st.cache_data
-def load_geojson():
-    with open(DATA_DIR / "성남시_행정동_경계.geojson", encoding="utf-8") as f:
-        return json.load(f)
 
+@cache_data(max_entries=512)
+def load_roadview(path, size="card"):
+    # 슬롯 크기(thumb/card/full) WebP 파생본 bytes — 인코딩된 bytes 를 메모리에 보관
+    return images.derivative_bytes(path, size)
 
-@st.cache_data
-def load_national_stats():
-    return pd.read_csv(DATA_DIR / "전국_어린이보호구역_5년통계.csv", encoding="utf-8-sig")
 
+@cache_resource(max_entries=CITY_ENTRIES)
+def load_roadview_index(city):
+    """(도시, 시설물명) → {방향: 원본 경로} — 이름 정규화·매칭은 도시당 한 번만"""
+    folder = CITY_CONFIG[city].get("roadview")
+    if not folder:
+        return {}
+    return images.build_roadview_index({city: city_frame(city)}, {city: DATA_DIR / folder})
 
-@st.cache_data
-def load_traffic():
-    return pd.read_csv(DATA_DIR / "교통량_성남인근_등하교시간대.csv", encoding="utf-8-sig")
 
+def roadview_image(city, name, size="card", direction=images.DEFAULT_DIRECTION):
+    """시설 로드뷰 파생본 bytes, 이미지가 없는 시설이면 None"""
+    path = load_roadview_index(city).get((city, name), {}).get(direction)
+    return load_roadview(str(path), size) if path else None
 
-@st.cache_data
-def load_cv_features():
-    return pd.read_csv(DATA_DIR / "커스텀비전_시설물별.csv", encoding="utf-8-sig")
 
+@cache_resource(max_entries=CITY_ENTRIES)
+def load_cv_neighbors(city):
+    """도시별 CV 유사 학교 top-k 표 — 점수 아티팩트당 한 번 생성"""
+    return similarity.build_neighbor_table(city_frame(city))
 
-@st.cache_data
-def load_gwangmyung():
-    _gm = pd.read_csv(DATA_DIR / "광명_스쿨존.csv", encoding="utf-8-sig")
-    for _fc in FACILITY_COLS:
-        if _fc not in _gm.columns:
-            _gm[_fc] = 0
-    if "구" not in _gm.columns:
-        _gm["구"] = "광명시"
-    if "시설유형" not in _gm.columns:
-        _gm["시설유형"] = "초등학교"
-    return _gm
 
+@cache_resource(max_entries=CITY_ENTRIES + RADIUS_ENTRIES)
+def load_counterfactuals(city, recount_radius=None):
+    """도시별 학교 × 시설 × +0..+k 사고확률 텐서 → (텐서, 시설 목록, 학교명 목록) — 모델 버전별 디스크 캐시"""
+    if recount_radius:
+        frame, tag = rescore_city(city, recount_radius), f"{city}.r{recount_radius}"
+    else:
+        frame, tag = city_frame(city), city
+    model, feats = train_integrated_model()[:2]
+    tensor, cols = counterfactual.load_sweep(frame, model, feats, tag=tag)
+    return tensor, cols, frame["시설물명"].tolist()
 
-@st.cache_data
-def load_gm_geojson():
-    path = DATA_DIR / "광명시_행정동_경계.geojson"
-    if path.exists():
-        with open(path, encoding="utf-8") as f:
-            return json.load(f)
-    return None
 
+@cache_resource(max_entries=CITY_ENTRIES)
+def load_facility_index(city):
+    """도시 매니페스트 recount_layers 포인트 BallTree — 도시당 한 번 생성"""
+    return spatial.build_facility_index(CITY_CONFIG[city]["recount_layers"])
 
-@st.cache_data
-def load_gm_population():
-    path = DATA_DIR / "광명시_인구_행정동.csv"
-    if path.exists():
-        return pd.read_csv(path, encoding="utf-8-sig")
-    return pd.DataFrame()
 
+@cache_data(max_entries=CITY_ENTRIES + RADIUS_ENTRIES)
+def load_cube(city, recount_radius=None):
+    """도시 (구 × 시설유형 × 등급) 집계 큐브 — 필터 조합별 KPI·통계는 셀 합산으로 답함"""
+    return cube.build_cube(rescore_city(city, recount_radius) if recount_radius else city_frame(city))
 
-@st.cache_data
-def load_accident_images():
-    return pd.read_csv(DATA_DIR / "accidentlevel_addData.csv", encoding="utf-8-sig")
 
+@cache_resource(max_entries=CITY_ENTRIES)
+def load_hotspots(city):
+    """사고다발지 폴리곤 저장소 (GeoJSON 파싱·경계상자는 원본 해시별 디스크 캐시)"""
+    return hotspots.load_store(CITY_CONFIG[city]["hotspots"])
 
-@st.cache_data
-def load_improved_scores():
-    """개선 2차 모델 결과 (SMOTE + Calibration + 상호작용 피처)"""
-    return pd.read_csv(DATA_DIR / "3_final_scoring_results_improved.csv", encoding="utf-8-sig")
 
+@cache_data(max_entries=CITY_ENTRIES)
+def hotspot_exposure(city, radius_m=hotspots.DEFAULT_RADIUS_M):
+    """학교별 사고다발지 노출 (포함 · 반경 내 수 · 발생/사상 합 · 최근접 거리) — 도시 전체 한 번의 조인"""
+    base = city_frame(city)
+    return hotspots.exposure(load_hotspots(city), base["위도"], base["경도"], radius_m).set_axis(base.index)
 
-@st.cache_data
-def load_2nd_dataset():
-    """2차 모델 학습 데이터 (117개소, structure_risk 포함)"""
-    return pd.read_csv(DATA_DIR / "2_DatasetFor2ndData.csv", encoding="utf-8-sig")
 
+@cache_resource(max_entries=CITY_ENTRIES)
+def load_hotspot_points(city):
+    """사고다발지 대표점 BallTree (haversine) — 폴리곤 없이 위도·경도·가중치 컬럼만 읽음"""
+    points = read_table(CITY_CONFIG[city]["hotspots"], columns=["위도", "경도"] + hotspots.PROXIMITY_WEIGHTS)
+    return hotspots.build_point_index(points)
+
+
+@cache_data(max_entries=32)
+def hotspot_proximity(city, radius_m):
+    """학교별 반경 radius_m 안 사고다발지 수 · 발생/사상/중상 합 (반경별 메모)"""
+    base = city_frame(city)
+    return hotspots.proximity_features(
+        load_hotspot_points(city), base["위도"], base["경도"], radius_m,
+    ).set_axis(base.index)
+
+
+# 모델 분석 탭 사고다발지 근접 피처 반경 슬라이더 단계 (m)
+HOTSPOT_RADII = list(range(100, 2001, 100))
 
-@st.cache_resource
-def train_safety_model():
-    from sklearn.linear_model import LinearRegression
-    _df = load_data()
-    feat = ["도로적색표면", "신호등", "횡단보도", "도로안전표지",
-            "생활안전CCTV", "무인교통단속카메라",
-            "보호구역표지판", "옐로카펫", "무단횡단방지펜스",
-            "발생건수", "어린이비율"]
-    valid = _df.dropna(subset=feat + ["최종안전점수_V6"])
-    X = valid[feat]
-    y = valid["최종안전점수_V6"]
-    model = LinearRegression().fit(X, y)
-    r2 = model.score(X, y)
-    return model, feat, r2
-
-
-@st.cache_resource
-def train_structure_model():
-    """1단계: 도로 구조 → 사고 부근 여부 (로지스틱 회귀)"""
-    from sklearn.linear_model import LogisticRegression
-    from sklearn.pipeline import Pipeline
-    from sklearn.preprocessing import StandardScaler
-    from sklearn.model_selection import cross_val_score
-
-    img_df = load_accident_images()
-    # accident_label이 데이터에 이미 포함된 경우 사용, 없으면 파일명 기반 추론
-    if "accident_label" not in img_df.columns:
-        img_df["accident_label"] = img_df["image"].str.contains("부근").astype(int)
-    img_df["accident_label"] = img_df["accident_label"].astype(int)
-
-    feat_cols = ["p_wide", "p_barrier_yes", "road_width_relative",
-                 "sidewalk_ratio", "parked_density"]
-    X = img_df[feat_cols].values
-    y = img_df["accident_label"].values
-
-    pipe = Pipeline([
-        ("scaler", StandardScaler()),
-        ("lr", LogisticRegression(max_iter=1000, random_state=42)),
-    ])
-    cv_auc = cross_val_score(pipe, X, y, cv=5, scoring="roc_auc")
-    pipe.fit(X, y)
-
-    # 시설물별 평균 structure_risk
-    img_df["structure_risk"] = pipe.predict_proba(X)[:, 1]
-    facility_risk = img_df.groupby("시설물명")["structure_risk"].mean().reset_index()
-
-    return pipe, float(cv_auc.mean()), facility_risk
-
-
-@st.cache_resource
-def train_integrated_model():
-    """2차 통합 모델: 구조위험 + 시설 + 어린이비율 → 사고 발생 여부 (이진 분류, 개선)"""
-    from sklearn.linear_model import LogisticRegression
-    from sklearn.pipeline import Pipeline as SkPipeline
-    from sklearn.preprocessing import StandardScaler
-    from sklearn.model_selection import cross_val_score
-    from sklearn.calibration import CalibratedClassifierCV
-
-    ds = load_2nd_dataset()
-    ds["accident_label"] = (ds["발생건수"] >= 1).astype(int)
-
-    feat_cols = ["structure_risk"] + FACILITY_COLS + ["어린이 비율(%)"]
-    X = ds[feat_cols].fillna(ds[feat_cols].median())
-    y = ds["accident_label"]
-
-    model = SkPipeline([
-        ("scaler", StandardScaler()),
-        ("lr", LogisticRegression(
-            C=1.0, class_weight="balanced",
-            solver="lbfgs", max_iter=2000, random_state=42,
-        )),
-    ])
-    cv_auc = cross_val_score(model, X, y, cv=5, scoring="roc_auc")
-    model.fit(X, y)
-
-    # 사고 발생 클래스(1) 계수
-    coef_df = pd.DataFrame({
-        "변수": feat_cols,
-        "계수": model.named_steps["lr"].coef_[0],
-    }).sort_values("계수")
-
-    auc_score = round(cv_auc.mean(), 2)
-    return model, feat_cols, auc_score, coef_df
+
+@cache_data(max_entries=CITY_ENTRIES)
+def hotspot_radius_corr(city):
+    """반경별 사고다발지 수 ↔ 실제 발생건수 Pearson r — 도시당 한 번 (반경별 hotspot_proximity 캐시를 밀어내지 않게 직접 계산)"""
+    base = city_frame(city)
+    points = load_hotspot_points(city)
+    return [
+        base["발생건수"].corr(pd.Series(
+            hotspots.proximity_features(points, base["위도"], base["경도"], r)[f"사고다발지_{r}m"].to_numpy(dtype=float),
+            index=base.index,
+        ))
+        for r in HOTSPOT_RADII
+    ]
+
+
+@cache_resource(max_entries=CITY_ENTRIES + RADIUS_ENTRIES)
+def load_filter_index(city, recount_radius=None):
+    """도시 비트맵 필터 색인 (범주 값·시설 개수 구간별 packed 비트맵) — 필터는 비트 연산으로"""
+    return bitmap.build_index(rescore_city(city, recount_radius) if recount_radius else city_frame(city))
+
+
+@cache_data(max_entries=RADIUS_ENTRIES)
+def rescore_city(city, radius_m):
+    """반경 radius_m 안의 시설 수로 도시 전체 재집계 + 점수·등급 재산출"""
+    base = city_frame(city)
+    counts = spatial.count_within(load_facility_index(city), base["위도"], base["경도"], radius_m)
+    safety_model, safety_feats, _ = train_safety_model()
+    integ_model, integ_feats = train_integrated_model()[:2]
+    return scoring.rescore_with_counts(
+        base, counts, safety_model, safety_feats, integ_model, integ_feats,
+        load_build_meta()["grade_thresholds"], radius_m=radius_m,
+    )
+
+
+def warm_tasks():
+    """시작 시 예열할 로더 (이름, 호출) — 공용 데이터셋·모델 + 기본 도시(또는 SCHOOLZONE_WARM_CITIES)의
+    프레임·색인·오버레이. 다른 도시는 처음 선택될 때 로드"""
+    tasks = [
+        ("팀 통합 데이터", load_data), ("2차 데이터셋", load_2nd_dataset), ("전국 5년 통계", load_national_stats),
+        ("안전 모델", train_safety_model), ("통합 모델", train_integrated_model), ("빌드 메타", load_build_meta),
+    ]
+    for city in warmup.warm_cities(CITY_CONFIG):
+        cfg = CITY_CONFIG[city]
+        tasks += [
+            (f"{city} · 프레임", partial(city_frame, city)),
+            (f"{city} · 인구", partial(load_city_population, city)),
+            (f"{city} · 경계", partial(load_city_geojson, city, cfg["zoom"])),
+            (f"{city} · 집계 큐브", partial(load_cube, city)),
+            (f"{city} · 필터 색인", partial(load_filter_index, city)),
+            (f"{city} · 유사 학교", partial(load_cv_neighbors, city)),
+            (f"{city} · 반사실 텐서", partial(load_counterfactuals, city)),
+        ]
+        if cfg.get("traffic"):
+            tasks.append((f"{city} · 교통량", partial(load_traffic, cfg["traffic"])))
+        if cfg.get("roadview"):
+            tasks.append((f"{city} · 로드뷰 색인", partial(load_roadview_index, city)))
+        if cfg.get("recount_layers"):
+            tasks.append((f"{city} · 시설 색인", partial(load_facility_index, city)))
+        if cfg.get("hotspots"):
+            tasks += [
+                (f"{city} · 사고다발지 기하", partial(hotspot_exposure, city)),
+                (f"{city} · 사고다발지 대표점", partial(load_hotspot_points, city)),
+            ]
+        for key, name in cfg.get("overlays", {}).items():
+            tasks.append((f"{city} · {key}", partial(load_points, name, OVERLAY_LAYERS[key][-1])))
+    return tasks
+
+
+@cache_resource
+def warm_start():
+    """프로세스당 한 번 — 로더 전체를 스레드 풀에서 백그라운드 예열 (첫 실행을 막지 않음)"""
+    # 예열 스레드는 세션 밖에서 캐시만 채우므로 "missing ScriptRunContext" 경고는 숨김
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").addFilter(
+        lambda record: not warmup.in_worker()
+    )
+    return warmup.start(warm_tasks())
 
 
 # ──────────────────────────────────────────────
@@ -366,78 +399,128 @@ def find_weakest_facility(row, ref_df):
     return worst
 
 
-def make_popup(row, city="성남시"):
-    """마커 팝업 생성"""
-    grade_key = row["등급"]
-    color = GRADE_COLORS.get(grade_key, "#999")
-    grade_label = GRADE_LABELS.get(grade_key, grade_key)
-
-    # 점수 구조 섹션: 성남시는 가산/감산, 광명시는 모델 추정
-    if city == "광명시":
-        score_section = f"""
-      <table style="font-size:11px;color:#2C3E50;width:100%;border-collapse:collapse;">
-        <tr style="background:#FEF5E7;"><td colspan="2" style="padding:3px 4px;font-weight:600;color:#2C3E50;">모델 추정값</td></tr>
-        <tr><td style="padding:2px 4px;">추정 방식</td><td style="text-align:right;font-size:10px;">성남시 모델 적용</td></tr>
-        <tr style="background:#FEF9E7;"><td style="padding:2px 4px;font-weight:700;">예상 안전점수</td><td style="text-align:right;font-weight:700;">{row['활성_안전점수']:.1f}점</td></tr>
-      </table>"""
-    elif pd.notna(row.get('IM_안전점수')):
-        score_section = f"""
-      <table style="font-size:11px;color:#2C3E50;width:100%;border-collapse:collapse;">
-        <tr style="background:#FEF5E7;"><td colspan="2" style="padding:3px 4px;font-weight:600;color:#2C3E50;">안전점수 (개선 모델)</td></tr>
-        <tr><td style="padding:2px 4px;">사고확률(보정)</td><td style="text-align:right;font-weight:600;">{row.get('사고확률', 0):.1%}</td></tr>
-        <tr style="background:#FEF9E7;"><td style="padding:2px 4px;font-weight:700;">안전점수</td><td style="text-align:right;font-weight:700;">{row['활성_안전점수']:.1f}점</td></tr>
-      </table>"""
-    else:
-        score_section = f"""
-      <table style="font-size:11px;color:#2C3E50;width:100%;border-collapse:collapse;">
-        <tr style="background:#FEF5E7;"><td colspan="2" style="padding:3px 4px;font-weight:600;color:#2C3E50;">점수 구조 (V6)</td></tr>
-        <tr><td style="padding:2px 4px;">가산점(시설)</td><td style="text-align:right;font-weight:600;">{row['가산점_시설_V6']:.1f}점</td></tr>
-        <tr><td style="padding:2px 4px;">가산점(보너스)</td><td style="text-align:right;font-weight:600;">{int(row['가산점_보너스_V6'])}점</td></tr>
-        <tr style="background:#FDEDEC;"><td style="padding:2px 4px;">감산점 합계</td><td style="text-align:right;font-weight:600;color:#E74C3C;">-{row['감산점_합계_V6']:.1f}점</td></tr>
-        <tr><td style="padding:2px 4px;">기본점(50)</td><td style="text-align:right;">50.0점</td></tr>
-        <tr style="background:#FEF9E7;"><td style="padding:2px 4px;font-weight:700;">안전점수</td><td style="text-align:right;font-weight:700;">{row['활성_안전점수']:.1f}점</td></tr>
-      </table>"""
-
-    # CV 도로환경 섹션
-    cv_section = ""
-    if not pd.isna(row.get('CV_도로폭확률')):
-        cv_section = f"""
-      <hr style="margin:6px 0;border:none;border-top:1px solid #FDEBD0;">
-      <table style="font-size:10px;color:#444;width:100%;border-collapse:collapse;">
-        <tr style="background:#FEF9E7;"><td colspan="2" style="padding:3px 4px;font-weight:600;color:#E67E22;">도로환경 (CV)</td></tr>
-        <tr><td style="padding:2px 4px;">넓은도로</td><td style="text-align:right;">{row["CV_도로폭확률"]:.0%}</td></tr>
-        <tr><td style="padding:2px 4px;">분리장치</td><td style="text-align:right;">{row["CV_분리장치확률"]:.0%}</td></tr>
-        <tr><td style="padding:2px 4px;">주정차</td><td style="text-align:right;">{row["CV_주정차밀도"]:.1f}대</td></tr>
-      </table>"""
-
-    acc_count = int(row['발생건수']) if pd.notna(row.get('발생건수')) else 0
-    child_ratio = row['어린이비율'] if pd.notna(row.get('어린이비율')) else 0
+# 학교 마커 — 행마다 CircleMarker + 팝업 HTML 을 만들지 않고, 압축 속성만 담은
+# FeatureCollection 하나를 보내 색·크기·툴팁·팝업을 브라우저 템플릿에서 그림
+SCHOOL_LAYER_JS = """
+function (feature, layer) {
+    const cfg = __CFG__;
+    const p = feature.properties;
+    const fmt = (v, d) => (v === null || v === undefined) ? "-" : v.toFixed(d);
+    const pct = (v, d) => fmt(v * 100, d) + "%";
+    const label = cfg.labels[p.g] || p.g;
+    const sel = p.n === cfg.selected;
+    layer.setStyle({
+        radius: sel ? 14 : (cfg.detail ? (p.t === "초등학교" ? 9 : 6) : 8),
+        color: sel ? "#E74C3C" : "#FFFFFF",
+        weight: sel ? 4 : 2,
+        fillColor: cfg.colors[p.g] || "#999",
+        fillOpacity: sel ? 1.0 : 0.9,
+    });
+    if (!cfg.detail) {
+        layer.bindTooltip(`${p.n} (${p.t}) — ${p.g} (${fmt(p.s, 1)}점)`);
+        return;
+    }
+    layer.bindTooltip(`${p.n} (${label}) ${fmt(p.s, 1)}점 | ${p.t} | 사고 ${p.a}건 | 어린이 ${fmt(p.c, 1)}%`);
+    layer.bindPopup(function () {
+        const head = '<tr style="background:#FEF5E7;"><td colspan="2" style="padding:3px 4px;font-weight:600;color:#2C3E50;">';
+        const cell = '<tr><td style="padding:2px 4px;">';
+        const right = '</td><td style="text-align:right;font-weight:600;">';
+        const total = (name) => `<tr style="background:#FEF9E7;"><td style="padding:2px 4px;font-weight:700;">${name}</td><td style="text-align:right;font-weight:700;">${fmt(p.s, 1)}점</td></tr>`;
+        let score;
+        if (p.est) {
+            score = `${head}모델 추정값</td></tr>${cell}추정 방식</td><td style="text-align:right;font-size:10px;">${p.est}</td></tr>${total("예상 안전점수")}`;
+        } else if (p.im) {
+            score = `${head}안전점수 (개선 모델)</td></tr>${cell}사고확률(보정)${right}${pct(p.pr, 1)}</td></tr>${total("안전점수")}`;
+        } else {
+            score = `${head}점수 구조 (V6)</td></tr>`
+                + `${cell}가산점(시설)${right}${fmt(p.v6[0], 1)}점</td></tr>`
+                + `${cell}가산점(보너스)${right}${fmt(p.v6[1], 0)}점</td></tr>`
+                + `<tr style="background:#FDEDEC;"><td style="padding:2px 4px;">감산점 합계</td><td style="text-align:right;font-weight:600;color:#E74C3C;">-${fmt(p.v6[2], 1)}점</td></tr>`
+                + `${cell}기본점(50)</td><td style="text-align:right;">50.0점</td></tr>${total("안전점수")}`;
+        }
+        const f = p.f;
+        const risk = p.a === 0 ? "안전" : (p.a <= 6 ? "주의" : "위험");
+        const cv = p.cv ? `<hr style="margin:6px 0;border:none;border-top:1px solid #FDEBD0;">
+          <table style="font-size:10px;color:#444;width:100%;border-collapse:collapse;">
+            <tr style="background:#FEF9E7;"><td colspan="2" style="padding:3px 4px;font-weight:600;color:#E67E22;">도로환경 (CV)</td></tr>
+            <tr><td style="padding:2px 4px;">넓은도로</td><td style="text-align:right;">${pct(p.cv[0], 0)}</td></tr>
+            <tr><td style="padding:2px 4px;">분리장치</td><td style="text-align:right;">${pct(p.cv[1], 0)}</td></tr>
+            <tr><td style="padding:2px 4px;">주정차</td><td style="text-align:right;">${fmt(p.cv[2], 1)}대</td></tr>
+          </table>` : "";
+        return `<div style="font-family:'Noto Sans KR',sans-serif;width:260px;padding:4px;">
+          <div style="font-size:15px;font-weight:700;color:#2C3E50;margin-bottom:4px;">
+            ${p.n}<span style="font-size:11px;color:#34495E;font-weight:400;margin-left:4px;">${p.t}</span>
+          </div>
+          <div style="display:inline-block;background:${cfg.colors[p.g] || "#999"};color:#fff;
+               padding:2px 10px;border-radius:20px;font-size:12px;font-weight:500;">${label}</div>
+          <span style="color:#2C3E50;font-size:13px;margin-left:6px;">${fmt(p.s, 1)}점</span>
+          <hr style="margin:8px 0;border:none;border-top:1px solid #F5CBA7;">
+          <table style="font-size:11px;color:#2C3E50;width:100%;border-collapse:collapse;">${score}</table>
+          <hr style="margin:6px 0;border:none;border-top:1px solid #F5CBA7;">
+          <table style="font-size:10px;color:#444;width:100%;border-collapse:collapse;">
+            <tr><td>적색표면 ${f[0]}</td><td>신호등 ${f[1]}</td><td>횡단보도 ${f[2]}</td></tr>
+            <tr><td>안전표지 ${f[3]}</td><td>CCTV ${f[4]}</td><td>카메라 ${f[5]}</td></tr>
+            <tr><td>표지판 ${f[6]}</td><td>옐로카펫 ${f[7]}</td><td>펜스 ${f[8]}</td></tr>
+            <tr><td>발생건수 ${p.a}건 (${risk})</td><td>어린이비율 ${fmt(p.c, 1)}%</td><td>${p.sr === null ? "" : "구조위험 " + pct(p.sr, 0)}</td></tr>
+          </table>${cv}
+        </div>`;
+    }, {maxWidth: 290});
+}
+"""
 
-    return f"""
-    <div style="font-family:'Noto Sans KR',sans-serif;width:260px;padding:4px;">
-      <div style="font-size:15px;font-weight:700;color:#2C3E50;margin-bottom:4px;">
-        {row['시설물명']}
-        <span style="font-size:11px;color:#34495E;font-weight:400;margin-left:4px;">{row['시설유형']}</span>
-      </div>
-      <div style="display:inline-block;background:{color};color:#fff;
-           padding:2px 10px;border-radius:20px;font-size:12px;font-weight:500;">
-        {grade_label}
-      </div>
-      <span style="color:#2C3E50;font-size:13px;margin-left:6px;">
-        {row['활성_안전점수']:.1f}점
-      </span>
-      <hr style="margin:8px 0;border:none;border-top:1px solid #F5CBA7;">
-      {score_section}
-      <hr style="margin:6px 0;border:none;border-top:1px solid #F5CBA7;">
-      <table style="font-size:10px;color:#444;width:100%;border-collapse:collapse;">
-        <tr><td>적색표면 {int(row.get('도로적색표면', 0))}</td><td>신호등 {int(row.get('신호등', 0))}</td><td>횡단보도 {int(row.get('횡단보도', 0))}</td></tr>
-        <tr><td>안전표지 {int(row.get('도로안전표지', 0))}</td><td>CCTV {int(row.get('생활안전CCTV', 0))}</td><td>카메라 {int(row.get('무인교통단속카메라', 0))}</td></tr>
-        <tr><td>표지판 {int(row.get('보호구역표지판', 0))}</td><td>옐로카펫 {int(row.get('옐로카펫', 0))}</td><td>펜스 {int(row.get('무단횡단방지펜스', 0))}</td></tr>
-        <tr><td>발생건수 {acc_count}건 ({"안전" if acc_count == 0 else "주의" if acc_count <= 6 else "위험"})</td><td>어린이비율 {child_ratio:.1f}%</td><td>{f"구조위험 {row.get('structure_risk', 0):.0%}" if pd.notna(row.get('structure_risk')) else ""}</td></tr>
-      </table>
-      {cv_section}
-    </div>
-    """
+
+def _nullable(series, digits):
+    """반올림 후 NaN → None (JSON null)"""
+    return series.round(digits).astype(object).where(series.notna(), None)
+
+
+def school_features(df, city="성남시", detail=True, score_col="활성_안전점수", grade_col="등급"):
+    """학교 마커 FeatureCollection — 팝업 템플릿이 쓰는 값만 짧은 키로 담음"""
+    props = pd.DataFrame({
+        "n": df["시설물명"],
+        "t": df["시설유형"],
+        "g": df[grade_col],
+        "s": df[score_col].round(1),
+    })
+    if detail:
+        col = lambda c: df[c] if c in df.columns else pd.Series(np.nan, index=df.index)
+        radius = col("_재집계반경")
+        if CITY_CONFIG[city]["model_transfer"]:
+            props["est"] = "성남시 모델 적용"
+        else:
+            est = "반경 " + radius.round(0).astype("Int64").astype(str) + "m 재집계"
+            props["est"] = est.astype(object).where(radius.notna(), None)
+        props["im"] = col("IM_안전점수").notna()
+        props["pr"] = _nullable(col("사고확률").fillna(0), 4)
+        props["v6"] = list(zip(
+            _nullable(col("가산점_시설_V6"), 1), _nullable(col("가산점_보너스_V6"), 0), _nullable(col("감산점_합계_V6"), 1)
+        ))
+        props["f"] = df.reindex(columns=FACILITY_COLS).fillna(0).astype(int).values.tolist()
+        props["a"] = col("발생건수").fillna(0).astype(int)
+        props["c"] = col("어린이비율").fillna(0).round(1)
+        props["sr"] = _nullable(col("structure_risk"), 3)
+        cv = df.reindex(columns=["CV_도로폭확률", "CV_분리장치확률", "CV_주정차밀도"]).round(3)
+        props["cv"] = [None if np.isnan(r[0]) else r for r in cv.values.tolist()]
+
+    coords = np.round(df[["경도", "위도"]].to_numpy(dtype=float), 6).tolist()
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {"type": "Feature", "geometry": {"type": "Point", "coordinates": xy}, "properties": p}
+            for xy, p in zip(coords, props.to_dict("records"))
+        ],
+    }
+
+
+def add_school_layer(m, features, selected_school="(전체)", detail=True):
+    """학교 FeatureCollection 을 GeoJson 레이어 하나로 추가 (스타일·툴팁·팝업은 클라이언트)"""
+    cfg = {"colors": GRADE_COLORS, "labels": GRADE_LABELS, "selected": selected_school, "detail": detail}
+    folium.GeoJson(
+        features,
+        name="스쿨존",
+        marker=folium.CircleMarker(radius=6, color="#FFFFFF", weight=2, fill=True, fill_opacity=0.9),
+        on_each_feature=JsCode(SCHOOL_LAYER_JS.replace("__CFG__", json.dumps(cfg, ensure_ascii=False))),
+    ).add_to(m)
 
 
 def create_legend_html():
@@ -475,7 +558,43 @@ def create_legend_html():
     """
 
 
-def create_map(filtered_df, overlay_flags, pop_df, geo, selected_school="(전체)", city="성남시"):
+def add_boundary_layer(m, geo, choropleth_data, fill_opacity=0.25):
+    """어린이 비율 단계구분도와 행정동 구분선을 GeoJSON 한 벌로 그림
+
+    Choropleth + 구분선 GeoJson 두 레이어가 같은 폴리곤을 두 번 싣던 것을 하나로 합침.
+    색 구간은 folium.Choropleth 와 동일 (PuBu, 등간격 6구간, 값 없는 동은 검정).
+    """
+    ratio = choropleth_data.dropna(subset=["어린이_비율"]).set_index("adm_nm")["어린이_비율"].to_dict()
+    edges = np.histogram(list(ratio.values()), bins=6)[1]
+    colormap = StepColormap(
+        color_brewer("PuBu", n=len(edges)), index=edges,
+        vmin=edges[0], vmax=edges[-1], caption="어린이 비율 (%)",
+    )
+
+    def style(feature):
+        value = ratio.get(feature["properties"]["adm_nm"])
+        return {
+            "fillColor": "black" if value is None else colormap(value),
+            "fillOpacity": fill_opacity,
+            "color": "#2C3E50",
+            "weight": 2,
+            "dashArray": "5,3",
+        }
+
+    folium.GeoJson(
+        geo,
+        name="행정동 경계",
+        style_function=style,
+        tooltip=folium.GeoJsonTooltip(
+            fields=["adm_nm"],
+            aliases=["행정동"],
+            style="font-size:12px;font-weight:600;",
+        ),
+    ).add_to(m)
+    colormap.add_to(m)
+
+
+def create_map(filtered_df, pop_df, geo, selected_school="(전체)", city="성남시"):
     cfg = CITY_CONFIG[city]
     center = cfg["center"]
     zoom = cfg["zoom"]
@@ -490,122 +609,15 @@ def create_map(filtered_df, overlay_flags, pop_df, geo, selected_school="(전체
         attr="Google", name="기본 지도", max_zoom=22,
     ).add_to(m)
 
-    # Choropleth — 도시별 분기
-    if geo and geo.get("features"):
-        if city == "성남시":
-            choropleth_data = pop_df[["구명", "동명", "어린이_비율"]].copy()
-            choropleth_data["adm_nm"] = "경기도 성남시" + choropleth_data["구명"] + " " + choropleth_data["동명"]
-        else:
-            choropleth_data = pop_df[["동명", "어린이_비율"]].dropna(subset=["어린이_비율"]).copy()
-            choropleth_data["adm_nm"] = "경기도 광명시 " + choropleth_data["동명"]
-        folium.Choropleth(
-            geo_data=geo,
-            data=choropleth_data,
-            columns=["adm_nm", "어린이_비율"],
-            key_on="feature.properties.adm_nm",
-            fill_color="PuBu",
-            fill_opacity=0.25,
-            line_opacity=0.4,
-            legend_name="어린이 비율 (%)",
-            name="행정동 경계",
-        ).add_to(m)
-
-        # 행정동 경계선 + 동명 라벨 (별도 레이어)
-        folium.GeoJson(
-            geo,
-            name="행정동 구분선",
-            style_function=lambda _: {
-                "fillOpacity": 0,
-                "color": "#2C3E50",
-                "weight": 2,
-                "dashArray": "5,3",
-            },
-            tooltip=folium.GeoJsonTooltip(
-                fields=["adm_nm"],
-                aliases=["행정동"],
-                style="font-size:12px;font-weight:600;",
-            ),
-        ).add_to(m)
-
-    for _, row in filtered_df.iterrows():
-        grade_key = row["등급"]
-        color = GRADE_COLORS.get(grade_key, "#999")
-        grade_label = GRADE_LABELS.get(grade_key, grade_key)
-        is_selected = (selected_school != "(전체)" and row["시설물명"] == selected_school)
-        radius = 14 if is_selected else (9 if row["시설유형"] == "초등학교" else 6)
-        acc_count = int(row.get("발생건수", 0)) if pd.notna(row.get("발생건수")) else 0
-        child_ratio = row.get("어린이비율", 0) if pd.notna(row.get("어린이비율")) else 0
-        tooltip_text = (
-            f"{row['시설물명']} ({grade_label}) {row['활성_안전점수']:.1f}점"
-            f" | {row['시설유형']} | 사고 {acc_count}건 | 어린이 {child_ratio:.1f}%"
-        )
-        folium.CircleMarker(
-            location=[row["위도"], row["경도"]],
-            radius=radius,
-            color="#E74C3C" if is_selected else "#FFFFFF",
-            weight=4 if is_selected else 2,
-            fill=True,
-            fill_color=color,
-            fill_opacity=1.0 if is_selected else 0.9,
-            popup=folium.Popup(make_popup(row, city=city), max_width=290),
-            tooltip=tooltip_text,
-        ).add_to(m)
-
-    # 오버레이 (성남시 전용 — 광명시는 개별 시설 CSV 없음)
-    if city != "성남시":
-        pass  # 광명시는 오버레이 비활성
-    elif overlay_flags.get("지킴이집"):
-        gh = load_guardhouses()
-        for _, r in gh.iterrows():
-            if pd.notna(r["위도"]) and pd.notna(r["경도"]):
-                folium.Marker(
-                    [r["위도"], r["경도"]],
-                    icon=folium.Icon(color="green", icon="home", prefix="fa"),
-                    tooltip=r["안전시설명"],
-                ).add_to(m)
-
-    if city == "성남시" and overlay_flags.get("사고다발지"):
-        acc = load_accidents()
-        for _, r in acc.iterrows():
-            if pd.notna(r["위도"]) and pd.notna(r["경도"]):
-                folium.CircleMarker(
-                    [r["위도"], r["경도"]],
-                    radius=6, color="#E74C3C", fill=True,
-                    fill_color="#E74C3C", fill_opacity=0.6,
-                    tooltip=f"사고다발지: {r['사고지역위치명']}",
-                ).add_to(m)
-
-    _cluster_overlays = [
-        ("CCTV", load_cctv, "#8E44AD", "CCTV", 3, 0.4),
-        ("카메라", load_cameras, "#2980B9", "단속카메라", 3, 0.4),
-        ("표지판", load_signs, "#F39C12", "안전표지", 2, 0.3),
-        ("적색표면", load_red_surface, "#E74C3C", "도로적색표면", 3, 0.5),
-        ("신호등", load_traffic_lights, "#27AE60", "신호등", 3, 0.5),
-        ("횡단보도", load_crosswalks, "#3498DB", "횡단보도", 3, 0.5),
-        ("보호구역표지판", load_zone_signs, "#E67E22", "보호구역표지판", 3, 0.5),
-        ("펜스", load_fences, "#95A5A6", "무단횡단방지펜스", 3, 0.5),
-    ]
-    if city == "성남시":
-        for _ov_key, _ov_loader, _ov_color, _ov_label, _ov_radius, _ov_opacity in _cluster_overlays:
-            if overlay_flags.get(_ov_key):
-                _ov_data = _ov_loader().dropna(subset=["위도", "경도"])
-                FastMarkerCluster(
-                    data=_ov_data[["위도", "경도"]].values.tolist(),
-                    callback=f"""function(row) {{
-                        var m = L.circleMarker(new L.LatLng(row[0], row[1]),
-                            {{radius:{_ov_radius}, color:'{_ov_color}', fillColor:'{_ov_color}', fill:true, fillOpacity:{_ov_opacity}}});
-                        m.bindTooltip('{_ov_label}'); return m;
-                    }}""",
-                ).add_to(m)
-
-        if overlay_flags.get("옐로카펫"):
-            _yc = load_yellow_carpet().dropna(subset=["위도", "경도"])
-            for _, r in _yc.iterrows():
-                folium.CircleMarker(
-                    [r["위도"], r["경도"]], radius=5,
-                    color="#F1C40F", fill=True, fill_color="#F1C40F", fill_opacity=0.8,
-                    tooltip=f"옐로카펫: {r.get('시설물명', '')}",
-                ).add_to(m)
+    # 행정동 단계구분도 + 경계선 — 경계 adm_nm 은 매니페스트 adm_name 형식으로 맞춤
+    if geo and geo.get("features") and len(pop_df):
+        choropleth_data = pop_df.dropna(subset=["어린이_비율"]).copy()
+        choropleth_data["adm_nm"] = [
+            cfg["adm_name"].format(**row) for row in choropleth_data.to_dict("records")
+        ]
+        add_boundary_layer(m, geo, choropleth_data, fill_opacity=0.25)
+
+    add_school_layer(m, school_features(filtered_df, city=city), selected_school)
 
     # 지도 UX 플러그인
     MiniMap(tile_layer="OpenStreetMap", position="bottomright", width=120, height=90).add_to(m)
@@ -616,132 +628,280 @@ def create_map(filtered_df, overlay_flags, pop_df, geo, selected_school="(전체
     return m
 
 
+# 시설물 오버레이: flag 키 → (사이드바 라벨, 색, 라벨, 반경, 투명도, 이름 컬럼)
+# 포인트 파일은 도시 매니페스트 overlays 에 있는 키만 (없는 도시는 레이어 없음)
+OVERLAY_LAYERS = {
+    "지킴이집": ("아동안전지킴이집", "green", "지킴이집", 5, 0.8, "안전시설명"),
+    "사고다발지": ("사고다발지", "#E74C3C", "사고다발지", 6, 0.6, "사고지역위치명"),
+    "CCTV": ("생활안전 CCTV", "#8E44AD", "CCTV", 3, 0.4, None),
+    "카메라": ("무인교통단속카메라", "#2980B9", "단속카메라", 3, 0.4, None),
+    "표지판": ("도로안전표지", "#F39C12", "안전표지", 2, 0.3, None),
+    "적색표면": ("도로적색표면", "#E74C3C", "도로적색표면", 3, 0.5, None),
+    "신호등": ("신호등", "#27AE60", "신호등", 3, 0.5, None),
+    "횡단보도": ("횡단보도", "#3498DB", "횡단보도", 3, 0.5, None),
+    "보호구역표지판": ("보호구역표지판", "#E67E22", "보호구역표지판", 3, 0.5, None),
+    "옐로카펫": ("옐로카펫", "#F1C40F", "옐로카펫", 5, 0.8, "시설물명"),
+    "펜스": ("무단횡단방지펜스", "#95A5A6", "무단횡단방지펜스", 3, 0.5, None),
+}
+OVERLAY_DEFAULT_ON = ("지킴이집", "사고다발지")
+# 켜진 레이어 전체가 나눠 쓰는 포인트 상한 — 레이어 수와 무관하게 페이로드 일정
+OVERLAY_POINT_BUDGET = 1200
+
+
+@cache_data(max_entries=256)
+def overlay_view(city, layer_key, view_bounds, zoom, budget):
+    """타일 경계 안의 오버레이 포인트 (budget 초과 시 서버 클러스터)"""
+    name_col = OVERLAY_LAYERS[layer_key][-1]
+    pts = load_points(CITY_CONFIG[city]["overlays"][layer_key], name_col).dropna(subset=["위도", "경도"])
+    return spatial.viewport_points(pts, view_bounds, zoom, budget, name_col=name_col)
+
+
+@cache_data(max_entries=256)
+def hotspot_view(city, view_bounds, zoom, budget):
+    """타일 경계 안의 사고다발지 폴리곤 GeoJSON (budget 초과면 None — 포인트로 표시)"""
+    return hotspots.view_geojson(load_hotspots(city), view_bounds, zoom, budget)
+
+
+@profiling.traced
+def create_overlay_group(city, overlay_flags, bounds, zoom):
+    """현재 뷰포트에 보이는 타일 범위의 오버레이만 담은 FeatureGroup (st_folium 동적 레이어)"""
+    fg = folium.FeatureGroup(name="시설물 레이어")
+    enabled = [k for k in OVERLAY_LAYERS if overlay_flags.get(k)]
+    if not enabled:
+        return fg
+    zoom = int(zoom)
+    budget = max(50, OVERLAY_POINT_BUDGET // len(enabled))
+    view = spatial.tile_bounds(bounds, zoom)
+    for key in enabled:
+        _, color, label, radius, opacity, _ = OVERLAY_LAYERS[key]
+        if key == "사고다발지" and CITY_CONFIG[city].get("hotspots"):
+            polygons = hotspot_view(city, view, zoom, budget)
+            if polygons is not None:
+                if polygons["features"]:
+                    folium.GeoJson(
+                        polygons,
+                        name=label,
+                        style_function=lambda f, c=color: {
+                            "color": c, "weight": 1, "fillColor": c,
+                            "fillOpacity": min(0.6, 0.15 + f["properties"]["severity"] / 100),
+                        },
+                        tooltip=folium.GeoJsonTooltip(fields=["tip"], labels=False),
+                    ).add_to(fg)
+                continue
+        pts = overlay_view(city, key, view, zoom, budget)
+        if len(pts) == 0:
+            continue
+        features = [
+            {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [round(lon, 6), round(lat, 6)]},
+                "properties": {
+                    "tip": f"{label} {n}개" if n > 1 else (f"{label}: {name}" if name else label),
+                    "r": radius if n == 1 else int(radius + 2 * np.log2(n)),
+                },
+            }
+            for lat, lon, n, name in pts[["위도", "경도", "n", "name"]].itertuples(index=False)
+        ]
+        folium.GeoJson(
+            {"type": "FeatureCollection", "features": features},
+            name=label,
+            marker=folium.CircleMarker(
+                radius=radius, color=color, weight=1,
+                fill=True, fill_color=color, fill_opacity=opacity,
+            ),
+            style_function=lambda f: {"radius": f["properties"]["r"]},
+            tooltip=folium.GeoJsonTooltip(fields=["tip"], labels=False),
+        ).add_to(fg)
+    return fg
+
+
+# 직렬화된 지도 캐시 (세션별 LRU) — 같은 필터 상태로 돌아오면 지도 생성·직렬화 생략.
+# 오버레이는 st_folium 동적 레이어로 따로 붙으므로 키에 넣지 않음
+MAP_CACHE_MAX_ENTRIES = 8
+MAP_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+
+def map_cache_key(city, filtered_df, selected_school, recount_radius=None):
+    """(도시, 필터된 시설 id, 선택 학교, 재집계 반경)의 정규화 해시"""
+    state = {
+        "city": city,
+        "ids": sorted(int(i) for i in filtered_df.index),
+        "school": selected_school,
+        "radius": recount_radius,
+    }
+    return hashlib.sha1(json.dumps(state, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def map_cache_stats():
+    return st.session_state.setdefault("_map_cache_stats", {"hits": 0, "misses": 0, "evictions": 0})
+
+
+def cached_map(key, build_map):
+    """LRU 조회 → 지도 직렬화(folium_payload). 미스면 build_map() 으로 지도를 만들어 한 번 직렬화해 저장
+
+    적중 시 create_map 과 st_folium 의 지도 직렬화를 모두 건너뛰고 render_map 이 저장된 문자열을 그대로
+    보낸다. 크기는 그 직렬화 문자열 길이로 잰다.
+    """
+    cache = st.session_state.setdefault("_map_cache", OrderedDict())
+    stats = map_cache_stats()
+    if key in cache:
+        cache.move_to_end(key)
+        stats["hits"] += 1
+        profiling.add_bytes(cache[key][1])
+        return cache[key][0]
+
+    stats["misses"] += 1
+    with profiling.section("create_map"):
+        m = build_map()
+    with profiling.section("지도 직렬화"):
+        payload = folium_payload(m)
+    size = sum(len(payload[k].encode("utf-8")) for k in ("script", "header", "html"))
+    cache[key] = (payload, size)
+    profiling.add_bytes(size)
+    while len(cache) > MAP_CACHE_MAX_ENTRIES or (
+        len(cache) > 1 and sum(size for _, size in cache.values()) > MAP_CACHE_MAX_BYTES
+    ):
+        cache.popitem(last=False)
+        stats["evictions"] += 1
+    return payload
+
+
+def _folium_links(m):
+    """지도 요소 트리의 CSS/JS 링크 (st_folium 과 같은 순서 — ColorMap 이 있으면 d3 를 맨 앞에)"""
+    css, js = [], []
+
+    def walk(elem):
+        if isinstance(elem, branca.colormap.ColorMap):
+            js[:0] = ["https://d3js.org/d3.v4.min.js", "https://cdnjs.cloudflare.com/ajax/libs/d3/3.5.5/d3.min.js"]
+        css.extend(href for _, href in getattr(elem, "default_css", []))
+        js.extend(src for _, src in getattr(elem, "default_js", []))
+        for child in getattr(elem, "_children", {}).values():
+            walk(child)
+
+    walk(m)
+    return list(dict.fromkeys(css)), list(dict.fromkeys(js))
+
+
+def folium_payload(m):
+    """st_folium 이 프런트엔드로 보내는 지도 직렬화 — leaflet 스크립트·header·html·CSS/JS 링크·초기 bounds/zoom
+
+    streamlit_folium.st_folium 의 직렬화 단계를 같은 순서로 실행하되, 전체 figure 렌더링은 하지 않는다
+    (지도 render 가 header·html 에 필요한 요소를 채움 — st_folium 이 보내는 값과 같음).
+    """
+    m.render()
+    html, header = streamlit_folium._get_html(m), streamlit_folium._get_header(m)
+    script = streamlit_folium._get_map_string(m)
+    css, js = _folium_links(m)
+    sw, ne = m.get_bounds()
+    return {
+        "script": script, "header": header, "html": html, "id": streamlit_folium.get_full_id(m),
+        "css_links": css, "js_links": js,
+        "bounds": {"_southWest": {"lat": sw[0], "lng": sw[1]}, "_northEast": {"lat": ne[0], "lng": ne[1]}},
+        "location": m.location, "zoom": m.options.get("zoom"), "hash": {},
+    }
+
+
+def render_map(payload, key, height, returned_objects, feature_group=None):
+    """저장된 지도 직렬화로 st_folium 컴포넌트를 그린다 — 매번 직렬화하는 건 뷰포트 오버레이 그룹뿐.
+    반환값·session_state[key] 는 st_folium 과 같다 (bounds·zoom 등)."""
+    fg_script = None
+    if feature_group is not None:
+        # 그룹은 빈 임시 지도에 붙여 직렬화 — 부모 지도 변수는 st_folium 처럼 map_div 로 바뀜
+        fg_script = streamlit_folium._get_feature_group_string(feature_group, map=folium.Map(tiles=None), idx=0)
+    hash_key = payload["hash"].get(key)
+    if hash_key is None:
+        hash_key = payload["hash"][key] = streamlit_folium.generate_js_hash(payload["script"], key, False)
+
+    def on_change():
+        st.session_state[key] = st.session_state.get(hash_key, {})
+
+    defaults = {"bounds": payload["bounds"], "zoom": payload["zoom"]}
+    return streamlit_folium._component_func(
+        script=payload["script"], header=payload["header"], html=payload["html"], id=payload["id"],
+        key=hash_key, height=height, width=None, returned_objects=returned_objects,
+        default={k: defaults.get(k) for k in returned_objects}, zoom=None, center=None,
+        feature_group=fg_script, return_on_hover=False, layer_control=None, pixelated=False,
+        css_links=payload["css_links"], js_links=payload["js_links"], on_change=on_change,
+    )
+
+
+# 선택 학교 — 사이드바 selectbox 값 (fragment 재실행 시에도 session_state 에서 읽음)
+SCHOOL_KEY = "selected_school"
+SCHOOL_FRAGMENTS = ["school_map", "school_detail", "facility_gap", "cv_profile"]
+
+
+def current_school():
+    return st.session_state.get(SCHOOL_KEY, "(전체)")
+
+
+PROFILE_KIND_COLORS = {
+    "mark": "#95A5A6", "section": "#3498DB", "cache": "#27AE60",
+    "call": "#8E44AD", "chart": "#E67E22", "render": "#E74C3C",
+}
+
+
+def render_profile_panel(summary, warm=None):
+    """실행 계측 요약 → 사이드바 접이식 워터폴 + 캐시 적중/미스 표 (+ 시작 예열 데이터셋별 시간)"""
+    spans = pd.DataFrame(summary["spans"])
+    spans["ms"] = (spans["end"] - spans["start"]) * 1000
+    spans["구간"] = [f"{'· ' * d}{n}" for d, n in zip(spans["depth"], spans["name"])]
+    if "bytes" not in spans.columns:
+        spans["bytes"] = np.nan
+    with st.sidebar.expander(f"실행 계측 · {summary['total_s']:.2f}s", expanded=False):
+        fig = go.Figure()
+        for kind, group in spans.groupby("kind", sort=False):
+            fig.add_trace(go.Bar(
+                y=group.index, x=group["ms"], base=group["start"] * 1000, orientation="h",
+                name=kind, marker_color=PROFILE_KIND_COLORS.get(kind, "#7F8C8D"),
+                customdata=group[["구간", "bytes"]],
+                hovertemplate="%{customdata[0]}<br>%{x:.1f}ms · %{customdata[1]:,.0f}B<extra></extra>",
+            ))
+        fig.update_layout(
+            **PLOTLY_LAYOUT, height=max(240, 14 * len(spans)), barmode="overlay",
+            margin=dict(l=0, r=0, t=10, b=0), xaxis_title="ms",
+            yaxis=dict(autorange="reversed", showticklabels=False),
+            legend=dict(orientation="h", y=-0.08),
+        )
+        st.plotly_chart(fig, use_container_width=True)
+        _caches = pd.DataFrame(summary["caches"]).T
+        if len(_caches):
+            st.caption("캐시 적중 / 미스")
+            st.dataframe(_caches.assign(seconds=_caches["seconds"].round(3)), use_container_width=True)
+        st.caption("느린 구간")
+        st.dataframe(
+            spans.nlargest(15, "ms")[["구간", "ms", "bytes"]].round({"ms": 1}),
+            hide_index=True, use_container_width=True,
+        )
+        if warm and warm["results"]:
+            _warm = pd.DataFrame(list(warm["results"]))
+            _done = f"{warm['total_s']:.2f}s" if warm["done"].is_set() else "진행 중"
+            st.caption(f"시작 예열 · {len(_warm)}개 · 경과 {_done} (직렬 합계 {_warm['seconds'].sum():.2f}s)")
+            st.dataframe(
+                _warm.sort_values("seconds", ascending=False)[["name", "seconds", "ok", "error"]],
+                hide_index=True, use_container_width=True,
+            )
+
+
 # ──────────────────────────────────────────────
 # 5. Sidebar
 # ──────────────────────────────────────────────
 
+# 전체 데이터셋 백그라운드 예열 (프로세스당 한 번, SCHOOLZONE_WARMUP=0 이면 끔)
+warm_state = warm_start() if warmup.enabled() else None
+
+profiling.mark("사이드바")
+
 # ── 도시 선택 (최상단) ──
-selected_city = st.sidebar.radio("도시 선택", ["성남시", "광명시"], horizontal=True)
-
-# ── 성남시 데이터 (항상 로드 — 모델 학습 + 비교용) ──
-df_sn_raw = load_data()
-df_sn = df_sn_raw.copy()
-
-cv_df = load_cv_features()
-df_sn = df_sn.merge(cv_df, on="시설물명", how="left")
-
-for _fc in ["보호구역표지판", "옐로카펫", "무단횡단방지펜스"]:
-    if _fc in df_sn.columns:
-        df_sn[_fc] = df_sn[_fc].fillna(0)
-
-_struct_model, struct_auc, _fac_risk = train_structure_model()
-df_sn = df_sn.merge(_fac_risk, on="시설물명", how="left")
-df_sn["structure_risk"] = df_sn["structure_risk"].fillna(df_sn["structure_risk"].median())
-
-_integ_model, integ_feats, integ_auc, integ_coef = train_integrated_model()
-
-# 개선 모델 결과 병합 (117개소)
-_improved = load_improved_scores()
-_imp_merge = _improved[["시설물명", "risk_prob", "risk_prob_calibrated",
-                         "safety_score", "safety_grade"]].copy()
-_imp_merge.columns = ["시설물명", "IM_risk_prob", "IM_사고확률",
-                       "IM_안전점수", "IM_등급"]
-df_sn = df_sn.merge(_imp_merge, on="시설물명", how="left")
-
-# 어린이 비율(%) 컬럼 호환 (2nd dataset은 '어린이 비율(%)', 팀통합은 '어린이비율')
-if "어린이 비율(%)" not in df_sn.columns and "어린이비율" in df_sn.columns:
-    df_sn["어린이 비율(%)"] = df_sn["어린이비율"]
-
-# 사고확률: 개선 모델 결과 사용 (117개소), 나머지는 inline 모델
-_prob_valid = df_sn.dropna(subset=integ_feats)
-if len(_prob_valid) > 0:
-    _inline_prob = _integ_model.predict_proba(
-        _prob_valid[integ_feats].fillna(0).values
-    )[:, 1]
-    df_sn.loc[_prob_valid.index, "_inline_사고확률"] = _inline_prob
-# 개선 모델 결과 우선, 없으면 inline fallback
-df_sn["사고확률"] = df_sn["IM_사고확률"].fillna(df_sn.get("_inline_사고확률", np.nan))
-
-df_sn["_시설합계"] = df_sn[FACILITY_COLS].sum(axis=1)
-# 개선 모델 점수/등급 우선, 없으면 V6 fallback (117개소 → 142개소)
-df_sn["활성_안전점수"] = df_sn["IM_안전점수"].fillna(df_sn["최종안전점수_V6"])
-df_sn["등급"] = df_sn["IM_등급"].fillna(df_sn["등급_V6"])
-df_sn["안전등급"] = df_sn["등급"].map(GRADE_LABELS)
-
-# ── 광명시 안전점수 예측 ──
-gm_raw = load_gwangmyung()
-safety_model, model_features, model_r2 = train_safety_model()
-gs_q1, gs_q2, gs_q3 = df_sn["활성_안전점수"].quantile([0.25, 0.5, 0.75]).values
-
-
-def _classify_grade(score):
-    if score >= gs_q3:
-        return "A"
-    if score >= gs_q2:
-        return "B"
-    if score >= gs_q1:
-        return "C"
-    return "D"
-
-
-df_gm = gm_raw.copy()
-for _fc in FACILITY_COLS:
-    if _fc in df_gm.columns:
-        df_gm[_fc] = df_gm[_fc].fillna(0)
-_gm_child_median = df_gm["어린이비율"].median() if df_gm["어린이비율"].notna().any() else 10.0
-_gm_inputs = []
-for _, _gm_r in df_gm.iterrows():
-    _gm_input = {f: (int(_gm_r[f]) if pd.notna(_gm_r.get(f)) else 0) for f in FACILITY_COLS}
-    _gm_input["발생건수"] = int(_gm_r["발생건수"]) if pd.notna(_gm_r.get("발생건수")) else 0
-    _gm_input["어린이비율"] = float(_gm_r["어린이비율"]) if pd.notna(_gm_r.get("어린이비율")) else _gm_child_median
-    _gm_inputs.append(_gm_input)
-_gm_scores = np.clip(safety_model.predict(pd.DataFrame(_gm_inputs)), 0, 100).tolist()
-df_gm["_LR_안전점수"] = _gm_scores
-df_gm["_LR_등급"] = pd.Series(_gm_scores).apply(_classify_grade).values
-
-# 광명시 개선 모델 결과 병합 (IM 우선, LR fallback)
-_gm_imp_path = DATA_DIR / "3_final_gm_improved.csv"
-if _gm_imp_path.exists():
-    _gm_imp = pd.read_csv(_gm_imp_path, encoding="utf-8-sig")
-    _gm_imp_merge = _gm_imp[["시설물명", "risk_prob_calibrated",
-                               "safety_score", "safety_grade"]].copy()
-    _gm_imp_merge.columns = ["시설물명", "IM_사고확률", "IM_안전점수", "IM_등급"]
-    _gm_imp_merge = _gm_imp_merge.drop_duplicates(subset=["시설물명"], keep="first")
-    df_gm = df_gm.merge(_gm_imp_merge, on="시설물명", how="left")
-    df_gm["활성_안전점수"] = df_gm["IM_안전점수"].fillna(df_gm["_LR_안전점수"])
-    df_gm["등급"] = df_gm["IM_등급"].fillna(df_gm["_LR_등급"])
-    df_gm["사고확률"] = df_gm["IM_사고확률"]
-else:
-    df_gm["활성_안전점수"] = df_gm["_LR_안전점수"]
-    df_gm["등급"] = df_gm["_LR_등급"]
-
-df_gm["안전등급"] = df_gm["등급"].map(GRADE_LABELS)
-df_gm["_시설합계"] = df_gm[FACILITY_COLS].sum(axis=1)
-
-# 광명시 CV 피처 + structure_risk 병합 (3_final_gm.csv)
-_gm_full_path = DATA_DIR / "3_final_gm.csv"
-if _gm_full_path.exists():
-    _gm_full = pd.read_csv(_gm_full_path, encoding="utf-8-sig")
-    _cv_rename = {
-        "p_wide": "CV_도로폭확률",
-        "p_barrier_yes": "CV_분리장치확률",
-        "road_width_relative": "CV_도로상대폭",
-        "sidewalk_ratio": "CV_보행공간비율",
-        "parked_density": "CV_주정차밀도",
-    }
-    _gm_cv_cols = ["시설물명", "structure_risk"] + list(_cv_rename.keys())
-    _gm_cv = _gm_full[[c for c in _gm_cv_cols if c in _gm_full.columns]].copy()
-    _gm_cv.rename(columns=_cv_rename, inplace=True)
-    _gm_cv = _gm_cv.drop_duplicates(subset=["시설물명"], keep="first")
-    df_gm = df_gm.merge(_gm_cv, on="시설물명", how="left")
-    if "structure_risk" in df_gm.columns:
-        df_gm["structure_risk"] = df_gm["structure_risk"].fillna(df_gm["structure_risk"].median())
-
-# ── 활성 데이터 선택 ──
-if selected_city == "성남시":
-    df = df_sn
-else:
-    df = df_gm
+selected_city = st.sidebar.radio("도시 선택", list(CITY_CONFIG), horizontal=True)
+
+# ── 점수 산출 결과 (python -m schoolzone.build 아티팩트, rerun 마다 병합·추론 없음) ──
+_meta = load_build_meta()
+struct_auc = _meta["struct_auc"]
+integ_feats = _meta["integ_feats"]
+integ_auc = _meta["integ_auc"]
+integ_coef = pd.DataFrame(_meta["integ_coef"])
+model_r2 = _meta["model_r2"]
+extern_auc = _meta["extern_auc"]
 
 city_label = f"{selected_city} 어린이 보호구역"
 st.sidebar.markdown(
@@ -750,9 +910,38 @@ st.sidebar.markdown(
     unsafe_allow_html=True,
 )
 
+# ── 시설 집계 반경 (매니페스트에 recount_layers 가 있는 도시 — 원본 포인트 레이어 기준 재집계) ──
+recount_radius = None
+if CITY_CONFIG[selected_city].get("recount_layers") and st.sidebar.checkbox(
+    "반경 기준 시설 재집계", value=False,
+    help="학교 좌표 반경 안의 시설물 포인트를 다시 세고, 모델로 안전점수·등급·사고확률을 재산출합니다.",
+):
+    recount_radius = st.sidebar.slider(
+        "집계 반경 (m)", *spatial.RADIUS_RANGE_M, value=spatial.DEFAULT_RADIUS_M, step=50,
+    )
+
+# ── 활성 데이터 선택 (선택된 도시 샤드만 로드) ──
+df = rescore_city(selected_city, recount_radius) if recount_radius else city_frame(selected_city)
+
+city_cube = load_cube(selected_city, recount_radius)
+
+
+def compare_frame(city):
+    """성남·광명 비교 섹션의 기준 프레임 — 선택 도시면 활성 프레임, 아니면 그 탭이 열렸을 때 처음 로드"""
+    return df if city == selected_city else city_frame(city)
+
+
+def compare_cube(city):
+    return city_cube if city == selected_city else load_cube(city)
+
+
 # ── 개별 시설 선택 (헤더 바로 아래) ──
+# 학교 선택은 전체 rerun 대신 선택 학교에 의존하는 fragment 만 재실행 (지도·개별 시설·갭 분석·CV 프로필)
 school_list = ["(전체)"] + sorted(df["시설물명"].tolist())
-selected_school = st.sidebar.selectbox("개별 시설 선택", school_list)
+selected_school = st.sidebar.selectbox(
+    "개별 시설 선택", school_list, key=SCHOOL_KEY,
+    on_change=st.rerun, args=(SCHOOL_FRAGMENTS,),
+)
 st.sidebar.markdown("---")
 
 # ── 시설 유형 필터 ──
@@ -766,35 +955,43 @@ selected_gu = st.sidebar.multiselect("구 선택", options=available_gu, default
 # ── 등급 필터 ──
 available_grades = [GRADE_LABELS[g] for g in ["A", "B", "C", "D"] if GRADE_LABELS[g] in df["안전등급"].values]
 selected_grades = st.sidebar.multiselect("안전등급", options=available_grades, default=available_grades)
+_grade_of_label = {v: k for k, v in GRADE_LABELS.items()}
+
+# ── 고급 조건 (비트맵 색인 조건식 — 사이드바 필터와 AND) ──
+filter_index = load_filter_index(selected_city, recount_radius)
+filter_bits = bitmap.and_(
+    bitmap.isin(filter_index, "시설유형", selected_types),
+    bitmap.isin(filter_index, "구", selected_gu),
+    bitmap.isin(filter_index, "등급", [_grade_of_label[g] for g in selected_grades]),
+)
+filter_query = st.sidebar.text_input(
+    "고급 조건", key="filter_query",
+    placeholder="옐로카펫 = 0 AND 신호등 < 3 AND 발생건수 >= 2",
+    help=(
+        "조건을 AND / OR / NOT 과 괄호로 묶습니다. 비교: = != < <= > >= , 목록: 구 IN (분당구, 수정구). "
+        f"컬럼: {', '.join(bitmap.columns(filter_index))}"
+    ),
+).strip()
+if filter_query:
+    try:
+        filter_bits = bitmap.and_(filter_bits, bitmap.evaluate(filter_index, filter_query))
+    except ValueError as e:
+        st.sidebar.error(str(e))
+        filter_query = ""
 
 st.sidebar.markdown("---")
 overlay_flags = {}
-if selected_city == "성남시":
+if CITY_CONFIG[selected_city]["overlays"]:
     st.sidebar.markdown(
         "<p style='font-weight:600;font-size:14px;margin-bottom:8px;'>시설물 레이어</p>",
         unsafe_allow_html=True,
     )
-    ov_guardhouse = st.sidebar.checkbox("아동안전지킴이집", value=True)
-    ov_accident = st.sidebar.checkbox("사고다발지", value=True)
-    ov_cctv = st.sidebar.checkbox("생활안전 CCTV", value=False)
-    ov_camera = st.sidebar.checkbox("무인교통단속카메라", value=False)
-    ov_sign = st.sidebar.checkbox("도로안전표지", value=False)
-    ov_red_surface = st.sidebar.checkbox("도로적색표면", value=False)
-    ov_traffic_light = st.sidebar.checkbox("신호등", value=False)
-    ov_crosswalk = st.sidebar.checkbox("횡단보도", value=False)
-    ov_zone_sign = st.sidebar.checkbox("보호구역표지판", value=False)
-    ov_yellow_carpet = st.sidebar.checkbox("옐로카펫", value=False)
-    ov_fence = st.sidebar.checkbox("무단횡단방지펜스", value=False)
-    overlay_flags = {
-        "지킴이집": ov_guardhouse, "사고다발지": ov_accident,
-        "CCTV": ov_cctv, "카메라": ov_camera, "표지판": ov_sign,
-        "적색표면": ov_red_surface, "신호등": ov_traffic_light,
-        "횡단보도": ov_crosswalk, "보호구역표지판": ov_zone_sign,
-        "옐로카펫": ov_yellow_carpet, "펜스": ov_fence,
-    }
+    for _ok, (_ov_label, *_) in OVERLAY_LAYERS.items():
+        if _ok in CITY_CONFIG[selected_city]["overlays"]:
+            overlay_flags[_ok] = st.sidebar.checkbox(_ov_label, value=_ok in OVERLAY_DEFAULT_ON)
 else:
     st.sidebar.markdown(
-        "<p style='font-size:12px;opacity:0.7;'>시설물 레이어는 성남시에서만 지원됩니다.</p>",
+        f"<p style='font-size:12px;opacity:0.7;'>{selected_city}에는 시설물 레이어 데이터가 없습니다.</p>",
         unsafe_allow_html=True,
     )
 
@@ -805,8 +1002,7 @@ st.sidebar.markdown(
     unsafe_allow_html=True,
 )
 csv_cols = ["시설물명", "시설유형", "구", "안전등급", "활성_안전점수"]
-if selected_city == "성남시":
-    csv_cols += ["가산점_시설_V6", "가산점_보너스_V6", "감산점_합계_V6"]
+csv_cols += ["가산점_시설_V6", "가산점_보너스_V6", "감산점_합계_V6"]
 csv_cols += FACILITY_COLS + ["발생건수", "어린이비율"]
 if "사고확률" in df.columns:
     csv_cols += ["사고확률"]
@@ -827,19 +1023,30 @@ st.sidebar.download_button(
 # ──────────────────────────────────────────────
 # 6. Main Content
 # ──────────────────────────────────────────────
-filtered_df = df[
-    df["시설유형"].isin(selected_types)
-    & df["구"].isin(selected_gu)
-    & df["안전등급"].isin(selected_grades)
-]
+profiling.mark("필터·헤더·인사이트")
+filtered_df = df[bitmap.to_mask(filter_index, filter_bits)]
 
 if len(filtered_df) == 0:
     st.warning("선택한 필터 조건에 해당하는 시설이 없습니다. 사이드바에서 필터를 조정해 주세요.")
     st.stop()
 
+# 같은 필터의 큐브 셀 — KPI·인사이트·등급/유형 통계는 행 대신 셀 합산
+# (고급 조건은 큐브 차원 밖이라, 쓰는 동안은 걸러진 행으로 셀을 만든다)
+if filter_query:
+    filtered_cells = cube.build_cube(filtered_df)
+else:
+    filtered_cells = cube.select(
+        city_cube, gu=selected_gu, types=selected_types, grades=[_grade_of_label[g] for g in selected_grades],
+    )
+filtered_total = cube.rollup(filtered_cells)
+filtered_by_grade = cube.by_grade(filtered_cells)
+
 # Header
 _n_facilities = len(filtered_df)
-_model_note = " (모델 추정)" if selected_city == "광명시" else ""
+if recount_radius:
+    _model_note = f" (반경 {recount_radius}m 재집계 · 모델 추정)"
+else:
+    _model_note = " (모델 추정)" if CITY_CONFIG[selected_city]["model_transfer"] else ""
 st.markdown(
     f'<div style="margin-bottom:8px;">'
     f'<span style="font-size:36px;font-weight:700;color:#2C3E50;">내 아이가 살기 좋은 동네</span>'
@@ -854,27 +1061,27 @@ st.caption("점수는 확률 추정치이며, 보조 의사결정 도구로 사
 # KPIs
 k1, k2, k3, k4 = st.columns(4)
 k1.metric("시설 수", f"{len(filtered_df)}개소")
-avg_score = filtered_df["활성_안전점수"].mean() if len(filtered_df) else 0
+avg_score = cube.mean(filtered_total, "활성_안전점수") if len(filtered_df) else 0
 k2.metric("평균 안전점수", f"{avg_score:.1f}")
 safe_ratio = (
-    (filtered_df["등급"].isin(["A", "B"])).sum() / len(filtered_df) * 100
+    filtered_by_grade["n"].reindex(["A", "B"]).sum() / filtered_total["n"] * 100
     if len(filtered_df) else 0
 )
 k3.metric("안전(A+B) 비율", f"{safe_ratio:.0f}%")
-total_accidents = int(filtered_df["발생건수"].fillna(0).sum())
+total_accidents = int(filtered_total["발생건수_sum"])
 k4.metric("사고건수 합계", f"{total_accidents}건")
 
 # ── 핵심 인사이트 카드 ──
 if len(filtered_df) > 0:
     # 1) 가장 위험한 구
-    _gu_acc = filtered_df.groupby("구")["발생건수"].mean()
+    _gu_acc = cube.mean(cube.rollup(filtered_cells, ["구"]), "발생건수")
     _worst_gu = _gu_acc.idxmax()
     _worst_gu_val = _gu_acc.max()
     _best_gu = _gu_acc.idxmin()
     _best_gu_val = _gu_acc.min()
     # 2) 가장 부족한 시설 (D등급 vs A등급 차이 최대)
-    _d_fac = filtered_df[filtered_df["등급"] == "D"][FACILITY_COLS].mean()
-    _a_fac = filtered_df[filtered_df["등급"] == "A"][FACILITY_COLS].mean()
+    _d_fac = cube.means(filtered_by_grade.loc["D"], FACILITY_COLS)
+    _a_fac = cube.means(filtered_by_grade.loc["A"], FACILITY_COLS)
     if len(_d_fac) > 0 and len(_a_fac) > 0 and not _d_fac.isna().all():
         _gap = (_a_fac - _d_fac).sort_values(ascending=False)
         _top_gap = _gap.index[0] if len(_gap) > 0 else None
@@ -909,13 +1116,16 @@ if len(filtered_df) > 0:
     )
 
 # Tabs
+# on_change="rerun": 열린 탭만 .open — 다른 도시 프레임이 필요한 비교 섹션은 그 탭이 열렸을 때만 로드
+# (fragment 가 든 섹션은 키 지정 st.rerun 대상이라 탭과 관계없이 등록)
 tab_map, tab_facility, tab_sim, tab_method = st.tabs(
-    ["지도", "시설점수", "광명 시뮬레이션", "모델 분석"]
+    ["지도", "시설점수", "광명 시뮬레이션", "모델 분석"], key="main_tab", on_change="rerun",
 )
 
 # ============================
 # Tab 1: 지도
 # ============================
+profiling.mark("지도 탭")
 with tab_map:
     col_top, col_bot = st.columns(2)
 
@@ -982,17 +1192,115 @@ with tab_map:
                 use_container_width=True, hide_index=True,
             )
 
+    # ── 예산 기반 시설 배치 최적화 ──
+    @st.fragment(key="facility_optimizer")
+    def facility_optimizer_view(df, selected_city):
+        """예산·단가 입력 → 전체 학교 대상 설치안 (입력 변경은 이 fragment 만 재실행)"""
+        with st.expander("예산 기반 시설 배치 최적화", expanded=False):
+            st.caption(
+                "시설 1개당 단가와 총예산을 넣으면 어느 학교에 어떤 시설을 몇 개 설치할지 고릅니다. "
+                f"학교·시설당 최대 {optimize.DEFAULT_MAX_UNITS}개까지 추가합니다."
+            )
+            _oc1, _oc2, _oc3 = st.columns([1, 1, 1])
+            with _oc1:
+                _goal = st.radio(
+                    "목표", ["사고확률 합계 최소화", "D등급 탈출 학교 수 최대화"], key="opt_goal",
+                )
+            with _oc2:
+                _scope = st.multiselect(
+                    "대상 도시", list(CITY_CONFIG), default=[selected_city], key=f"opt_scope_{selected_city}",
+                    max_selections=OPT_MAX_CITIES, help=f"한 번에 최대 {OPT_MAX_CITIES}개 도시",
+                )
+            with _oc3:
+                _budget = st.number_input("총예산 (단가 단위)", min_value=0.0, value=30.0, step=5.0, key="opt_budget")
+            _cost_df = st.data_editor(
+                pd.DataFrame({"시설물": FACILITY_COLS, "단가": [optimize.DEFAULT_UNIT_COSTS[f] for f in FACILITY_COLS]}),
+                key="opt_costs", hide_index=True, use_container_width=True,
+                disabled=["시설물"], column_config={"단가": st.column_config.NumberColumn(min_value=0.0)},
+            )
+            _costs = dict(zip(_cost_df["시설물"], _cost_df["단가"].fillna(0).astype(float)))
+
+            if not _scope:
+                st.info("대상 도시를 하나 이상 고르세요.")
+                return
+            _target = pd.concat(
+                [(df if c == selected_city else city_frame(c)).assign(도시=c) for c in _scope],
+                ignore_index=True,
+            )
+
+            if _goal.startswith("사고확률"):
+                _integ_model_opt, _integ_feats_opt = train_integrated_model()[:2]
+                _plan, _summary = optimize.minimize_accident_prob(
+                    _target, _integ_model_opt, _integ_feats_opt, _costs, _budget,
+                )
+                _m1, _m2, _m3 = st.columns(3)
+                _m1.metric("사용 예산", f"{_summary['사용']:.1f} / {_budget:.1f}")
+                _m2.metric("설치 수", f"{_summary['설치 수']}개")
+                _m3.metric(
+                    "평균 사고확률",
+                    f"{_summary['사고확률 합계(후)'] / _summary['대상 학교']:.1%}",
+                    f"{(_summary['사고확률 합계(후)'] - _summary['사고확률 합계(전)']) / _summary['대상 학교']:+.1%}",
+                    delta_color="inverse",
+                )
+                _effect = "사고확률 감소"
+            else:
+                _safety_model_opt, _safety_feats_opt, _ = train_safety_model()
+                _plan, _summary = optimize.maximize_grade_exit(
+                    _target, _safety_model_opt, _safety_feats_opt, _costs, _budget,
+                )
+                _m1, _m2, _m3 = st.columns(3)
+                _m1.metric("사용 예산", f"{_summary['사용']:.1f} / {_budget:.1f}")
+                _m2.metric("설치 수", f"{_summary['설치 수']}개")
+                _m3.metric("D등급 탈출", f"{_summary['D 탈출']} / {_summary['대상 학교']}개소")
+                st.caption(
+                    f"풀이: {_summary['방법']} · 점수 변화는 안전점수 회귀의 시설 1개당 증분으로 근사하며, "
+                    "도시별 C등급 최저 점수에 닿으면 탈출로 봅니다."
+                )
+                _effect = "점수 상승"
+            if len(_plan):
+                st.dataframe(
+                    _plan.rename(columns={"효과": _effect}),
+                    use_container_width=True, hide_index=True,
+                    column_config={_effect: st.column_config.NumberColumn(format="%.3f")},
+                )
+            else:
+                st.info("예산 안에서 효과가 있는 설치안이 없습니다.")
+
+    facility_optimizer_view(df, selected_city)
+
     st.markdown("<div style='height:20px;'></div>", unsafe_allow_html=True)
-    if selected_city == "성남시":
-        pop_df = load_population()
-        geo = load_geojson()
-    else:
-        pop_df = load_gm_population()
-        geo = load_gm_geojson()
-    m = create_map(filtered_df, overlay_flags, pop_df, geo, selected_school, city=selected_city)
-    if selected_city == "광명시":
-        st.caption("시설물 레이어(지킴이집, 사고다발지 등)는 성남시에서만 지원됩니다.")
-    st_folium(m, height=550, use_container_width=True, returned_objects=[])
+
+    @st.fragment(key="school_map")
+    def school_map_view(filtered_df, selected_city, recount_radius, overlay_flags):
+        """메인 지도 — 학교 선택·지도 이동(오버레이 bounds)은 이 fragment 만 재실행"""
+        selected_school = current_school()
+        # 경계 단순화 단계는 초기 줌 기준 (학교 선택 시 15로 확대)
+        _geo_zoom = 15 if selected_school != "(전체)" else CITY_CONFIG[selected_city]["zoom"]
+        pop_df = load_city_population(selected_city)
+        geo = load_city_geojson(selected_city, _geo_zoom)
+        with profiling.section("cached_map"):
+            payload = cached_map(
+                map_cache_key(selected_city, filtered_df, selected_school, recount_radius),
+                lambda: create_map(filtered_df, pop_df, geo, selected_school, city=selected_city),
+            )
+        if not CITY_CONFIG[selected_city]["overlays"]:
+            st.caption(f"{selected_city}에는 시설물 레이어(지킴이집, 사고다발지 등) 데이터가 없습니다.")
+
+        # 오버레이는 뷰포트 단위로 스트리밍: 지도 bounds/zoom 을 받아 보이는 타일 범위만 전송
+        _map_key = f"map_{selected_city}"
+        _map_state = st.session_state.get(_map_key) or {}
+        _view_zoom = _map_state.get("zoom") or payload["zoom"]
+        _view_bounds = spatial.parse_bounds(_map_state.get("bounds")) or spatial.approx_bounds(payload["location"], _view_zoom)
+        _overlay_on = any(overlay_flags.values())
+        _overlay_group = create_overlay_group(selected_city, overlay_flags, _view_bounds, _view_zoom) if _overlay_on else None
+        with profiling.section("st_folium", "render"):
+            render_map(
+                payload, _map_key, 550, ["bounds", "zoom"] if _overlay_on else [], feature_group=_overlay_group,
+            )
+        _mc = map_cache_stats()
+        st.caption(f"지도 캐시 적중 {_mc['hits']} · 미스 {_mc['misses']} · 축출 {_mc['evictions']}")
+
+    school_map_view(filtered_df, selected_city, recount_radius, overlay_flags)
 
     st.markdown("---")
 
@@ -1003,7 +1311,7 @@ with tab_map:
 
     with _sub_all:
         # ── 점수 구조 시각화 ──
-        if selected_city == "성남시" and "가산점_시설_V6" in filtered_df.columns:
+        if "가산점_시설_V6" in filtered_df.columns:
             st.markdown("##### 점수 구조: 기본(50) + 가산점(시설+보너스) - 감산점")
             score_struct = pd.DataFrame({
                 "항목": ["가산점(시설)", "가산점(보너스)", "감산점 합계"],
@@ -1029,10 +1337,10 @@ with tab_map:
             _y_min = score_struct["평균"].min() * 1.25
             fig_struct.update_layout(**PLOTLY_LAYOUT, height=350, showlegend=False,
                                      yaxis=dict(range=[_y_min, _y_max]))
-            st.plotly_chart(fig_struct, use_container_width=True)
-        elif selected_city == "광명시":
+            plotly_chart(fig_struct, use_container_width=True)
+        elif CITY_CONFIG[selected_city]["model_transfer"]:
             st.markdown("##### 안전점수 개요")
-            st.caption("광명시 안전점수는 성남시 LinearRegression 모델로 추정한 값입니다.")
+            st.caption(f"{selected_city} 안전점수는 성남시 LinearRegression 모델로 추정한 값입니다.")
     
         fig_hist = px.histogram(
             filtered_df, x="활성_안전점수", nbins=20,
@@ -1041,16 +1349,16 @@ with tab_map:
             color_discrete_sequence=["#F39C12"],
         )
         fig_hist.update_layout(**PLOTLY_LAYOUT, height=380, yaxis_title="시설 수", bargap=0.08)
-        st.plotly_chart(fig_hist, use_container_width=True)
+        plotly_chart(fig_hist, use_container_width=True)
     
         # ── 등급별 현황 ──
         st.markdown("<div style='height:20px;'></div>", unsafe_allow_html=True)
         st.markdown("##### 등급별 현황")
-        grade_stats = filtered_df.groupby("등급").agg(
-            시설수=("시설물명", "count"),
-            평균_발생건수=("발생건수", "mean"),
-            평균_안전점수=("활성_안전점수", "mean"),
-        ).reindex(["A", "B", "C", "D"]).reset_index()
+        grade_stats = pd.DataFrame({
+            "시설수": filtered_by_grade["n"],
+            "평균_발생건수": cube.mean(filtered_by_grade, "발생건수"),
+            "평균_안전점수": cube.mean(filtered_by_grade, "활성_안전점수"),
+        }).reset_index()
         grade_stats["평균_발생건수"] = grade_stats["평균_발생건수"].round(1)
         grade_stats["평균_안전점수"] = grade_stats["평균_안전점수"].round(1)
         grade_stats.columns = ["등급", "시설 수", "평균 발생건수", "평균 안전점수"]
@@ -1071,16 +1379,17 @@ with tab_map:
             _acc_y_max = grade_stats["평균 발생건수"].max() * 1.3 if grade_stats["평균 발생건수"].max() > 0 else 1
             fig_acc.update_layout(**PLOTLY_LAYOUT, height=350, showlegend=False,
                                   yaxis=dict(range=[0, _acc_y_max]))
-            st.plotly_chart(fig_acc, use_container_width=True)
+            plotly_chart(fig_acc, use_container_width=True)
     
         # ── 시설유형별 현황 ──
         st.markdown("<div style='height:20px;'></div>", unsafe_allow_html=True)
         st.markdown("##### 시설유형별 안전점수")
-        type_stats = filtered_df.groupby("시설유형").agg(
-            시설수=("시설물명", "count"),
-            평균점수=("활성_안전점수", "mean"),
-            평균_발생건수=("발생건수", "mean"),
-        ).reset_index()
+        _by_type = cube.rollup(filtered_cells, ["시설유형"])
+        type_stats = pd.DataFrame({
+            "시설수": _by_type["n"],
+            "평균점수": cube.mean(_by_type, "활성_안전점수"),
+            "평균_발생건수": cube.mean(_by_type, "발생건수"),
+        }).reset_index()
         type_stats["평균점수"] = type_stats["평균점수"].round(1)
         type_stats["평균_발생건수"] = type_stats["평균_발생건수"].round(1)
     
@@ -1095,7 +1404,7 @@ with tab_map:
         )
         fig_type.update_traces(texttemplate="%{text}개소", textposition="outside")
         fig_type.update_layout(**PLOTLY_LAYOUT, height=280, coloraxis_showscale=False)
-        st.plotly_chart(fig_type, use_container_width=True)
+        plotly_chart(fig_type, use_container_width=True)
     
         # ── D등급 개선 제안 ──
         st.markdown("<div style='height:20px;'></div>", unsafe_allow_html=True)
@@ -1120,10 +1429,13 @@ with tab_map:
             st.success("모든 시설이 양호한 상태입니다.")
     
     
-    with _sub_indiv:
+    @st.fragment(key="school_detail")
+    def school_detail_view(df, selected_city, recount_radius):
+        """개별 시설 상세 카드·레이더·정책 시뮬레이션"""
+        selected_school = current_school()
         if selected_school != "(전체)":
             school_row = df[df["시설물명"] == selected_school].iloc[0]
-    
+
             # ── 상세 카드 ──
             _gc = GRADE_COLORS.get(school_row["등급"], "#999")
             _gl = GRADE_LABELS.get(school_row["등급"], school_row["등급"])
@@ -1138,24 +1450,34 @@ with tab_map:
                 f"</div>",
                 unsafe_allow_html=True,
             )
-    
+
+            # ── 사고다발지 노출 (폴리곤 공간 조인) ──
+            if CITY_CONFIG[selected_city].get("hotspots"):
+                _hx = hotspot_exposure(selected_city).loc[school_row.name]
+                _hr = hotspots.DEFAULT_RADIUS_M
+                st.markdown("<div style='height:12px;'></div>", unsafe_allow_html=True)
+                hx1, hx2, hx3, hx4 = st.columns(4)
+                hx1.metric(f"사고다발지 ({_hr}m 이내)", f"{int(_hx['사고다발지_수'])}곳")
+                hx2.metric("다발지 발생건수 합", f"{int(_hx['사고다발지_발생건수'])}건")
+                hx3.metric("다발지 사상자 합", f"{int(_hx['사고다발지_사상자수'])}명")
+                if _hx["사고다발지_포함"] > 0:
+                    _near = "다발지 내부"
+                elif pd.notna(_hx["사고다발지_최근접_m"]):
+                    _near = f"{_hx['사고다발지_최근접_m']:.0f}m"
+                else:
+                    _near = f"{hotspots.NEAREST_SEARCH_M:,}m 밖"
+                hx4.metric("최근접 다발지", _near)
+
             st.markdown("<div style='height:16px;'></div>", unsafe_allow_html=True)
-    
+
             # ── 로드뷰 이미지 ──
-            _rv_name = selected_school.replace(" ", "_")
-            _rv_path = DATA_DIR / "roadview" / f"{_rv_name}_북쪽.jpg"
-            if _rv_path.exists():
+            _rv_img = roadview_image(selected_city, selected_school, "full")
+            if _rv_img is not None:
                 st.markdown("##### 로드뷰 (북쪽 방향)")
-                st.image(str(_rv_path), use_container_width=True)
-            else:
-                # 공백 없는 원본 이름으로도 시도
-                _rv_path2 = DATA_DIR / "roadview" / f"{selected_school}_북쪽.jpg"
-                if _rv_path2.exists():
-                    st.markdown("##### 로드뷰 (북쪽 방향)")
-                    st.image(str(_rv_path2), use_container_width=True)
-    
+                st.image(_rv_img, use_container_width=True)
+
             st.markdown("<div style='height:16px;'></div>", unsafe_allow_html=True)
-    
+
             # ── 레이더 차트 ──
             radar_feats = FACILITY_COLS
             radar_labels = radar_feats.copy()
@@ -1165,7 +1487,7 @@ with tab_map:
                 vals.append(school_row[f] / mx * 100 if mx > 0 else 0)
             vals.append(vals[0])
             radar_labels_closed = radar_labels + [radar_labels[0]]
-    
+
             fig_radar = go.Figure()
             fig_radar.add_trace(go.Scatterpolar(
                 r=vals, theta=radar_labels_closed,
@@ -1183,44 +1505,30 @@ with tab_map:
                 title=f"{selected_school} 시설물 현황",
                 height=420, showlegend=False,
             )
-            st.plotly_chart(fig_radar, use_container_width=True)
-    
-            # ── 정책 시뮬레이션 (성남시 전용) ──
-            if selected_city != "성남시":
+            plotly_chart(fig_radar, use_container_width=True)
+
+            # ── 정책 시뮬레이션 (모델 학습 도시 전용) ──
+            if CITY_CONFIG[selected_city]["model_transfer"]:
                 st.markdown("<div style='height:20px;'></div>", unsafe_allow_html=True)
-                st.info("정책 시뮬레이션은 성남시에서만 지원됩니다.")
+                st.info("정책 시뮬레이션은 모델을 학습한 성남시에서만 지원됩니다.")
             else:
                 st.markdown("<div style='height:20px;'></div>", unsafe_allow_html=True)
                 st.markdown("##### 정책 시뮬레이션: 시설물 추가 효과")
                 st.caption("선택한 시설에 시설물 1개를 추가할 때 사고 발생 확률 변화량을 예측합니다.")
-    
-                _integ_model_pol, integ_feats_pol = _integ_model, integ_feats
-                _sim_input = {}
-                for _f in integ_feats_pol:
-                    if _f == "어린이 비율(%)":
-                        _sim_input[_f] = school_row.get("어린이비율", 10.0)
-                    else:
-                        _sim_input[_f] = school_row.get(_f, 0)
-                pol_base = pd.DataFrame([_sim_input])[integ_feats_pol].fillna(0).values
-                pol_base_prob = float(_integ_model_pol.predict_proba(pol_base)[0, 1])
-    
-                pol_results = []
-                for i, feat in enumerate(integ_feats_pol):
-                    if feat in FACILITY_COLS:
-                        pol_modified = pol_base.copy()
-                        pol_modified[0, i] += 1
-                        pol_new_prob = float(_integ_model_pol.predict_proba(pol_modified)[0, 1])
-                        pol_delta = pol_new_prob - pol_base_prob
-                        pol_results.append({
-                            "시설물": feat,
-                            "현재 수량": int(school_row[feat]),
-                            "현재 사고확률": pol_base_prob,
-                            "추가 후 사고확률": pol_new_prob,
-                            "변화량 (%p)": pol_delta,
-                        })
-    
-                pol_df = pd.DataFrame(pol_results).sort_values("변화량 (%p)")
-    
+
+                # 학교 × 시설 × +0..+k 텐서에서 꺼내기만 함 (클릭마다 모델 호출 없음)
+                _cf, _cf_cols, _cf_names = load_counterfactuals(selected_city, recount_radius)
+                _cf_i = _cf_names.index(selected_school)
+                pol_base_prob = float(_cf[_cf_i, 0, 0])
+                pol_df = pd.DataFrame({
+                    "시설물": _cf_cols,
+                    "현재 수량": [int(school_row[f]) for f in _cf_cols],
+                    "현재 사고확률": pol_base_prob,
+                    "추가 후 사고확률": _cf[_cf_i, :, 1],
+                    "변화량 (%p)": _cf[_cf_i, :, 1] - pol_base_prob,
+                })
+                pol_df = pol_df.sort_values("변화량 (%p)")
+
                 top3 = pol_df.head(3)
                 st.markdown(
                     f'<div style="background:linear-gradient(135deg,#FDEBD0,#FEF9E7);'
@@ -1236,7 +1544,7 @@ with tab_map:
                     + '</span></div>',
                     unsafe_allow_html=True,
                 )
-    
+
                 fig_pol = go.Figure()
                 fig_pol.add_trace(go.Bar(
                     y=pol_df["시설물"], x=pol_df["변화량 (%p)"] * 100,
@@ -1252,7 +1560,22 @@ with tab_map:
                     xaxis=dict(title="사고확률 변화 (%p)"),
                     yaxis=dict(title=""),
                 )
-                st.plotly_chart(fig_pol, use_container_width=True)
+                plotly_chart(fig_pol, use_container_width=True)
+
+                # 용량-반응: 시설별 +0..+k 개 추가 시 사고확률
+                _units = np.arange(_cf.shape[2])
+                fig_dose = go.Figure()
+                for _j in np.argsort(_cf[_cf_i, :, -1]):
+                    fig_dose.add_trace(go.Scatter(
+                        x=_units, y=_cf[_cf_i, _j] * 100, mode="lines+markers", name=_cf_cols[_j],
+                    ))
+                fig_dose.update_layout(
+                    **PLOTLY_LAYOUT, height=380,
+                    title=f"{selected_school}: 추가 수량별 사고확률 (용량-반응)",
+                    xaxis=dict(title="추가 수량 (개)", dtick=1),
+                    yaxis=dict(title="사고확률 (%)"),
+                )
+                plotly_chart(fig_dose, use_container_width=True)
         else:
             st.markdown(
                 "<div style='background:#FEF5E7;padding:30px;border-radius:10px;"
@@ -1265,10 +1588,14 @@ with tab_map:
                 unsafe_allow_html=True,
             )
 
+    with _sub_indiv:
+        school_detail_view(df, selected_city, recount_radius)
+
 
 # ============================
 # Tab 3: 시설점수
 # ============================
+profiling.mark("시설점수 탭")
 with tab_facility:
     st.markdown("### 시설물 보유 현황 및 분석")
     st.caption(f"{selected_city} {len(df)}개소 스쿨존의 9개 안전 시설물 보유 현황과 사고 관계를 분석합니다.")
@@ -1292,58 +1619,62 @@ with tab_facility:
     st.markdown("<div style='height:20px;'></div>", unsafe_allow_html=True)
 
     # ── (b) 구별 시설 보유 현황 (Stacked Bar) — 성남 3구 + 광명 ──
-    st.markdown("##### 구별 시설 보유 현황 (성남 + 광명)")
-    _gu_fac = df_sn.groupby("구")[FACILITY_COLS].sum().reset_index()
-    _gm_fac = df_gm[FACILITY_COLS].sum().to_frame().T
-    _gm_fac.insert(0, "구", "광명시")
-    _gu_fac_all = pd.concat([_gu_fac, _gm_fac], ignore_index=True)
-    _gu_fac_melt = _gu_fac_all.melt(id_vars="구", var_name="시설종류", value_name="수량")
-    fig_gu_fac = px.bar(
-        _gu_fac_melt, x="구", y="수량", color="시설종류",
-        barmode="stack",
-        title="구별 시설물 보유 현황 (9개 시설 합산)",
-        color_discrete_sequence=px.colors.qualitative.Set2,
-    )
-    fig_gu_fac.update_layout(**PLOTLY_LAYOUT, height=450)
-    st.plotly_chart(fig_gu_fac, use_container_width=True)
-    st.caption("※ 성남시 3구 + 광명시 시설물 보유 현황 비교")
+    if tab_facility.open:
+        df_sn, df_gm, cube_sn = compare_frame("성남시"), compare_frame("광명시"), compare_cube("성남시")
+        st.markdown("##### 구별 시설 보유 현황 (성남 + 광명)")
+        _gu_fac = cube.rollup(cube_sn, ["구"])[[f"{f}_sum" for f in FACILITY_COLS]]
+        _gu_fac = _gu_fac.set_axis(FACILITY_COLS, axis=1).reset_index()
+        _gm_fac = df_gm[FACILITY_COLS].sum().to_frame().T
+        _gm_fac.insert(0, "구", "광명시")
+        _gu_fac_all = pd.concat([_gu_fac, _gm_fac], ignore_index=True)
+        _gu_fac_melt = _gu_fac_all.melt(id_vars="구", var_name="시설종류", value_name="수량")
+        fig_gu_fac = px.bar(
+            _gu_fac_melt, x="구", y="수량", color="시설종류",
+            barmode="stack",
+            title="구별 시설물 보유 현황 (9개 시설 합산)",
+            color_discrete_sequence=px.colors.qualitative.Set2,
+        )
+        fig_gu_fac.update_layout(**PLOTLY_LAYOUT, height=450)
+        plotly_chart(fig_gu_fac, use_container_width=True)
+        st.caption("※ 성남시 3구 + 광명시 시설물 보유 현황 비교")
 
-    # ── (b-2) 구별 등급 분포 파이차트 (성남 + 광명) ──
-    st.markdown("<div style='height:20px;'></div>", unsafe_allow_html=True)
-    st.markdown("##### 구별 안전등급 분포 (성남 + 광명)")
-
-    # 광명 예측 등급 — df_gm에 이미 '등급' 존재
-    _gm_grade_df = pd.DataFrame({"구": "광명시", "등급": df_gm["등급"].tolist()})
-
-    _gu_grade = df_sn.groupby(["구", "등급"]).size().reset_index(name="개소")
-    _gm_gu_grade = _gm_grade_df.groupby(["구", "등급"]).size().reset_index(name="개소")
-    _gu_grade_all = pd.concat([_gu_grade, _gm_gu_grade], ignore_index=True)
-    _gu_list = sorted(df_sn["구"].dropna().unique().tolist()) + ["광명시"]
-    _pie_cols = st.columns(len(_gu_list))
-    for _pi, _gu_name in enumerate(_gu_list):
-        with _pie_cols[_pi]:
-            _gu_sub = _gu_grade_all[_gu_grade_all["구"] == _gu_name]
-            _title = f"{_gu_name}" + (" (예측)" if _gu_name == "광명시" else "")
-            fig_pie = px.pie(
-                _gu_sub, values="개소", names="등급",
-                title=_title,
-                color="등급",
-                color_discrete_map={g: GRADE_COLORS[g] for g in ["A", "B", "C", "D"]},
-                category_orders={"등급": ["A", "B", "C", "D"]},
-            )
-            fig_pie.update_traces(textposition="inside", textinfo="percent+value")
-            fig_pie.update_layout(
-                **PLOTLY_LAYOUT, height=320, showlegend=True,
-                legend=dict(orientation="h", y=-0.1),
-                margin=dict(t=40, b=40, l=10, r=10),
-            )
-            st.plotly_chart(fig_pie, use_container_width=True)
+        # ── (b-2) 구별 등급 분포 파이차트 (성남 + 광명) ──
+        st.markdown("<div style='height:20px;'></div>", unsafe_allow_html=True)
+        st.markdown("##### 구별 안전등급 분포 (성남 + 광명)")
+
+        # 광명 예측 등급 — df_gm에 이미 '등급' 존재
+        _gm_grade_df = pd.DataFrame({"구": "광명시", "등급": df_gm["등급"].tolist()})
+
+        _gu_grade = cube.rollup(cube_sn, ["구", "등급"])["n"].reset_index(name="개소")
+        _gm_gu_grade = _gm_grade_df.groupby(["구", "등급"]).size().reset_index(name="개소")
+        _gu_grade_all = pd.concat([_gu_grade, _gm_gu_grade], ignore_index=True)
+        _gu_list = sorted(df_sn["구"].dropna().unique().tolist()) + ["광명시"]
+        _pie_cols = st.columns(len(_gu_list))
+        for _pi, _gu_name in enumerate(_gu_list):
+            with _pie_cols[_pi]:
+                _gu_sub = _gu_grade_all[_gu_grade_all["구"] == _gu_name]
+                _title = f"{_gu_name}" + (" (예측)" if _gu_name == "광명시" else "")
+                fig_pie = px.pie(
+                    _gu_sub, values="개소", names="등급",
+                    title=_title,
+                    color="등급",
+                    color_discrete_map={g: GRADE_COLORS[g] for g in ["A", "B", "C", "D"]},
+                    category_orders={"등급": ["A", "B", "C", "D"]},
+                )
+                fig_pie.update_traces(textposition="inside", textinfo="percent+value")
+                fig_pie.update_layout(
+                    **PLOTLY_LAYOUT, height=320, showlegend=True,
+                    legend=dict(orientation="h", y=-0.1),
+                    margin=dict(t=40, b=40, l=10, r=10),
+                )
+                plotly_chart(fig_pie, use_container_width=True)
 
-    st.markdown("<div style='height:20px;'></div>", unsafe_allow_html=True)
+        st.markdown("<div style='height:20px;'></div>", unsafe_allow_html=True)
 
     # ── (c) 등급별 시설 보유 현황 (Grouped Bar) ──
     st.markdown("##### 등급별 시설 보유 현황")
-    _grade_fac = df.groupby("등급")[FACILITY_COLS].mean().reindex(["A", "B", "C", "D"]).reset_index()
+    _city_by_grade = cube.by_grade(city_cube)
+    _grade_fac = cube.means(_city_by_grade, FACILITY_COLS).reset_index()
     _grade_fac_melt = _grade_fac.melt(id_vars="등급", var_name="시설종류", value_name="평균수량")
     fig_grade_fac = px.bar(
         _grade_fac_melt, x="시설종류", y="평균수량", color="등급",
@@ -1352,28 +1683,29 @@ with tab_facility:
         color_discrete_map={g: GRADE_COLORS[g] for g in ["A", "B", "C", "D"]},
     )
     fig_grade_fac.update_layout(**PLOTLY_LAYOUT, height=450)
-    st.plotly_chart(fig_grade_fac, use_container_width=True)
+    plotly_chart(fig_grade_fac, use_container_width=True)
 
     # ── (c-2) 성남 vs 광명 교당 평균 시설 비교 ──
-    st.markdown("<div style='height:20px;'></div>", unsafe_allow_html=True)
-    st.markdown("##### 성남 vs 광명 교당 평균 시설 수")
-    _sn_avg = df_sn[FACILITY_COLS].mean().rename("성남시")
-    _gm_avg = df_gm[FACILITY_COLS].mean().rename("광명시")
-    _cmp = pd.DataFrame({"성남시": _sn_avg, "광명시": _gm_avg}).reset_index()
-    _cmp.columns = ["시설종류", "성남시", "광명시"]
-    _cmp_melt = _cmp.melt(id_vars="시설종류", var_name="지역", value_name="교당 평균")
-    fig_cmp = px.bar(
-        _cmp_melt, x="시설종류", y="교당 평균", color="지역",
-        barmode="group", title="성남 vs 광명 — 교당 평균 시설 수 비교",
-        color_discrete_map={"성남시": "#27AE60", "광명시": "#E67E22"},
-    )
-    fig_cmp.update_layout(**PLOTLY_LAYOUT, height=400)
-    st.plotly_chart(fig_cmp, use_container_width=True)
+    if tab_facility.open:
+        st.markdown("<div style='height:20px;'></div>", unsafe_allow_html=True)
+        st.markdown("##### 성남 vs 광명 교당 평균 시설 수")
+        _sn_avg = df_sn[FACILITY_COLS].mean().rename("성남시")
+        _gm_avg = df_gm[FACILITY_COLS].mean().rename("광명시")
+        _cmp = pd.DataFrame({"성남시": _sn_avg, "광명시": _gm_avg}).reset_index()
+        _cmp.columns = ["시설종류", "성남시", "광명시"]
+        _cmp_melt = _cmp.melt(id_vars="시설종류", var_name="지역", value_name="교당 평균")
+        fig_cmp = px.bar(
+            _cmp_melt, x="시설종류", y="교당 평균", color="지역",
+            barmode="group", title="성남 vs 광명 — 교당 평균 시설 수 비교",
+            color_discrete_map={"성남시": "#27AE60", "광명시": "#E67E22"},
+        )
+        fig_cmp.update_layout(**PLOTLY_LAYOUT, height=400)
+        plotly_chart(fig_cmp, use_container_width=True)
     st.caption("※ 광명시 도로안전표지는 데이터 미수집으로 0 표시")
 
     # 인사이트 카드: A등급 vs D등급 시설 격차
-    _a_fac_avg = df[df["등급"] == "A"][FACILITY_COLS].mean()
-    _d_fac_avg = df[df["등급"] == "D"][FACILITY_COLS].mean()
+    _a_fac_avg = cube.means(_city_by_grade.loc["A"], FACILITY_COLS)
+    _d_fac_avg = cube.means(_city_by_grade.loc["D"], FACILITY_COLS)
     if not _a_fac_avg.isna().all() and not _d_fac_avg.isna().all():
         _ad_gap = (_a_fac_avg - _d_fac_avg).sort_values(ascending=False)
         _top3_gap = _ad_gap.head(3)
@@ -1405,7 +1737,7 @@ with tab_facility:
         labels={"_시설합계": "총 시설 수 (9개 합)", "발생건수": "사고 발생건수"},
     )
     fig_scatter.update_layout(**PLOTLY_LAYOUT, height=450)
-    st.plotly_chart(fig_scatter, use_container_width=True)
+    plotly_chart(fig_scatter, use_container_width=True)
 
     # 상관계수 표시
     _corr_fac_acc = df[["_시설합계", "발생건수"]].corr().iloc[0, 1]
@@ -1439,99 +1771,132 @@ with tab_facility:
         title="9개 시설물 상관관계 매트릭스",
         xaxis=dict(tickangle=45),
     )
-    st.plotly_chart(fig_heatmap, use_container_width=True)
+    plotly_chart(fig_heatmap, use_container_width=True)
 
     st.markdown("<div style='height:20px;'></div>", unsafe_allow_html=True)
 
-    # ── (e) 시설 갭 분석 테이블 ──
-    st.markdown("##### 시설 갭 분석")
-
-    if selected_school != "(전체)":
-        _sel_row = df[df["시설물명"] == selected_school]
-        if len(_sel_row) > 0:
-            _sel_row = _sel_row.iloc[0]
-            _all_avg = df[FACILITY_COLS].mean()
-            _a_avg = df[df["등급"] == "A"][FACILITY_COLS].mean()
-            _d_avg = df[df["등급"] == "D"][FACILITY_COLS].mean()
-
-            _gap_data = []
-            for _fc in FACILITY_COLS:
-                _gap_data.append({
-                    "시설물": _fc,
-                    "전체 평균": round(_all_avg[_fc], 1),
-                    "A등급 평균": round(_a_avg[_fc], 1),
-                    "D등급 평균": round(_d_avg[_fc], 1),
-                    f"{selected_school}": int(_sel_row[_fc]),
-                    "A등급 대비 부족분": max(0, round(_a_avg[_fc] - _sel_row[_fc], 1)),
-                })
-            st.dataframe(
-                pd.DataFrame(_gap_data),
-                use_container_width=True, hide_index=True,
-            )
-    else:
-        st.caption("전체 학교 시설 순위 (시설 합계 상위 20)")
-        _rank_df = df[["시설물명", "시설유형", "구", "등급", "_시설합계"]].copy()
-        _rank_df.columns = ["시설물명", "시설유형", "구", "등급", "시설합계"]
-        _rank_df = _rank_df.nlargest(20, "시설합계").reset_index(drop=True)
-        _rank_df.index = _rank_df.index + 1
-        st.dataframe(_rank_df, use_container_width=True)
+    @st.fragment(key="facility_gap")
+    def facility_gap_view(df):
+        """(e) 시설 갭 분석 + (f) 개별 레이더 — 선택 학교에만 의존"""
+        selected_school = current_school()
 
-    st.markdown("<div style='height:20px;'></div>", unsafe_allow_html=True)
+        # ── (e) 시설 갭 분석 테이블 ──
+        st.markdown("##### 시설 갭 분석")
 
-    # ── (f) 개별 학교 시설 레이더 차트 ──
-    st.markdown("##### 개별 시설 레이더 차트")
+        if selected_school != "(전체)":
+            _sel_row = df[df["시설물명"] == selected_school]
+            if len(_sel_row) > 0:
+                _sel_row = _sel_row.iloc[0]
+                _all_avg = df[FACILITY_COLS].mean()
+                _a_avg = df[df["등급"] == "A"][FACILITY_COLS].mean()
+                _d_avg = df[df["등급"] == "D"][FACILITY_COLS].mean()
+
+                _gap_data = []
+                for _fc in FACILITY_COLS:
+                    _gap_data.append({
+                        "시설물": _fc,
+                        "전체 평균": round(_all_avg[_fc], 1),
+                        "A등급 평균": round(_a_avg[_fc], 1),
+                        "D등급 평균": round(_d_avg[_fc], 1),
+                        f"{selected_school}": int(_sel_row[_fc]),
+                        "A등급 대비 부족분": max(0, round(_a_avg[_fc] - _sel_row[_fc], 1)),
+                    })
+                st.dataframe(
+                    pd.DataFrame(_gap_data),
+                    use_container_width=True, hide_index=True,
+                )
+        else:
+            st.caption("전체 학교 시설 순위 (시설 합계 상위 20)")
+            _rank_df = df[["시설물명", "시설유형", "구", "등급", "_시설합계"]].copy()
+            _rank_df.columns = ["시설물명", "시설유형", "구", "등급", "시설합계"]
+            _rank_df = _rank_df.nlargest(20, "시설합계").reset_index(drop=True)
+            _rank_df.index = _rank_df.index + 1
+            st.dataframe(_rank_df, use_container_width=True)
 
-    if selected_school != "(전체)":
-        _sel_r = df[df["시설물명"] == selected_school]
-        if len(_sel_r) > 0:
-            _sel_r = _sel_r.iloc[0]
-            _a_avg_r = df[df["등급"] == "A"][FACILITY_COLS].mean()
-
-            # 정규화 (max 기준 0~100)
-            _radar_vals = []
-            _radar_a_vals = []
-            for _fc in FACILITY_COLS:
-                _mx = df[_fc].max()
-                _radar_vals.append(_sel_r[_fc] / _mx * 100 if _mx > 0 else 0)
-                _radar_a_vals.append(_a_avg_r[_fc] / _mx * 100 if _mx > 0 else 0)
+        st.markdown("<div style='height:20px;'></div>", unsafe_allow_html=True)
 
-            _theta = FACILITY_COLS + [FACILITY_COLS[0]]
+        # ── (f) 개별 학교 시설 레이더 차트 ──
+        st.markdown("##### 개별 시설 레이더 차트")
 
-            fig_fac_radar = go.Figure()
-            fig_fac_radar.add_trace(go.Scatterpolar(
-                r=_radar_vals + [_radar_vals[0]],
-                theta=_theta,
-                fill="toself", name=selected_school,
-                fillcolor="rgba(27,79,114,0.2)",
-                line=dict(color="#2C3E50", width=2),
-            ))
-            fig_fac_radar.add_trace(go.Scatterpolar(
-                r=_radar_a_vals + [_radar_a_vals[0]],
-                theta=_theta,
-                fill="toself", name="A등급 평균",
-                fillcolor="rgba(39,174,96,0.1)",
-                line=dict(color="#27AE60", width=1, dash="dash"),
-            ))
-            fig_fac_radar.update_layout(
-                **PLOTLY_LAYOUT,
-                polar=dict(
-                    radialaxis=dict(visible=True, range=[0, 100], gridcolor="#F5CBA7"),
-                    angularaxis=dict(gridcolor="#F5CBA7"),
-                    bgcolor="#FAFCFF",
-                ),
-                title=f"{selected_school} 시설 현황 vs A등급 평균",
-                height=450, showlegend=True,
-                legend=dict(x=0.01, y=0.99),
+        if selected_school != "(전체)":
+            _sel_r = df[df["시설물명"] == selected_school]
+            if len(_sel_r) > 0:
+                _sel_r = _sel_r.iloc[0]
+                _a_avg_r = df[df["등급"] == "A"][FACILITY_COLS].mean()
+
+                # 정규화 (max 기준 0~100)
+                _radar_vals = []
+                _radar_a_vals = []
+                for _fc in FACILITY_COLS:
+                    _mx = df[_fc].max()
+                    _radar_vals.append(_sel_r[_fc] / _mx * 100 if _mx > 0 else 0)
+                    _radar_a_vals.append(_a_avg_r[_fc] / _mx * 100 if _mx > 0 else 0)
+
+                _theta = FACILITY_COLS + [FACILITY_COLS[0]]
+
+                fig_fac_radar = go.Figure()
+                fig_fac_radar.add_trace(go.Scatterpolar(
+                    r=_radar_vals + [_radar_vals[0]],
+                    theta=_theta,
+                    fill="toself", name=selected_school,
+                    fillcolor="rgba(27,79,114,0.2)",
+                    line=dict(color="#2C3E50", width=2),
+                ))
+                fig_fac_radar.add_trace(go.Scatterpolar(
+                    r=_radar_a_vals + [_radar_a_vals[0]],
+                    theta=_theta,
+                    fill="toself", name="A등급 평균",
+                    fillcolor="rgba(39,174,96,0.1)",
+                    line=dict(color="#27AE60", width=1, dash="dash"),
+                ))
+                fig_fac_radar.update_layout(
+                    **PLOTLY_LAYOUT,
+                    polar=dict(
+                        radialaxis=dict(visible=True, range=[0, 100], gridcolor="#F5CBA7"),
+                        angularaxis=dict(gridcolor="#F5CBA7"),
+                        bgcolor="#FAFCFF",
+                    ),
+                    title=f"{selected_school} 시설 현황 vs A등급 평균",
+                    height=450, showlegend=True,
+                    legend=dict(x=0.01, y=0.99),
+                )
+                plotly_chart(fig_fac_radar, use_container_width=True)
+        else:
+            st.markdown(
+                "<div style='background:#FEF5E7;padding:20px;border-radius:8px;"
+                "text-align:center;color:#E67E22;'>"
+                "사이드바에서 개별 시설을 선택하면<br>시설 레이더 차트가 표시됩니다."
+                "</div>",
+                unsafe_allow_html=True,
             )
-            st.plotly_chart(fig_fac_radar, use_container_width=True)
-    else:
-        st.markdown(
-            "<div style='background:#FEF5E7;padding:20px;border-radius:8px;"
-            "text-align:center;color:#E67E22;'>"
-            "사이드바에서 개별 시설을 선택하면<br>시설 레이더 차트가 표시됩니다."
-            "</div>",
-            unsafe_allow_html=True,
+
+    facility_gap_view(df)
+
+    # ── 시 전체 시설물 추가 효과 히트맵 (반사실 텐서) ──
+    @st.fragment(key="counterfactual_heatmap")
+    def counterfactual_heatmap_view(selected_city, recount_radius):
+        """학교 × 시설 +k 개 추가 시 사고확률 변화 — 슬라이더는 텐서 인덱싱만 다시 함"""
+        _cf, _cf_cols, _cf_names = load_counterfactuals(selected_city, recount_radius)
+        st.markdown("<div style='height:20px;'></div>", unsafe_allow_html=True)
+        st.markdown("##### 시설물 추가 효과 히트맵 (시 전체)")
+        _k = st.slider("추가 수량 (개)", 1, _cf.shape[2] - 1, 1, key="cf_units")
+        _delta = (_cf[:, :, _k] - _cf[:, :, 0]) * 100
+        _order = np.argsort(-_cf[:, 0, 0])
+        fig_cf = go.Figure(go.Heatmap(
+            z=_delta[_order], x=_cf_cols, y=[_cf_names[i] for i in _order],
+            colorscale="RdYlGn", reversescale=True, zmid=0,
+            colorbar=dict(title="%p"),
+            hovertemplate="%{y}<br>%{x} +" + str(_k) + "개: %{z:+.2f}%p<extra></extra>",
+        ))
+        fig_cf.update_layout(
+            **PLOTLY_LAYOUT, height=max(400, 12 * len(_cf_names)),
+            title=f"시설물 +{_k}개 추가 시 사고확률 변화 (현재 사고확률 높은 순)",
+            yaxis=dict(autorange="reversed", tickfont=dict(size=9)),
         )
+        plotly_chart(fig_cf, use_container_width=True)
+        st.caption("통합 모델의 학교 × 시설 × 추가 수량 전체 조합을 한 번에 계산해 둔 결과를 보여줍니다.")
+
+    counterfactual_heatmap_view(selected_city, recount_radius)
 
     st.markdown("---")
 
@@ -1540,24 +1905,22 @@ with tab_facility:
     # ══════════════════════════════════════
     st.markdown("##### 동네 환경 정보")
 
-    if selected_city == "성남시":
-        _dist_pop = load_population()
-    else:
-        _dist_pop = load_gm_population().dropna(subset=["어린이_비율"])
+    _dist_pop = load_city_population(selected_city)
     nat_df = load_national_stats()
 
     # 어린이 비율
-    pop_sorted = _dist_pop.sort_values("어린이_비율", ascending=True)
-    _pop_height = max(300, len(pop_sorted) * 35)
-    fig_pop = px.bar(
-        pop_sorted, x="어린이_비율", y="동명", orientation="h",
-        title=f"{selected_city} 행정동별 어린이(0~14세) 비율",
-        labels={"어린이_비율": "어린이 비율 (%)", "동명": ""},
-        color="어린이_비율",
-        color_continuous_scale=[[0, "#FEF9E7"], [0.5, "#F39C12"], [1, "#E67E22"]],
-    )
-    fig_pop.update_layout(**PLOTLY_LAYOUT, height=_pop_height, coloraxis_showscale=False)
-    st.plotly_chart(fig_pop, use_container_width=True)
+    if len(_dist_pop):
+        pop_sorted = _dist_pop.dropna(subset=["어린이_비율"]).sort_values("어린이_비율", ascending=True)
+        _pop_height = max(300, len(pop_sorted) * 35)
+        fig_pop = px.bar(
+            pop_sorted, x="어린이_비율", y="동명", orientation="h",
+            title=f"{selected_city} 행정동별 어린이(0~14세) 비율",
+            labels={"어린이_비율": "어린이 비율 (%)", "동명": ""},
+            color="어린이_비율",
+            color_continuous_scale=[[0, "#FEF9E7"], [0.5, "#F39C12"], [1, "#E67E22"]],
+        )
+        fig_pop.update_layout(**PLOTLY_LAYOUT, height=_pop_height, coloraxis_showscale=False)
+        plotly_chart(fig_pop, use_container_width=True)
 
     # 전국 추이
     fig_trend = go.Figure()
@@ -1587,12 +1950,13 @@ with tab_facility:
         legend=dict(x=0.01, y=0.99, bgcolor="rgba(255,255,255,0.8)",
                     bordercolor="#F5CBA7", borderwidth=1),
     )
-    st.plotly_chart(fig_trend, use_container_width=True)
+    plotly_chart(fig_trend, use_container_width=True)
 
     # 교통량 (성남시 기준 데이터)
     st.markdown("<div style='height:20px;'></div>", unsafe_allow_html=True)
-    traffic_df = load_traffic()
-    if len(traffic_df) > 0 and selected_city == "성남시":
+    _traffic_file = CITY_CONFIG[selected_city].get("traffic")
+    traffic_df = load_traffic(_traffic_file) if _traffic_file else pd.DataFrame()
+    if len(traffic_df) > 0:
         traffic_agg = traffic_df.groupby("호선명").agg(
             등교=("등교시간_합계", "mean"),
             하교=("하교시간_합계", "mean"),
@@ -1609,14 +1973,15 @@ with tab_facility:
             color_discrete_map={"등교": "#E67E22", "하교": "#F1C40F"},
         )
         fig_traffic.update_layout(**PLOTLY_LAYOUT, height=350)
-        st.plotly_chart(fig_traffic, use_container_width=True)
+        plotly_chart(fig_traffic, use_container_width=True)
 
     # 구별 안전점수
     st.markdown("<div style='height:20px;'></div>", unsafe_allow_html=True)
-    gu_scores = df.groupby("구").agg(
-        평균안전점수=("활성_안전점수", "mean"),
-        시설수=("시설물명", "count"),
-    ).reset_index().sort_values("평균안전점수", ascending=True)
+    _by_gu = cube.rollup(city_cube, ["구"])
+    gu_scores = pd.DataFrame({
+        "평균안전점수": cube.mean(_by_gu, "활성_안전점수"),
+        "시설수": _by_gu["n"],
+    }).reset_index().sort_values("평균안전점수", ascending=True)
 
     fig_gu = px.bar(
         gu_scores, x="평균안전점수", y="구", orientation="h",
@@ -1628,187 +1993,155 @@ with tab_facility:
     )
     fig_gu.update_traces(texttemplate="%{text}개소", textposition="outside")
     fig_gu.update_layout(**PLOTLY_LAYOUT, height=300, coloraxis_showscale=False)
-    st.plotly_chart(fig_gu, use_container_width=True)
-
-
-# ============================
-# 외부검증 AUC (모델분석탭에서 사용)
-# ============================
-from sklearn.metrics import roc_auc_score as _roc_auc
-_ext_valid = df_sn.dropna(subset=["structure_risk", "발생건수"])
-_ext_y = (_ext_valid["발생건수"] > 0).astype(int)
-extern_auc = float(_roc_auc(_ext_y, _ext_valid["structure_risk"])) if len(_ext_y.unique()) > 1 else 0.5
+    plotly_chart(fig_gu, use_container_width=True)
 
 
 # ============================
 # Tab 5: 광명 시뮬레이션
 # ============================
+profiling.mark("광명 시뮬레이션 탭")
 with tab_sim:
-    st.markdown("### 광명시 스쿨존 시뮬레이션")
-    st.caption(
-        "성남시 모델을 광명시 51개소에 적용하여 예상 안전점수·등급을 산출합니다. "
-        "광명시에 없는 도로안전표지는 0으로 처리됩니다."
-    )
-
-    # 이미 전역에서 계산된 df_gm 사용
-    gm_result = df_gm[["시설물명", "시설유형", "위도", "경도", "활성_안전점수", "등급"]].copy()
-    gm_result = gm_result.rename(columns={"활성_안전점수": "예상점수", "등급": "예상등급"})
-    gm_result["발생건수"] = df_gm["발생건수"].fillna(0).astype(int)
-    gm_result["어린이비율"] = df_gm["어린이비율"].fillna(10.0).round(1)
-
-    # ── (a) KPI ──
-    gm_k1, gm_k2, gm_k3, gm_k4 = st.columns(4)
-    gm_k1.metric("광명 시설 수", f"{len(gm_result)}개소")
-    gm_k2.metric("평균 예상점수", f"{gm_result['예상점수'].mean():.1f}")
-    gm_safe_pct = (gm_result["예상등급"].isin(["A", "B"])).sum() / len(gm_result) * 100
-    gm_k3.metric("안전(A+B) 비율", f"{gm_safe_pct:.0f}%")
-    gm_k4.metric("모델 R²", f"{model_r2:.3f}")
-
-    # ── (b) 광명 지도 ──
-    gm_map = folium.Map(
-        location=[df_gm["위도"].mean(), df_gm["경도"].mean()],
-        zoom_start=13, tiles=None,
-    )
-    folium.TileLayer(
-        tiles="https://mt0.google.com/vt/lyrs=r&hl=ko&x={x}&y={y}&z={z}",
-        attr="Google", name="기본 지도", max_zoom=22,
-    ).add_to(gm_map)
-
-    # 행정동 경계선
-    _gm_geo_sim = load_gm_geojson()
-    _gm_pop_sim = load_gm_population().dropna(subset=["어린이_비율"])
-    if _gm_geo_sim and _gm_geo_sim.get("features"):
-        _gm_choro = _gm_pop_sim[["동명", "어린이_비율"]].copy()
-        _gm_choro["adm_nm"] = "경기도 광명시 " + _gm_choro["동명"]
-        folium.Choropleth(
-            geo_data=_gm_geo_sim,
-            data=_gm_choro,
-            columns=["adm_nm", "어린이_비율"],
-            key_on="feature.properties.adm_nm",
-            fill_color="PuBu",
-            fill_opacity=0.15,
-            line_opacity=0.4,
-            legend_name="어린이 비율 (%)",
-            name="행정동 경계",
-        ).add_to(gm_map)
-        folium.GeoJson(
-            _gm_geo_sim,
-            name="행정동 구분선",
-            style_function=lambda _: {
-                "fillOpacity": 0,
-                "color": "#2C3E50",
-                "weight": 2,
-                "dashArray": "5,3",
-            },
-            tooltip=folium.GeoJsonTooltip(
-                fields=["adm_nm"],
-                aliases=["행정동"],
-                style="font-size:12px;font-weight:600;",
-            ),
-        ).add_to(gm_map)
-
-    for _, gm_r in gm_result.iterrows():
-        gm_color = GRADE_COLORS.get(gm_r["예상등급"], "#999")
-        folium.CircleMarker(
-            [gm_r["위도"], gm_r["경도"]],
-            radius=8, color="#fff", weight=2,
-            fill=True, fill_color=gm_color, fill_opacity=0.9,
-            tooltip=f"{gm_r['시설물명']} ({gm_r['시설유형']}) — {gm_r['예상등급']} ({gm_r['예상점수']:.1f}점)",
-        ).add_to(gm_map)
-    st_folium(gm_map, height=450, use_container_width=True, returned_objects=[])
-
-    # ── (c) 등급 분포 + 예측 결과 테이블 ──
-    gm_col1, gm_col2 = st.columns(2)
-    with gm_col1:
-        gm_grade_cnt = gm_result["예상등급"].value_counts().reindex(["A", "B", "C", "D"]).fillna(0).astype(int)
-        fig_gm_pie = px.pie(
-            names=gm_grade_cnt.index, values=gm_grade_cnt.values,
-            title="광명시 예상 등급 분포",
-            color=gm_grade_cnt.index,
-            color_discrete_map=GRADE_COLORS,
+    if tab_sim.open:
+        df_gm, cube_sn = compare_frame("광명시"), compare_cube("성남시")
+        st.markdown("### 광명시 스쿨존 시뮬레이션")
+        st.caption(
+            "성남시 모델을 광명시 51개소에 적용하여 예상 안전점수·등급을 산출합니다. "
+            "광명시에 없는 도로안전표지는 0으로 처리됩니다."
         )
-        fig_gm_pie.update_layout(**PLOTLY_LAYOUT, height=350)
-        st.plotly_chart(fig_gm_pie, use_container_width=True)
-
-    with gm_col2:
-        st.markdown("##### 예측 결과 (점수 하위순)")
-        gm_display = gm_result.sort_values("예상점수")[
-            ["시설물명", "시설유형", "예상등급", "예상점수", "발생건수"]
-        ].reset_index(drop=True)
-        gm_display.index = gm_display.index + 1
-        st.dataframe(gm_display, use_container_width=True, height=350)
 
-    st.markdown("---")
-
-    # ── (d) 성남 대비 비교 ──
-    st.markdown("##### 광명 vs 성남 비교")
-    gs_gavg_score = df_sn.groupby("등급")["활성_안전점수"].mean().reindex(["A", "B", "C", "D"])
-    gs_gavg_fac = df_sn.groupby("등급")[FACILITY_COLS].mean().reindex(["A", "B", "C", "D"])
-
-    gm_comp_col1, gm_comp_col2 = st.columns(2)
-    with gm_comp_col1:
-        gm_scomp = pd.DataFrame({
-            "구분": ["광명 평균"] + [f"성남 {g}등급" for g in ["A", "B", "C", "D"]],
-            "안전점수": [gm_result["예상점수"].mean()] + gs_gavg_score.tolist(),
-        })
-        fig_gm_sc = px.bar(
-            gm_scomp, x="구분", y="안전점수",
-            title="예상 안전점수: 광명 평균 vs 성남 등급별",
-            color="구분",
-            color_discrete_sequence=["#F39C12", "#154360", "#2471A3", "#85C1E9", "#E74C3C"],
-            text="안전점수",
+        gm_result = df_gm[["시설물명", "시설유형", "위도", "경도", "활성_안전점수", "등급"]].copy()
+        gm_result = gm_result.rename(columns={"활성_안전점수": "예상점수", "등급": "예상등급"})
+        gm_result["발생건수"] = df_gm["발생건수"].fillna(0).astype(int)
+        gm_result["어린이비율"] = df_gm["어린이비율"].fillna(10.0).round(1)
+
+        # ── (a) KPI ──
+        gm_k1, gm_k2, gm_k3, gm_k4 = st.columns(4)
+        gm_k1.metric("광명 시설 수", f"{len(gm_result)}개소")
+        gm_k2.metric("평균 예상점수", f"{gm_result['예상점수'].mean():.1f}")
+        gm_safe_pct = (gm_result["예상등급"].isin(["A", "B"])).sum() / len(gm_result) * 100
+        gm_k3.metric("안전(A+B) 비율", f"{gm_safe_pct:.0f}%")
+        gm_k4.metric("모델 R²", f"{model_r2:.3f}")
+
+        # ── (b) 광명 지도 ──
+        gm_map = folium.Map(
+            location=[df_gm["위도"].mean(), df_gm["경도"].mean()],
+            zoom_start=13, tiles=None,
         )
-        fig_gm_sc.update_traces(texttemplate="%{text:.1f}", textposition="outside")
-        fig_gm_sc.update_layout(**PLOTLY_LAYOUT, height=380, showlegend=False)
-        st.plotly_chart(fig_gm_sc, use_container_width=True)
-
-    with gm_comp_col2:
-        # 광명 평균 시설물 vs 성남 A/D등급
-        gm_fac_avg = df_gm[FACILITY_COLS].mean()
-        gm_fcomp = []
-        for gs_f in FACILITY_COLS:
-            gm_fcomp.append({"시설물": gs_f, "구분": "광명", "수량": round(float(gm_fac_avg[gs_f]), 1)})
-            gm_fcomp.append({"시설물": gs_f, "구분": "성남 A등급", "수량": round(gs_gavg_fac.loc["A", gs_f], 1)})
-            gm_fcomp.append({"시설물": gs_f, "구분": "성남 D등급", "수량": round(gs_gavg_fac.loc["D", gs_f], 1)})
-        fig_gm_fc = px.bar(
-            pd.DataFrame(gm_fcomp), x="시설물", y="수량",
-            color="구분", barmode="group",
-            title="시설물 평균: 광명 vs 성남 A/D등급",
-            color_discrete_map={"광명": "#F39C12", "성남 A등급": "#154360", "성남 D등급": "#E74C3C"},
+        folium.TileLayer(
+            tiles="https://mt0.google.com/vt/lyrs=r&hl=ko&x={x}&y={y}&z={z}",
+            attr="Google", name="기본 지도", max_zoom=22,
+        ).add_to(gm_map)
+
+        # 행정동 경계선
+        _gm_geo_sim = load_city_geojson("광명시", 13)
+        _gm_pop_sim = load_city_population("광명시").dropna(subset=["어린이_비율"])
+        if _gm_geo_sim and _gm_geo_sim.get("features"):
+            _gm_choro = _gm_pop_sim[["동명", "어린이_비율"]].copy()
+            _gm_choro["adm_nm"] = "경기도 광명시 " + _gm_choro["동명"]
+            add_boundary_layer(gm_map, _gm_geo_sim, _gm_choro, fill_opacity=0.15)
+
+        add_school_layer(
+            gm_map,
+            school_features(gm_result, city="광명시", detail=False, score_col="예상점수", grade_col="예상등급"),
+            detail=False,
         )
-        fig_gm_fc.update_layout(**PLOTLY_LAYOUT, height=380)
-        st.plotly_chart(fig_gm_fc, use_container_width=True)
-
-    # ── (e) D등급 개선 제안 ──
-    gm_d = gm_result[gm_result["예상등급"] == "D"]
-    if len(gm_d) > 0:
-        st.markdown("##### 광명시 D등급 예상 시설 — 우선 개선 대상")
-        for _, gm_r in gm_d.sort_values("예상점수").iterrows():
-            gm_row_data = df_gm[df_gm["시설물명"] == gm_r["시설물명"]].iloc[0]
-            worst = find_weakest_facility(gm_row_data, df_gm)
-            suggestion = f"{worst} 보강 필요 (현재 {int(gm_row_data[worst])}개)" if worst else "추가 분석 필요"
-            st.markdown(
-                f'<div class="suggestion-card">'
-                f'<span class="school-name">{gm_r["시설물명"]}</span> '
-                f'<span style="font-size:11px;color:#34495E;">({gm_r["시설유형"]})</span> &nbsp; '
-                f'<span style="background:#E74C3C;color:#fff;padding:2px 10px;'
-                f'border-radius:20px;font-size:11px;">D ({gm_r["예상점수"]:.1f}점)</span>'
-                f'<div class="suggestion">개선 제안: {suggestion}</div>'
-                f'</div>',
-                unsafe_allow_html=True,
+        with profiling.section("st_folium · 광명 시뮬레이션", "render"):
+            st_folium(gm_map, height=450, use_container_width=True, returned_objects=[])
+
+        # ── (c) 등급 분포 + 예측 결과 테이블 ──
+        gm_col1, gm_col2 = st.columns(2)
+        with gm_col1:
+            gm_grade_cnt = gm_result["예상등급"].value_counts().reindex(["A", "B", "C", "D"]).fillna(0).astype(int)
+            fig_gm_pie = px.pie(
+                names=gm_grade_cnt.index, values=gm_grade_cnt.values,
+                title="광명시 예상 등급 분포",
+                color=gm_grade_cnt.index,
+                color_discrete_map=GRADE_COLORS,
+            )
+            fig_gm_pie.update_layout(**PLOTLY_LAYOUT, height=350)
+            plotly_chart(fig_gm_pie, use_container_width=True)
+
+        with gm_col2:
+            st.markdown("##### 예측 결과 (점수 하위순)")
+            gm_display = gm_result.sort_values("예상점수")[
+                ["시설물명", "시설유형", "예상등급", "예상점수", "발생건수"]
+            ].reset_index(drop=True)
+            gm_display.index = gm_display.index + 1
+            st.dataframe(gm_display, use_container_width=True, height=350)
+
+        st.markdown("---")
+
+        # ── (d) 성남 대비 비교 ──
+        st.markdown("##### 광명 vs 성남 비교")
+        _sn_by_grade = cube.by_grade(cube_sn)
+        gs_gavg_score = cube.mean(_sn_by_grade, "활성_안전점수")
+        gs_gavg_fac = cube.means(_sn_by_grade, FACILITY_COLS)
+
+        gm_comp_col1, gm_comp_col2 = st.columns(2)
+        with gm_comp_col1:
+            gm_scomp = pd.DataFrame({
+                "구분": ["광명 평균"] + [f"성남 {g}등급" for g in ["A", "B", "C", "D"]],
+                "안전점수": [gm_result["예상점수"].mean()] + gs_gavg_score.tolist(),
+            })
+            fig_gm_sc = px.bar(
+                gm_scomp, x="구분", y="안전점수",
+                title="예상 안전점수: 광명 평균 vs 성남 등급별",
+                color="구분",
+                color_discrete_sequence=["#F39C12", "#154360", "#2471A3", "#85C1E9", "#E74C3C"],
+                text="안전점수",
+            )
+            fig_gm_sc.update_traces(texttemplate="%{text:.1f}", textposition="outside")
+            fig_gm_sc.update_layout(**PLOTLY_LAYOUT, height=380, showlegend=False)
+            plotly_chart(fig_gm_sc, use_container_width=True)
+
+        with gm_comp_col2:
+            # 광명 평균 시설물 vs 성남 A/D등급
+            gm_fac_avg = df_gm[FACILITY_COLS].mean()
+            gm_fcomp = []
+            for gs_f in FACILITY_COLS:
+                gm_fcomp.append({"시설물": gs_f, "구분": "광명", "수량": round(float(gm_fac_avg[gs_f]), 1)})
+                gm_fcomp.append({"시설물": gs_f, "구분": "성남 A등급", "수량": round(gs_gavg_fac.loc["A", gs_f], 1)})
+                gm_fcomp.append({"시설물": gs_f, "구분": "성남 D등급", "수량": round(gs_gavg_fac.loc["D", gs_f], 1)})
+            fig_gm_fc = px.bar(
+                pd.DataFrame(gm_fcomp), x="시설물", y="수량",
+                color="구분", barmode="group",
+                title="시설물 평균: 광명 vs 성남 A/D등급",
+                color_discrete_map={"광명": "#F39C12", "성남 A등급": "#154360", "성남 D등급": "#E74C3C"},
             )
+            fig_gm_fc.update_layout(**PLOTLY_LAYOUT, height=380)
+            plotly_chart(fig_gm_fc, use_container_width=True)
+
+        # ── (e) D등급 개선 제안 ──
+        gm_d = gm_result[gm_result["예상등급"] == "D"]
+        if len(gm_d) > 0:
+            st.markdown("##### 광명시 D등급 예상 시설 — 우선 개선 대상")
+            for _, gm_r in gm_d.sort_values("예상점수").iterrows():
+                gm_row_data = df_gm[df_gm["시설물명"] == gm_r["시설물명"]].iloc[0]
+                worst = find_weakest_facility(gm_row_data, df_gm)
+                suggestion = f"{worst} 보강 필요 (현재 {int(gm_row_data[worst])}개)" if worst else "추가 분석 필요"
+                st.markdown(
+                    f'<div class="suggestion-card">'
+                    f'<span class="school-name">{gm_r["시설물명"]}</span> '
+                    f'<span style="font-size:11px;color:#34495E;">({gm_r["시설유형"]})</span> &nbsp; '
+                    f'<span style="background:#E74C3C;color:#fff;padding:2px 10px;'
+                    f'border-radius:20px;font-size:11px;">D ({gm_r["예상점수"]:.1f}점)</span>'
+                    f'<div class="suggestion">개선 제안: {suggestion}</div>'
+                    f'</div>',
+                    unsafe_allow_html=True,
+                )
 
 
 # ============================
 # Tab 6: 모델 분석 (도로환경 통합)
 # ============================
+profiling.mark("모델 분석 탭")
 with tab_method:
     st.markdown("### 모델 분석")
     st.caption(
         "스쿨존 안전등급 분석에 사용된 데이터, 변수, 모델, 도로환경(CV) 분석 결과를 설명합니다."
     )
-    if selected_city == "광명시":
-        st.info("모델 학습은 성남시 데이터 기반이며, 광명시에는 학습된 모델을 적용합니다.")
+    if CITY_CONFIG[selected_city]["model_transfer"]:
+        st.info(f"모델 학습은 성남시 데이터 기반이며, {selected_city}에는 학습된 모델을 적용합니다.")
 
     # ── (a) 프로젝트 개요 ──
     st.markdown("##### 프로젝트 개요")
@@ -1868,8 +2201,8 @@ with tab_method:
     _sum_sn_path = DATA_DIR / "feature_summary_sn.csv"
     _sum_gm_path = DATA_DIR / "feature_summary_gm.csv"
     if _sum_sn_path.exists() and _sum_gm_path.exists():
-        _sum_sn = pd.read_csv(_sum_sn_path, index_col=0)
-        _sum_gm = pd.read_csv(_sum_gm_path, index_col=0)
+        _sum_sn = read_table(_sum_sn_path.name, encoding="utf-8", index_col=0)
+        _sum_gm = read_table(_sum_gm_path.name, encoding="utf-8", index_col=0)
 
         _sk_col1, _sk_col2 = st.columns(2)
 
@@ -1899,7 +2232,7 @@ with tab_method:
                     legend=dict(x=0.01, y=0.99, font=dict(size=10)),
                     margin=dict(b=80),
                 )
-                st.plotly_chart(fig_sk, use_container_width=True)
+                plotly_chart(fig_sk, use_container_width=True)
 
         _log_vars = _sum_sn[_sum_sn["변환방식"] == "Log+Standard"].index.tolist()
         st.markdown(
@@ -2030,7 +2363,7 @@ with tab_method:
         yaxis=dict(title="ROC-AUC", range=[0, 1]),
         xaxis=dict(title=""),
     )
-    st.plotly_chart(fig_auc, use_container_width=True)
+    plotly_chart(fig_auc, use_container_width=True)
 
     st.markdown(
         '<div style="background:linear-gradient(135deg,#FEF9E7,#FDEBD0);padding:14px 18px;'
@@ -2094,7 +2427,7 @@ with tab_method:
         xaxis=dict(title="계수"),
         yaxis=dict(title=""),
     )
-    st.plotly_chart(fig_coef, use_container_width=True)
+    plotly_chart(fig_coef, use_container_width=True)
 
     pos_vars = coef_sorted[coef_sorted["계수"] > 0].sort_values("계수", ascending=False)
     neg_vars = coef_sorted[coef_sorted["계수"] < 0].sort_values("계수")
@@ -2123,29 +2456,65 @@ with tab_method:
     st.markdown("<div style='height:16px;'></div>", unsafe_allow_html=True)
 
     # ── 시설별 사고 확률 예측 (개선 모델) ──
-    st.markdown("##### 시설별 사고 확률 예측 — 개선 통합 모델")
-    st.caption("SMOTE + 확률 보정(Calibration) + 상호작용 피처 적용. 보정 확률 기준 상위 20개소.")
-
-    df_for_prob = df_sn.dropna(subset=["사고확률"]).copy()
-    if len(df_for_prob) > 0:
-        _imp_with_score = df_for_prob.copy()
-        _prob_cols = ["시설물명", "시설유형", "구", "등급",
-                      "사고확률", "발생건수"]
-        if "IM_안전점수" in _imp_with_score.columns:
-            _prob_cols.insert(5, "IM_안전점수")
-            _prob_cols.insert(6, "IM_등급")
-        prob_display = _imp_with_score.nlargest(20, "사고확률")[
-            [c for c in _prob_cols if c in _imp_with_score.columns]
-        ].copy()
-        _rename = {"사고확률": "사고확률(보정)", "IM_안전점수": "모델안전점수",
-                   "IM_등급": "모델등급", "발생건수": "실제발생건수"}
-        prob_display = prob_display.rename(columns=_rename)
-        if "사고확률(보정)" in prob_display.columns:
-            prob_display["사고확률(보정)"] = prob_display["사고확률(보정)"].map("{:.1%}".format)
-        if "모델안전점수" in prob_display.columns:
-            prob_display["모델안전점수"] = prob_display["모델안전점수"].round(1)
-        st.dataframe(prob_display, use_container_width=True, hide_index=True)
-        st.caption(f"사고확률 상위 20개소 (전체 {len(df_for_prob)}개소 분석)")
+    if tab_method.open:
+        st.markdown("##### 시설별 사고 확률 예측 — 개선 통합 모델")
+        st.caption("SMOTE + 확률 보정(Calibration) + 상호작용 피처 적용. 보정 확률 기준 상위 20개소.")
+        df_for_prob = compare_frame("성남시").dropna(subset=["사고확률"]).copy()
+        if len(df_for_prob) > 0:
+            _imp_with_score = df_for_prob.copy()
+            _prob_cols = ["시설물명", "시설유형", "구", "등급",
+                          "사고확률", "발생건수"]
+            if "IM_안전점수" in _imp_with_score.columns:
+                _prob_cols.insert(5, "IM_안전점수")
+                _prob_cols.insert(6, "IM_등급")
+            prob_display = _imp_with_score.nlargest(20, "사고확률")[
+                [c for c in _prob_cols if c in _imp_with_score.columns]
+            ].copy()
+            _rename = {"사고확률": "사고확률(보정)", "IM_안전점수": "모델안전점수",
+                       "IM_등급": "모델등급", "발생건수": "실제발생건수"}
+            prob_display = prob_display.rename(columns=_rename)
+            if "사고확률(보정)" in prob_display.columns:
+                prob_display["사고확률(보정)"] = prob_display["사고확률(보정)"].map("{:.1%}".format)
+            if "모델안전점수" in prob_display.columns:
+                prob_display["모델안전점수"] = prob_display["모델안전점수"].round(1)
+            st.dataframe(prob_display, use_container_width=True, hide_index=True)
+            st.caption(f"사고확률 상위 20개소 (전체 {len(df_for_prob)}개소 분석)")
+
+    # ── 사고다발지 근접 피처 (임의 반경) ──
+    @st.fragment(key="hotspot_proximity")
+    def hotspot_proximity_view(city):
+        """반경을 바꿔 사고다발지_500m 류 피처를 다시 계산 — 슬라이더는 이 부분만 재실행"""
+        st.markdown("<div style='height:16px;'></div>", unsafe_allow_html=True)
+        st.markdown("##### 사고다발지 근접 피처 (반경 조정)")
+        _r = st.slider(
+            "반경 (m)", HOTSPOT_RADII[0], HOTSPOT_RADII[-1], hotspots.DEFAULT_RADIUS_M,
+            step=HOTSPOT_RADII[1] - HOTSPOT_RADII[0], key="hotspot_radius",
+        )
+        base = city_frame(city)
+        prox = hotspot_proximity(city, _r)
+        tag = f"{_r}m"
+        _tbl = base[["시설물명", "구", "등급", "발생건수"]].join(prox)
+        st.dataframe(
+            _tbl.nlargest(20, [f"사고다발지_{tag}", f"사고다발지_사상자수_{tag}"]),
+            use_container_width=True, hide_index=True,
+        )
+        fig_rc = go.Figure(go.Scatter(
+            x=HOTSPOT_RADII, y=hotspot_radius_corr(city), mode="lines+markers", line=dict(color="#E74C3C"),
+            hovertemplate="%{x}m: r=%{y:.3f}<extra></extra>",
+        ))
+        fig_rc.add_vline(x=_r, line_dash="dot", line_color="#888")
+        fig_rc.update_layout(
+            **PLOTLY_LAYOUT, height=320,
+            title="반경별 사고다발지 수 ↔ 실제 발생건수 상관", xaxis_title="반경 (m)", yaxis_title="Pearson r",
+        )
+        plotly_chart(fig_rc, use_container_width=True)
+        st.caption(
+            "SHAP 상 상위 피처인 사고다발지_500m 의 반경을 바꿔 봅니다. 다발지 대표점 BallTree 로 "
+            "반경 내 개수와 발생건수·사상자수·중상자수 합을 세며, 반경별 결과는 캐시됩니다."
+        )
+
+    if CITY_CONFIG[selected_city].get("hotspots"):
+        hotspot_proximity_view(selected_city)
 
     st.markdown("---")
 
@@ -2175,9 +2544,12 @@ with tab_method:
             },
         )
         fig_cv_grade.update_layout(**PLOTLY_LAYOUT, height=380)
-        st.plotly_chart(fig_cv_grade, use_container_width=True)
+        plotly_chart(fig_cv_grade, use_container_width=True)
 
-    with cv_col2:
+    @st.fragment(key="cv_profile")
+    def cv_profile_view(df_cv, cv_cols, cv_labels, selected_city):
+        """선택 학교 도로환경 레이더·로드뷰·유사 학교 (학교 선택 시 이 부분만 재실행)"""
+        selected_school = current_school()
         if selected_school != "(전체)" and selected_school in df_cv["시설물명"].values:
             cv_row = df_cv[df_cv["시설물명"] == selected_school].iloc[0]
             cv_avg = df_cv[cv_cols].mean()
@@ -2224,19 +2596,16 @@ with tab_method:
                 height=380, showlegend=True,
                 legend=dict(x=0.01, y=0.99),
             )
-            st.plotly_chart(fig_cv_radar, use_container_width=True)
+            plotly_chart(fig_cv_radar, use_container_width=True)
 
             # 로드뷰 + CV 게이지 오버레이
-            _cv_rv_name = selected_school.replace(" ", "_")
-            _cv_rv_path = DATA_DIR / "roadview" / f"{_cv_rv_name}_북쪽.jpg"
-            if not _cv_rv_path.exists():
-                _cv_rv_path = DATA_DIR / "roadview" / f"{selected_school}_북쪽.jpg"
+            _cv_rv_img = roadview_image(selected_city, selected_school, "card")
 
             st.markdown("##### 로드뷰 + CV 분석 결과")
             _rv_col, _gauge_col = st.columns([3, 2])
             with _rv_col:
-                if _cv_rv_path.exists():
-                    st.image(str(_cv_rv_path), caption=f"{selected_school} 북쪽 방향", use_container_width=True)
+                if _cv_rv_img is not None:
+                    st.image(_cv_rv_img, caption=f"{selected_school} 북쪽 방향", use_container_width=True)
                 else:
                     st.info("로드뷰 이미지 없음")
             with _gauge_col:
@@ -2273,26 +2642,17 @@ with tab_method:
             st.markdown("<div style='height:20px;'></div>", unsafe_allow_html=True)
             st.markdown("##### 유사 도로환경 학교")
             st.caption("CV 5개 지표 기반 코사인 유사도 — 도로환경이 비슷한 학교를 비교합니다.")
-            _cv_feats = cv_cols
-            _cv_valid = df_cv.dropna(subset=_cv_feats).copy()
-            if len(_cv_valid) > 1 and selected_school in _cv_valid["시설물명"].values:
-                from sklearn.metrics.pairwise import cosine_similarity as _cos_sim
-                _cv_mat = _cv_valid[_cv_feats].values
-                _sel_idx = _cv_valid[_cv_valid["시설물명"] == selected_school].index[0]
-                _sel_vec = _cv_valid.loc[_sel_idx, _cv_feats].values.reshape(1, -1)
-                _sims = _cos_sim(_sel_vec, _cv_mat)[0]
-                _cv_valid["유사도"] = _sims
-                _similar = _cv_valid[_cv_valid["시설물명"] != selected_school].nlargest(5, "유사도")
+            _neighbors = load_cv_neighbors(selected_city).get(selected_school)
+            if _neighbors is not None and len(_neighbors[0]) > 0:
+                _sim_labels, _sim_vals = _neighbors
+                _similar = df_cv.loc[_sim_labels].assign(유사도=_sim_vals)
 
                 _sim_cols = st.columns(5)
                 for _si, (_, _sr) in enumerate(_similar.iterrows()):
                     with _sim_cols[_si]:
-                        _s_rv = _sr["시설물명"].replace(" ", "_")
-                        _s_path = DATA_DIR / "roadview" / f"{_s_rv}_북쪽.jpg"
-                        if not _s_path.exists():
-                            _s_path = DATA_DIR / "roadview" / f"{_sr['시설물명']}_북쪽.jpg"
-                        if _s_path.exists():
-                            st.image(str(_s_path), use_container_width=True)
+                        _s_img = roadview_image(selected_city, _sr["시설물명"], "thumb")
+                        if _s_img is not None:
+                            st.image(_s_img, use_container_width=True)
                         _s_grade = _sr.get("등급", _sr.get("등급_V6", "?"))
                         _s_color = GRADE_COLORS.get(_s_grade, "#999")
                         st.markdown(
@@ -2321,6 +2681,9 @@ with tab_method:
                 unsafe_allow_html=True,
             )
 
+    with cv_col2:
+        cv_profile_view(df_cv, cv_cols, cv_labels, selected_city)
+
     # ── A등급 vs D등급 도로환경 비교 ──
     st.markdown("---")
     _a_schools = df_cv[df_cv["등급"] == "A"].copy()
@@ -2347,12 +2710,9 @@ with tab_method:
                     f'font-weight:600;">{_ad_row["시설물명"]}</div></div>',
                     unsafe_allow_html=True,
                 )
-                _ad_rv = _ad_row["시설물명"].replace(" ", "_")
-                _ad_path = DATA_DIR / "roadview" / f"{_ad_rv}_북쪽.jpg"
-                if not _ad_path.exists():
-                    _ad_path = DATA_DIR / "roadview" / f"{_ad_row['시설물명']}_북쪽.jpg"
-                if _ad_path.exists():
-                    st.image(str(_ad_path), use_container_width=True)
+                _ad_img = roadview_image(selected_city, _ad_row["시설물명"], "card")
+                if _ad_img is not None:
+                    st.image(_ad_img, use_container_width=True)
                 else:
                     st.info("로드뷰 이미지 없음")
 
@@ -2439,6 +2799,12 @@ with tab_method:
     )
 
 
+# ── 실행 계측 패널 (opt-in) ──
+_profile = profiling.finish()
+if _profile:
+    render_profile_panel(_profile, warm_state)
+
+
 # ──────────────────────────────────────────────
 # 7. Footer
 # ──────────────────────────────────────────────
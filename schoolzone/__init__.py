@@ -0,0 +1,3 @@
+"""
+스쿨존 안전 분석 — 대시보드(app.py)와 공유하는 데이터·모델 계층
+"""
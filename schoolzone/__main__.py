@@ -0,0 +1,52 @@
+"""
+명령행 진입점
+
+    python -m schoolzone score zones.csv -o scored.parquet [--chunksize 50000]
+    python -m schoolzone serve [--port 8765]     # 로컬 점수 HTTP 서버 (schoolzone.serve)
+"""
+
+import argparse
+import sys
+import time
+
+from schoolzone import batch, serve as serving
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m schoolzone", description="스쿨존 안전 분석 명령")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    score = sub.add_parser("score", help="스쿨존 파일(CSV/Parquet) 배치 점수 산출")
+    score.add_argument("input", help="입력 파일 (.csv 또는 .parquet)")
+    score.add_argument("-o", "--output", required=True, help="출력 파일 (.parquet 또는 .csv)")
+    score.add_argument("--chunksize", type=int, default=batch.DEFAULT_CHUNKSIZE,
+                       help=f"한 번에 읽는 행 수 (기본 {batch.DEFAULT_CHUNKSIZE:,})")
+
+    serve = sub.add_parser("serve", help="로컬 점수 HTTP 서버 (요청 마이크로배칭)")
+    serve.add_argument("--host", default=serving.DEFAULT_HOST, help=f"바인딩 주소 (기본 {serving.DEFAULT_HOST})")
+    serve.add_argument("--port", type=int, default=serving.DEFAULT_PORT, help=f"포트 (기본 {serving.DEFAULT_PORT})")
+    serve.add_argument("--max-batch", type=int, default=serving.DEFAULT_MAX_BATCH,
+                       help=f"한 번에 추론할 최대 행 수 (기본 {serving.DEFAULT_MAX_BATCH})")
+    serve.add_argument("--max-wait-ms", type=float, default=serving.DEFAULT_MAX_WAIT_MS,
+                       help=f"배치를 모으는 최대 대기 ms (기본 {serving.DEFAULT_MAX_WAIT_MS:g})")
+    args = parser.parse_args(argv)
+
+    if args.command == "score":
+        started = time.perf_counter()
+        rows = batch.score_file(args.input, args.output, chunksize=args.chunksize)
+        print(f"{rows:,}개소 → {args.output} ({time.perf_counter() - started:.1f}s)", file=sys.stderr)
+    elif args.command == "serve":
+        started = time.perf_counter()
+        server = serving.make_server(args.host, args.port, args.max_batch, args.max_wait_ms)
+        print(f"모델 준비 {time.perf_counter() - started:.1f}s · http://{args.host}:{args.port} "
+              "(POST /score, GET /metrics)", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+
+if __name__ == "__main__":
+    main()
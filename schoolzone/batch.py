@@ -0,0 +1,152 @@
+"""
+임의 스쿨존 파일 배치 점수 산출 — Streamlit 없이 cron 등에서 사용
+
+    python -m schoolzone score zones.csv -o scored.parquet [--chunksize 50000]
+
+입력 한 행 = 스쿨존 하나. 시설 9종(FACILITY_COLS)·발생건수·어린이비율과, 있으면
+CV 도로 구조 피처(p_wide … 또는 CV_도로폭확률 …)나 structure_risk 를 읽어
+
+- structure_risk : 1단계 구조 모델 (CV 피처가 없으면 학습 데이터 중앙값)
+- 사고확률       : 2단계 통합 모델
+- 활성_안전점수·등급 : 성남 V6 회귀 이식 점수 + 성남 사분위 등급 (광명 LR fallback 과 같은 경로)
+
+을 붙인다. IM/V6 결과 파일 병합은 성남·광명 학교에만 있는 값이라 여기서는 하지 않는다.
+입력은 chunksize 행씩 읽고 바로 써서 파일 크기와 관계없이 메모리가 일정하다.
+결측 대체값은 모두 학습 데이터에서 정해 두므로 청크 크기가 결과를 바꾸지 않는다.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from schoolzone import build, models, scoring
+from schoolzone.config import FACILITY_COLS, GRADE_LABELS
+from schoolzone.store import read_table
+
+DEFAULT_CHUNKSIZE = 50_000
+
+# CV_RENAME 역매핑 — 대시보드 표기 컬럼으로 들어와도 구조 모델 입력으로 쓴다
+CV_SOURCE_NAMES = {v: k for k, v in scoring.CV_RENAME.items()}
+
+# 청크마다 dtype 이 흔들리지 않도록 숫자로 고정해 읽는 컬럼 (나머지는 문자열)
+NUMERIC_COLUMNS = (
+    FACILITY_COLS + ["발생건수", "어린이비율", "어린이 비율(%)", "structure_risk", "위도", "경도"]
+    + models.STRUCTURE_FEATURES + list(CV_SOURCE_NAMES)
+)
+
+OUTPUT_COLUMNS = ["structure_risk", "사고확률", "활성_안전점수", "등급", "안전등급"]
+
+# 같은 값의 다른 표기 → 점수 산출이 읽는 원본 이름
+ALIASES = {**CV_SOURCE_NAMES, "어린이 비율(%)": "어린이비율"}
+
+# 점수 산출이 읽는 입력 컬럼 전체 (별칭을 푼 이름 기준) — 서버는 요청마다 이 스키마로 맞춘다
+INPUT_COLUMNS = FACILITY_COLS + ["발생건수", "어린이비율", "structure_risk"] + models.STRUCTURE_FEATURES
+
+
+def load_scoring_models():
+    """배치 점수에 필요한 모델·기준값 묶음 (모델은 data/.models/ 캐시 경유)"""
+    sn_raw = read_table("스쿨존_팀통합_최종.csv")
+    struct_model, _, fac_risk = models.load_or_train(
+        models.train_structure_model, read_table("accidentlevel_addData.csv")
+    )
+    integ_model, integ_feats = models.load_or_train(
+        models.train_integrated_model, read_table("2_DatasetFor2ndData.csv")
+    )[:2]
+    safety_model, safety_feats, _ = models.load_or_train(models.train_safety_model, sn_raw)
+    return {
+        "structure": struct_model,
+        "integrated": (integ_model, list(integ_feats)),
+        "safety": (safety_model, list(safety_feats)),
+        "thresholds": build.load_or_build()[1]["grade_thresholds"],
+        "structure_risk_fill": float(fac_risk["structure_risk"].median()),
+        "child_fill": float(sn_raw["어린이비율"].median()),
+    }
+
+
+def resolve_aliases(df):
+    """별칭 컬럼(CV 표기명·'어린이 비율(%)')을 원본 이름 하나로 합친 새 프레임
+    (둘 다 있으면 행마다 원본 값 우선, 결측인 행만 별칭 값)"""
+    out = df.copy()
+    for alias, name in ALIASES.items():
+        if alias not in out.columns:
+            continue
+        if name in out.columns:
+            out[name] = out[name].fillna(out.pop(alias))
+        else:
+            out = out.rename(columns={alias: name})
+    return out
+
+
+def score_zones(df, bundle):
+    """스쿨존 프레임 → OUTPUT_COLUMNS 를 붙인 새 프레임 (순수 함수, 행 단위 독립)"""
+    out = resolve_aliases(df)
+    for _fc in FACILITY_COLS:
+        out[_fc] = out[_fc].fillna(0) if _fc in out.columns else 0.0
+    if "어린이비율" not in out.columns:
+        out["어린이비율"] = np.nan
+    out["어린이비율"] = out["어린이비율"].fillna(bundle["child_fill"])
+    out["어린이 비율(%)"] = out["어린이비율"]
+
+    # structure_risk: 입력값 > CV 피처로 구조 모델 > 학습 데이터 중앙값
+    risk = out["structure_risk"] if "structure_risk" in out.columns else pd.Series(np.nan, index=out.index)
+    feats = models.STRUCTURE_FEATURES
+    if all(f in out.columns for f in feats):
+        has_cv = risk.isna() & out[feats].notna().all(axis=1)
+        if has_cv.any():
+            risk = risk.copy()
+            risk[has_cv] = bundle["structure"].predict_proba(out.loc[has_cv, feats].to_numpy(dtype=float))[:, 1]
+    out["structure_risk"] = risk.fillna(bundle["structure_risk_fill"])
+
+    integ_model, integ_feats = bundle["integrated"]
+    out["사고확률"] = integ_model.predict_proba(out[integ_feats].astype(float).fillna(0))[:, 1]
+
+    safety_model, safety_feats = bundle["safety"]
+    out["활성_안전점수"], out["등급"] = scoring.predict_safety(
+        out, safety_model, bundle["thresholds"], feats=safety_feats, child_fill=bundle["child_fill"],
+    )
+    out["안전등급"] = out["등급"].map(GRADE_LABELS)
+    return out
+
+
+def _read_chunks(path, chunksize):
+    """입력 파일을 chunksize 행씩 (CSV 는 숫자 컬럼 float · 나머지 문자열로 고정)"""
+    path = Path(path)
+    if path.suffix.lower() == ".parquet":
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+        return
+    header = pd.read_csv(path, nrows=0, encoding="utf-8-sig").columns
+    dtype = {c: ("float64" if c in NUMERIC_COLUMNS else "string") for c in header}
+    yield from pd.read_csv(path, chunksize=chunksize, dtype=dtype, encoding="utf-8-sig")
+
+
+def score_file(src, dst, chunksize=DEFAULT_CHUNKSIZE, bundle=None):
+    """src(CSV/Parquet) 를 청크 단위로 점수 산출해 dst(.parquet/.csv) 에 쓴다. 처리 행 수 반환"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    bundle = bundle or load_scoring_models()
+    dst = Path(dst)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    as_csv = dst.suffix.lower() == ".csv"
+    writer, schema, rows = None, None, 0
+    try:
+        for chunk in _read_chunks(src, chunksize):
+            scored = score_zones(chunk, bundle)
+            if as_csv:
+                scored.to_csv(dst, mode="w" if rows == 0 else "a", header=rows == 0,
+                              index=False, encoding="utf-8-sig" if rows == 0 else "utf-8")
+            else:
+                table = pa.Table.from_pandas(scored, schema=schema, preserve_index=False)
+                if writer is None:
+                    schema = table.schema
+                    writer = pq.ParquetWriter(dst, schema)
+                writer.write_table(table)
+            rows += len(scored)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
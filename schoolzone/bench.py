@@ -0,0 +1,377 @@
+"""
+성능 벤치마크 — 콜드 스타트, rerun 지연, 페이로드 크기, 지도 빌드, 탭 렌더, 모델 학습
+
+    python -m schoolzone.bench                          # 전체 시나리오 → data/.bench/<커밋>.json
+    python -m schoolzone.bench --only map,train -r 5    # 일부 시나리오만, 5회 반복 중앙값
+    python -m schoolzone.bench --compare old.json new.json   # 회귀 비교 (회귀 있으면 종료 코드 1)
+
+앱 시나리오는 Streamlit AppTest 로 app.py 를 실제 스크립트 실행과 같은 경로로 돌린다.
+지도 빌드는 app.py 를 bare 모드(runpy)로 한 번 실행해 얻은 create_map·create_overlay_group 을
+직접 호출해 잰다. 디스크 캐시(data/.cache · .artifacts · .models)는 데워진 상태 기준이다.
+
+결과 JSON: {"meta": {커밋·버전·시각}, "results": {시나리오: {지표: 중앙값}}, "runs": {… 반복 원값}}
+지표 이름 접미사 _s 는 초, _bytes 는 바이트.
+"""
+
+import argparse
+import json
+import logging
+import platform
+import runpy
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from schoolzone.store import DATA_DIR
+
+BASE_DIR = DATA_DIR.parent
+APP_PATH = BASE_DIR / "app.py"
+BENCH_DIR = DATA_DIR / ".bench"
+
+SCENARIOS = ["cold", "cities", "sidebar", "tabs", "map", "train"]
+
+APP_TIMEOUT_S = 600
+# app.py 메인 st.tabs 의 key (열린 탭 라벨)
+TAB_KEY = "main_tab"
+
+# --compare: 이보다 느려지거나 커지면 회귀 (상대 비율, 지표 종류별 최소 절대 차이)
+REGRESSION_RATIO = 0.2
+REGRESSION_MIN_ABS = {"_s": 0.02, "_bytes": 1024}
+
+_IMPORT_SNIPPET = (
+    "import streamlit, folium, plotly, pandas, sklearn, streamlit_folium;"
+    "import schoolzone.build, schoolzone.cities, schoolzone.models, schoolzone.scoring"
+)
+_COLD_RUN_SNIPPET = (
+    "import json, time, logging; logging.disable(logging.CRITICAL);"
+    "from streamlit.testing.v1 import AppTest;"
+    f"at = AppTest.from_file({str(APP_PATH)!r}, default_timeout={APP_TIMEOUT_S});"
+    "t = time.perf_counter(); at.run();"
+    "print(json.dumps({'first_run_s': time.perf_counter() - t, 'exceptions': len(at.exception)}))"
+)
+
+
+def _timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+
+def _app():
+    from streamlit.testing.v1 import AppTest
+
+    return AppTest.from_file(str(APP_PATH), default_timeout=APP_TIMEOUT_S)
+
+
+def _check(at, what):
+    if len(at.exception):
+        raise RuntimeError(f"{what}: 앱 예외 {at.exception[0].value}")
+
+
+def _tree_bytes(at):
+    """현재 요소 트리의 직렬화 바이트 (브라우저로 가는 delta 페이로드 근사)"""
+    total, stack = 0, [at._tree]
+    while stack:
+        node = stack.pop()
+        children = getattr(node, "children", None)
+        if isinstance(children, dict):
+            stack.extend(children.values())
+        proto = getattr(node, "proto", None)
+        if proto is not None and hasattr(proto, "ByteSize"):
+            total += proto.ByteSize()
+    return total
+
+
+def _subprocess_env():
+    import os
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(BASE_DIR), env.get("PYTHONPATH")]))
+    return env
+
+
+def bench_cold(repeat):
+    """새 프로세스: 의존성 import, AppTest 첫 실행 (프로세스 시작 포함)"""
+    runs = {"import_s": [], "cold_start_s": [], "cold_first_run_s": []}
+    for _ in range(repeat):
+        elapsed, _ = _timed(lambda: subprocess.run(
+            [sys.executable, "-c", _IMPORT_SNIPPET], cwd=BASE_DIR, env=_subprocess_env(), check=True,
+        ))
+        runs["import_s"].append(elapsed)
+        elapsed, proc = _timed(lambda: subprocess.run(
+            [sys.executable, "-c", _COLD_RUN_SNIPPET], cwd=BASE_DIR, env=_subprocess_env(),
+            check=True, capture_output=True, text=True,
+        ))
+        out = json.loads(proc.stdout.strip().splitlines()[-1])
+        if out["exceptions"]:
+            raise RuntimeError("cold start: 앱 예외")
+        runs["cold_start_s"].append(elapsed)
+        runs["cold_first_run_s"].append(out["first_run_s"])
+    return runs
+
+
+def bench_cities(repeat):
+    """도시별 첫 전체 렌더 (프로세스 안에서 그 도시를 처음 고를 때) + 페이로드"""
+    runs = {}
+    for _ in range(repeat):
+        at = _app()
+        elapsed, _ = _timed(at.run)
+        _check(at, "첫 렌더")
+        city_radio = at.sidebar.radio[0]
+        default = city_radio.value
+        runs.setdefault(f"first_render_{default}_s", []).append(elapsed)
+        runs.setdefault(f"payload_{default}_bytes", []).append(_tree_bytes(at))
+        for city in city_radio.options:
+            if city == default:
+                continue
+            elapsed, _ = _timed(at.sidebar.radio[0].set_value(city).run)
+            _check(at, f"{city} 렌더")
+            runs.setdefault(f"first_render_{city}_s", []).append(elapsed)
+            runs.setdefault(f"payload_{city}_bytes", []).append(_tree_bytes(at))
+    return runs
+
+
+def _sidebar_steps(at):
+    """(이름, 바꾸기, 되돌리기) — 사이드바 컨트롤마다 한 단계"""
+    steps = []
+    for box in at.sidebar.selectbox:
+        label, first = box.label, box.value
+        steps.append((label, lambda a, l=label: _widget(a, "selectbox", l).set_value(_widget(a, "selectbox", l).options[1]),
+                      lambda a, l=label, v=first: _widget(a, "selectbox", l).set_value(v)))
+    for ms in at.sidebar.multiselect:
+        label, full = ms.label, list(ms.value)
+        if len(full) < 2:
+            continue
+        steps.append((label, lambda a, l=label, v=full: _widget(a, "multiselect", l).set_value(v[:1]),
+                      lambda a, l=label, v=full: _widget(a, "multiselect", l).set_value(v)))
+    for cb in at.sidebar.checkbox:
+        label = cb.label
+        steps.append((label, lambda a, l=label: _widget(a, "checkbox", l).set_value(not _widget(a, "checkbox", l).value),
+                      lambda a, l=label: _widget(a, "checkbox", l).set_value(not _widget(a, "checkbox", l).value)))
+    return steps
+
+
+def _widget(at, kind, label):
+    return next(w for w in getattr(at.sidebar, kind) if w.label == label)
+
+
+def bench_sidebar(repeat):
+    """사이드바 컨트롤 하나를 바꿨을 때의 rerun 지연 (학교 선택은 fragment rerun)"""
+    at = _app()
+    at.run()
+    _check(at, "첫 렌더")
+    runs = {}
+    for name, change, revert in _sidebar_steps(at):
+        for _ in range(repeat):
+            change(at)
+            elapsed, _ = _timed(at.run)
+            _check(at, name)
+            runs.setdefault(f"rerun_{name}_s", []).append(elapsed)
+            # fragment rerun 뒤에는 트리에 사이드바가 없으므로 전체 실행으로 복구
+            at.run()
+            revert(at)
+            at.run()
+    return runs
+
+
+class _TimedTab:
+    """st.tabs 컨테이너 대리자 — with 블록 시간을 라벨별로 누적"""
+
+    def __init__(self, tab, label, sink):
+        self._tab, self._label, self._sink = tab, label, sink
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self._tab.__enter__()
+
+    def __exit__(self, *exc):
+        result = self._tab.__exit__(*exc)
+        self._sink[self._label] = self._sink.get(self._label, 0.0) + time.perf_counter() - self._started
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self._tab, name)
+
+
+def bench_tabs(repeat):
+    """탭별 렌더 시간 (st.tabs 를 감싸 with 블록 구간을 잰다)"""
+    import streamlit as st
+
+    original = st.tabs
+    sink = {}
+    main_labels = []
+
+    def timed_tabs(labels, *args, **kwargs):
+        if kwargs.get("key") == TAB_KEY and not main_labels:
+            main_labels.extend(labels)
+        return [_TimedTab(t, label, sink) for t, label in zip(original(labels, *args, **kwargs), labels)]
+
+    runs = {}
+    st.tabs = timed_tabs
+    try:
+        at = _app()
+        at.run()
+        # 열린 탭만 본문 전체를 실행하므로 탭마다 열고 잰다 (AppTest 는 탭 상태를 다시 보내지 않아 실행마다 지정)
+        for label in list(main_labels):
+            at.session_state[TAB_KEY] = label
+            at.run()  # 캐시 데우기
+            for _ in range(repeat):
+                sink.clear()
+                at.session_state[TAB_KEY] = label
+                at.run()
+                _check(at, "탭 렌더")
+                runs.setdefault(f"tab_{label.strip()}_s", []).append(sink[label])
+    finally:
+        st.tabs = original
+    return runs
+
+
+def bench_map(repeat):
+    """create_map 빌드 시간·HTML 크기 — 오버레이 0 / 3 / 전체"""
+    g = runpy.run_path(str(APP_PATH), run_name="__bench__")
+    city = g["selected_city"]
+    keys = [k for k in g["OVERLAY_LAYERS"] if k in g["CITY_CONFIG"][city]["overlays"]]
+    variants = {"0": [], "3": keys[:3], "all": keys}
+    pop_df = g["load_city_population"](city)
+    geo = g["load_city_geojson"](city, g["CITY_CONFIG"][city]["zoom"])
+
+    def build(enabled):
+        m = g["create_map"](g["filtered_df"], pop_df, geo, "(전체)", city=city)
+        if enabled:
+            zoom = m.options.get("zoom")
+            bounds = g["spatial"].approx_bounds(m.location, zoom)
+            g["create_overlay_group"](city, {k: True for k in enabled}, bounds, zoom).add_to(m)
+        return m.get_root().render()
+
+    runs = {}
+    for name, enabled in variants.items():
+        build(enabled)  # 오버레이 뷰 캐시 데우기
+        for _ in range(repeat):
+            elapsed, html = _timed(lambda: build(enabled))
+            runs.setdefault(f"map_overlays_{name}_s", []).append(elapsed)
+            runs.setdefault(f"map_overlays_{name}_bytes", []).append(len(html.encode("utf-8")))
+    return runs
+
+
+def bench_train(repeat):
+    """모델 학습 시간 (캐시 없이 train_* 직접) + 디스크 캐시 적중 시 로드 시간"""
+    from schoolzone import models
+    from schoolzone.store import read_table
+
+    inputs = {
+        models.train_safety_model: read_table("스쿨존_팀통합_최종.csv"),
+        models.train_structure_model: read_table("accidentlevel_addData.csv"),
+        models.train_integrated_model: read_table("2_DatasetFor2ndData.csv"),
+    }
+    runs = {}
+    for trainer, df in inputs.items():
+        name = trainer.__name__.removeprefix("train_")
+        models.load_or_train(trainer, df)
+        for _ in range(repeat):
+            runs.setdefault(f"train_{name}_s", []).append(_timed(lambda: trainer(df))[0])
+            runs.setdefault(f"load_{name}_s", []).append(_timed(lambda: models.load_or_train(trainer, df))[0])
+    return runs
+
+
+BENCHES = {
+    "cold": bench_cold, "cities": bench_cities, "sidebar": bench_sidebar,
+    "tabs": bench_tabs, "map": bench_map, "train": bench_train,
+}
+
+
+def _git(*args):
+    try:
+        return subprocess.run(["git", *args], cwd=BASE_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(scenarios=SCENARIOS, repeat=3):
+    """시나리오 실행 → 결과 dict (meta / results 중앙값 / runs 원값)"""
+    import pandas
+    import sklearn
+    import streamlit
+
+    report = {
+        "meta": {
+            "commit": _git("rev-parse", "--short", "HEAD") or "unknown",
+            "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "repeat": repeat,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "streamlit": streamlit.__version__,
+            "pandas": pandas.__version__,
+            "sklearn": sklearn.__version__,
+        },
+        "results": {},
+        "runs": {},
+    }
+    # bare 모드 경고·앱 로그가 측정 구간에 섞이지 않도록
+    logging.disable(logging.ERROR)
+    try:
+        for name in scenarios:
+            started = time.perf_counter()
+            runs = BENCHES[name](repeat)
+            report["runs"][name] = runs
+            report["results"][name] = {k: statistics.median(v) for k, v in runs.items()}
+            print(f"{name}: {len(runs)}개 지표 ({time.perf_counter() - started:.1f}s)", file=sys.stderr)
+    finally:
+        logging.disable(logging.NOTSET)
+    return report
+
+
+def _threshold(metric):
+    return next((v for suffix, v in REGRESSION_MIN_ABS.items() if metric.endswith(suffix)), 0)
+
+
+def compare(old, new, ratio=REGRESSION_RATIO):
+    """두 결과의 공통 지표 비교 → [(시나리오, 지표, 이전, 이후, 변화율, 회귀 여부)]"""
+    rows = []
+    for scenario, metrics in new["results"].items():
+        for metric, after in metrics.items():
+            before = old["results"].get(scenario, {}).get(metric)
+            if before is None:
+                continue
+            change = (after - before) / before if before else 0.0
+            regressed = change > ratio and after - before > _threshold(metric)
+            rows.append((scenario, metric, before, after, change, regressed))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m schoolzone.bench", description="대시보드 성능 벤치마크")
+    parser.add_argument("--only", help=f"쉼표로 구분한 시나리오 ({','.join(SCENARIOS)})")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="반복 횟수 (중앙값 기록, 기본 3)")
+    parser.add_argument("-o", "--output", help="결과 JSON 경로 (기본 data/.bench/<커밋>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="두 결과 JSON 비교")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_RATIO,
+                        help=f"--compare 회귀 판정 비율 (기본 {REGRESSION_RATIO})")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        old, new = (json.loads(Path(p).read_text(encoding="utf-8")) for p in args.compare)
+        rows = compare(old, new, ratio=args.threshold)
+        for scenario, metric, before, after, change, regressed in rows:
+            flag = "  ← 회귀" if regressed else ""
+            print(f"{scenario:8} {metric:40} {before:14.4f} → {after:14.4f} ({change:+.1%}){flag}")
+        sys.exit(1 if any(r[-1] for r in rows) else 0)
+
+    scenarios = args.only.split(",") if args.only else SCENARIOS
+    unknown = [s for s in scenarios if s not in BENCHES]
+    if unknown:
+        parser.error(f"알 수 없는 시나리오: {unknown}")
+    report = run(scenarios, repeat=args.repeat)
+    out = Path(args.output) if args.output else BENCH_DIR / f"{report['meta']['commit']}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, ensure_ascii=False, indent=1), encoding="utf-8")
+    for scenario, metrics in report["results"].items():
+        for metric, value in metrics.items():
+            print(f"{scenario:8} {metric:40} {value:14.4f}")
+    print(f"→ {out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+비트맵 필터 색인 — 사이드바 필터와 고급 조건식을 비트 연산으로
+
+범주 컬럼(구·시설유형·등급)은 값마다 비트맵 하나, 개수 컬럼(시설 9종·발생건수·시설 합계)은
+관측된 값 v 마다 "v 이상" 비트맵(범위 인코딩)을 둔다. 비트맵은 np.packbits 로 묶은 uint8
+배열(행 8개 = 1바이트)이라 조건 조합은 바이트 단위 AND/OR/NOT 이다.
+
+    index = build_index(df)
+    bits = evaluate(index, "옐로카펫 = 0 AND 신호등 < 3 AND 발생건수 >= 2")
+    df[to_mask(index, bits)]
+
+조건식 문법: 조건을 AND / OR / NOT 과 괄호로 묶는다 (AND 가 OR 보다 먼저).
+    컬럼 = 값, !=, <, <=, >, >=      (범주 컬럼은 = / != 만)
+    컬럼 IN (값1, 값2, ...)
+값에 공백이 있으면 큰따옴표로 감싼다. 값이 없는(결측) 행은 어떤 비교에도 걸리지 않고,
+NOT 도 그 아래 조건이 참조하는 컬럼이 모두 있는 행만 뒤집는다 — "NOT 등급 = 1" 은 "등급 != 1" 과 같다.
+"""
+
+import re
+
+import numpy as np
+
+from schoolzone.config import FACILITY_COLS
+
+CATEGORICAL = ["구", "시설유형", "등급"]
+NUMERIC = FACILITY_COLS + ["발생건수", "_시설합계"]
+
+_TOKEN = re.compile(r'\s*(?:(\()|(\))|(,)|(>=|<=|!=|==|=|<|>)|"([^"]*)"|([^\s(),=<>!"]+))')
+_KEYWORDS = {"AND", "OR", "NOT", "IN"}
+
+
+def _pack(mask):
+    return np.packbits(np.asarray(mask, dtype=bool))
+
+
+def build_index(df, categorical=CATEGORICAL, numeric=NUMERIC):
+    """행 프레임 → 비트맵 색인 dict (행 순서 = df 위치 순서)"""
+    index = {"n": len(df), "all": _pack(np.ones(len(df), dtype=bool)), "eq": {}, "ge": {}, "valid": {}}
+    for col in categorical:
+        if col not in df.columns:
+            continue
+        values = df[col].astype(object)
+        index["valid"][col] = _pack(values.notna())
+        index["eq"][col] = {v: _pack(values == v) for v in values.dropna().unique()}
+    for col in numeric:
+        if col not in df.columns:
+            continue
+        v = df[col].to_numpy(dtype=float)
+        ok = ~np.isnan(v)
+        levels = np.unique(v[ok])
+        index["valid"][col] = _pack(ok)
+        index["ge"][col] = (levels, [_pack(ok & (v >= level)) for level in levels])
+    return index
+
+
+def _empty(index):
+    return np.zeros_like(index["all"])
+
+
+def and_(*bits):
+    return np.bitwise_and.reduce(bits)
+
+
+def or_(*bits):
+    return np.bitwise_or.reduce(bits)
+
+
+def not_(index, bits):
+    # 마지막 바이트의 패딩 비트가 켜지지 않도록 all 과 AND
+    return np.bitwise_and(np.invert(bits), index["all"])
+
+
+def to_mask(index, bits):
+    """비트맵 → 행 bool 배열"""
+    return np.unpackbits(bits, count=index["n"]).astype(bool)
+
+
+def count(bits):
+    return int(np.unpackbits(bits).sum())
+
+
+def _ge(index, col, value):
+    """col >= value 비트맵 (value 이상인 가장 작은 관측값의 비트맵)"""
+    levels, maps = index["ge"][col]
+    pos = int(np.searchsorted(levels, value, side="left"))
+    return maps[pos] if pos < len(maps) else _empty(index)
+
+
+def _gt(index, col, value):
+    levels, maps = index["ge"][col]
+    pos = int(np.searchsorted(levels, value, side="right"))
+    return maps[pos] if pos < len(maps) else _empty(index)
+
+
+def isin(index, col, values):
+    """col 값이 values 중 하나인 행 (범주·개수 컬럼 공통)"""
+    values = list(values)
+    if not values:
+        return _empty(index)
+    return or_(*(compare(index, col, "=", v) for v in values))
+
+
+def compare(index, col, op, value):
+    """단일 비교 조건 비트맵"""
+    if col in index["eq"]:
+        if op in ("=", "=="):
+            return index["eq"][col].get(value, _empty(index))
+        if op == "!=":
+            return and_(index["valid"][col], not_(index, index["eq"][col].get(value, _empty(index))))
+        raise ValueError(f"범주 컬럼 '{col}' 에는 = / != / IN 만 쓸 수 있습니다")
+    if col not in index["ge"]:
+        raise ValueError(f"색인되지 않은 컬럼: '{col}' (가능: {', '.join(columns(index))})")
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"'{col}' 에는 숫자를 비교해야 합니다: {value!r}") from None
+    valid = index["valid"][col]
+    if op == ">=":
+        return _ge(index, col, value)
+    if op == ">":
+        return _gt(index, col, value)
+    if op == "<":
+        return and_(valid, not_(index, _ge(index, col, value)))
+    if op == "<=":
+        return and_(valid, not_(index, _gt(index, col, value)))
+    eq = and_(_ge(index, col, value), not_(index, _gt(index, col, value)))
+    if op in ("=", "=="):
+        return eq
+    if op == "!=":
+        return and_(valid, not_(index, eq))
+    raise ValueError(f"알 수 없는 비교 연산자: {op}")
+
+
+def columns(index):
+    return list(index["eq"]) + list(index["ge"])
+
+
+def _tokenize(text):
+    tokens, pos = [], 0
+    text = text.strip()
+    while pos < len(text):
+        m = _TOKEN.match(text, pos)
+        if not m or m.end() == pos:
+            raise ValueError(f"조건식을 읽을 수 없습니다: ...{text[pos:pos + 10]}")
+        lparen, rparen, comma, op, quoted, word = m.groups()
+        if quoted is not None:
+            tokens.append(("value", quoted))
+        elif word is not None:
+            kind = "kw" if word.upper() in _KEYWORDS else "value"
+            tokens.append((kind, word.upper() if kind == "kw" else word))
+        else:
+            tokens.append(("op", lparen or rparen or comma or op))
+        pos = m.end()
+    return tokens
+
+
+def parse(text):
+    """조건식 → 중첩 튜플 AST: ("or"|"and", [자식]), ("not", 자식), ("cmp", 컬럼, 연산자, 값), ("in", 컬럼, [값])"""
+    tokens = _tokenize(text)
+    pos = 0
+
+    def peek():
+        return tokens[pos] if pos < len(tokens) else (None, None)
+
+    def take(kind=None, value=None):
+        nonlocal pos
+        tok = peek()
+        if tok[0] is None or (kind and tok[0] != kind) or (value and tok[1] != value):
+            want = f"'{value}' 가" if value else {"value": "값이", "op": "연산자가"}.get(kind, "조건이")
+            raise ValueError(f"조건식 오류: {want} 와야 할 자리에 {tok[1] or '식의 끝'}")
+        pos += 1
+        return tok[1]
+
+    def expr():
+        terms = [term()]
+        while peek() == ("kw", "OR"):
+            take()
+            terms.append(term())
+        return terms[0] if len(terms) == 1 else ("or", terms)
+
+    def term():
+        factors = [factor()]
+        while peek() == ("kw", "AND"):
+            take()
+            factors.append(factor())
+        return factors[0] if len(factors) == 1 else ("and", factors)
+
+    def factor():
+        if peek() == ("kw", "NOT"):
+            take()
+            return ("not", factor())
+        if peek() == ("op", "("):
+            take()
+            node = expr()
+            take("op", ")")
+            return node
+        col = take("value")
+        if peek() == ("kw", "IN"):
+            take()
+            take("op", "(")
+            values = [take("value")]
+            while peek() == ("op", ","):
+                take()
+                values.append(take("value"))
+            take("op", ")")
+            return ("in", col, values)
+        op = take("op")
+        if op not in ("=", "==", "!=", "<", "<=", ">", ">="):
+            raise ValueError(f"조건식 오류: '{col}' 뒤에 비교 연산자가 필요합니다")
+        return ("cmp", col, op, take("value"))
+
+    if not tokens:
+        raise ValueError("빈 조건식")
+    node = expr()
+    if pos != len(tokens):
+        raise ValueError(f"조건식 오류: 남은 토큰 {tokens[pos][1]}")
+    return node
+
+
+def _referenced(node):
+    """AST 가 참조하는 컬럼 이름 집합"""
+    if node[0] in ("and", "or"):
+        return set().union(*(_referenced(n) for n in node[1]))
+    if node[0] == "not":
+        return _referenced(node[1])
+    return {node[1]}
+
+
+def _eval(index, node):
+    kind = node[0]
+    if kind == "and":
+        return and_(*(_eval(index, n) for n in node[1]))
+    if kind == "or":
+        return or_(*(_eval(index, n) for n in node[1]))
+    if kind == "not":
+        # 결측 행은 NOT 으로도 걸리지 않도록 참조 컬럼의 valid 비트맵과 AND
+        inner = _eval(index, node[1])
+        return and_(not_(index, inner), *(index["valid"][col] for col in sorted(_referenced(node[1]))))
+    if kind == "in":
+        if node[1] not in index["eq"] and node[1] not in index["ge"]:
+            raise ValueError(f"색인되지 않은 컬럼: '{node[1]}' (가능: {', '.join(columns(index))})")
+        return isin(index, node[1], node[2])
+    return compare(index, *node[1:])
+
+
+def evaluate(index, text):
+    """조건식 문자열 → 비트맵 (문법·컬럼 오류는 ValueError)"""
+    return _eval(index, parse(text))
@@ -0,0 +1,167 @@
+"""
+점수 산출 결과 빌드 — 도시별 완성 프레임을 버전 붙은 Parquet 아티팩트로 저장
+
+    python -m schoolzone.build            # 입력이 바뀐 경우에만 다시 빌드
+    python -m schoolzone.build --force    # 강제 재빌드
+
+버전은 입력 CSV 내용 해시 + PIPELINE_VERSION 으로 정해지므로, 데이터나 산출
+로직이 바뀌지 않는 한 앱은 이미 만들어진 아티팩트를 메모리로 읽기만 한다.
+"""
+
+import argparse
+import hashlib
+import json
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from schoolzone import models, scoring
+from schoolzone.store import DATA_DIR, atomic_write, read_table, source_digest
+
+ARTIFACT_DIR = DATA_DIR / ".artifacts"
+
+# 산출 로직(scoring/models)을 바꾸면 올려서 기존 아티팩트 무효화
+PIPELINE_VERSION = 1
+
+CITIES = ["성남시", "광명시"]
+
+INPUT_FILES = [
+    "스쿨존_팀통합_최종.csv",
+    "커스텀비전_시설물별.csv",
+    "accidentlevel_addData.csv",
+    "2_DatasetFor2ndData.csv",
+    "3_final_scoring_results_improved.csv",
+    "광명_스쿨존.csv",
+    "3_final_gm_improved.csv",
+    "3_final_gm.csv",
+]
+
+
+def artifact_version():
+    h = hashlib.sha1(f"pipeline={PIPELINE_VERSION}".encode("utf-8"))
+    for name in INPUT_FILES:
+        path = DATA_DIR / name
+        digest = source_digest(path) if path.exists() else "-"
+        h.update(f"|{name}={digest}".encode("utf-8"))
+    return h.hexdigest()[:12]
+
+
+def _paths(version):
+    frames = {city: ARTIFACT_DIR / f"scored_{city}.{version}.parquet" for city in CITIES}
+    return frames, ARTIFACT_DIR / f"meta.{version}.json"
+
+
+def _optional(name):
+    return read_table(name) if (DATA_DIR / name).exists() else None
+
+
+def run_pipeline():
+    """입력 로드 → 모델 학습 → 성남/광명 점수 산출. (frames, meta) 반환"""
+    sn_raw = read_table("스쿨존_팀통합_최종.csv")
+
+    _struct_model, struct_auc, fac_risk = models.load_or_train(
+        models.train_structure_model, read_table("accidentlevel_addData.csv")
+    )
+    integ_model, integ_feats, integ_auc, integ_coef = models.load_or_train(
+        models.train_integrated_model, read_table("2_DatasetFor2ndData.csv")
+    )
+    df_sn = scoring.score_seongnam(
+        sn_raw, read_table("커스텀비전_시설물별.csv"), fac_risk,
+        read_table("3_final_scoring_results_improved.csv"), integ_model, integ_feats,
+    )
+
+    safety_model, model_features, model_r2 = models.load_or_train(models.train_safety_model, sn_raw)
+    thresholds = scoring.grade_thresholds(df_sn)
+    df_gm = scoring.score_gwangmyung(
+        read_table("광명_스쿨존.csv"), safety_model, thresholds,
+        gm_improved=_optional("3_final_gm_improved.csv"),
+        gm_full=_optional("3_final_gm.csv"),
+    )
+
+    meta = {
+        "struct_auc": struct_auc,
+        "integ_auc": float(integ_auc),
+        "integ_feats": integ_feats,
+        "integ_coef": integ_coef.to_dict(orient="records"),
+        "model_r2": float(model_r2),
+        "model_features": model_features,
+        "grade_thresholds": list(thresholds),
+        "extern_auc": scoring.external_auc(df_sn),
+    }
+    return {"성남시": df_sn, "광명시": df_gm}, meta
+
+
+def build(force=False):
+    """현재 입력 버전의 아티팩트가 없거나 force 면 빌드해서 저장. (frames, meta) 반환"""
+    version = artifact_version()
+    frame_paths, meta_path = _paths(version)
+    if not force and meta_path.exists():
+        return load(version)
+
+    started = time.perf_counter()
+    frames, meta = run_pipeline()
+    meta.update(version=version, pipeline_version=PIPELINE_VERSION,
+                built_at=time.strftime("%Y-%m-%dT%H:%M:%S"),
+                build_seconds=round(time.perf_counter() - started, 3))
+
+    for city, frame in frames.items():
+        atomic_write(frame_paths[city], frame.to_parquet)
+    # meta 는 마지막에 써서, meta 가 보이면 프레임도 모두 준비된 상태
+    atomic_write(meta_path, lambda tmp: Path(tmp).write_text(
+        json.dumps(meta, ensure_ascii=False, indent=1), encoding="utf-8"))
+    for old in [*ARTIFACT_DIR.glob("scored_*.parquet"), *ARTIFACT_DIR.glob("meta.*.json")]:
+        if f".{version}." not in old.name:
+            old.unlink(missing_ok=True)
+    return frames, meta
+
+
+def load_meta(version=None):
+    """저장된 아티팩트 메타 (모델 지표·등급 기준). 없으면 None"""
+    _, meta_path = _paths(version or artifact_version())
+    if not meta_path.exists():
+        return None
+    with open(meta_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_city(city, version=None):
+    """도시 하나의 샤드만 읽기 (meta 가 있어야 완성된 빌드로 봄). 없으면 None"""
+    version = version or artifact_version()
+    frame_paths, meta_path = _paths(version)
+    if not meta_path.exists():
+        return None
+    return pd.read_parquet(frame_paths[city])
+
+
+def load(version=None):
+    """저장된 아티팩트 읽기. 없으면 None"""
+    version = version or artifact_version()
+    meta = load_meta(version)
+    if meta is None:
+        return None
+    return {city: load_city(city, version) for city in CITIES}, meta
+
+
+def load_or_build():
+    """앱 경로: 아티팩트가 있으면 읽기만, 없으면 한 번 빌드 (읽기 전용 FS 면 메모리에서만 산출)"""
+    try:
+        return load() or build()
+    except OSError:
+        return run_pipeline()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m schoolzone.build",
+                                     description="도시별 점수 산출 아티팩트 빌드")
+    parser.add_argument("--force", action="store_true", help="입력이 그대로여도 다시 빌드")
+    args = parser.parse_args(argv)
+
+    frames, meta = build(force=args.force)
+    print(f"version {meta['version']} (pipeline v{meta['pipeline_version']}, {meta['build_seconds']}s)")
+    for city, frame in frames.items():
+        print(f"  {city}: {len(frame)}개소, {frame.shape[1]} columns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+도시 레지스트리 — data/cities/*.json 매니페스트 한 파일이 도시 하나
+
+매니페스트 키
+    name, order, center, zoom        : 표시 이름·정렬 순서·지도 중심/초기 줌 (필수)
+    geojson, population, adm_name    : 행정동 경계·인구 파일, 경계 adm_nm 형식 ("경기도 광명시 {동명}")
+    artifact                         : "build" (python -m schoolzone.build 도시별 샤드) 또는 "zones"
+    zones                            : artifact 가 "zones" 일 때 스쿨존 CSV — schoolzone.batch 로 점수 산출
+    model_transfer                   : 성남 학습 모델을 이식한 추정 점수인지
+    overlays, recount_layers         : 지도 오버레이·반경 재집계용 포인트 파일 {키: 파일}
+    roadview, traffic                : 로드뷰 폴더, 등하교 교통량 파일
+    hotspots                         : 사고다발지 폴리곤 파일 (지도 폴리곤·학교별 노출 조인)
+
+도시 프레임은 처음 선택될 때 그 도시 샤드만 읽고, 프로세스 전체가 공유하는
+바이트·도시 수 상한 LRU(CITY_CACHE_MAX_BYTES · CITY_CACHE_MAX_CITIES)에 두었다가 넘치면
+오래 안 쓴 도시부터 내린다.
+도시가 늘어도 시작 시간·상주 메모리는 선택된 도시 수만큼만 든다.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from schoolzone import build
+from schoolzone.store import DATA_DIR, read_table, save_versioned, source_digest
+
+CITY_DIR = DATA_DIR / "cities"
+
+REQUIRED_KEYS = ("name", "center", "zoom")
+
+# 도시 프레임 LRU 상한 (DataFrame deep memory 합계 · 도시 수)
+CITY_CACHE_MAX_BYTES = 256 * 1024 * 1024
+# 도시별 파생 캐시(app.py 의 색인·텐서·큐브 로더 max_entries)도 같은 도시 수로 묶는다
+CITY_CACHE_MAX_CITIES = 8
+
+_frames = OrderedDict()  # (도시, 아티팩트 버전) → (frame, bytes)
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+_lock = threading.Lock()
+
+
+def load_registry(directory=CITY_DIR):
+    """매니페스트 → {도시 이름: 매니페스트} (order, 이름 순)"""
+    cities = []
+    for path in sorted(directory.glob("*.json")):
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        missing = [k for k in REQUIRED_KEYS if k not in manifest]
+        if missing:
+            raise ValueError(f"{path.name}: 필수 키 누락 {missing}")
+        artifact = manifest.setdefault("artifact", "zones")
+        if artifact == "zones" and "zones" not in manifest:
+            raise ValueError(f"{path.name}: artifact 'zones' 에는 zones 파일이 필요합니다")
+        if artifact == "build" and manifest["name"] not in build.CITIES:
+            raise ValueError(f"{path.name}: {manifest['name']} 은 빌드 파이프라인 도시가 아닙니다")
+        manifest.setdefault("overlays", {})
+        manifest.setdefault("model_transfer", artifact != "build")
+        cities.append(manifest)
+    cities.sort(key=lambda m: (m.get("order", 1_000), m["name"]))
+    return {m["name"]: m for m in cities}
+
+
+def _zones_path(manifest, version):
+    key = hashlib.sha1(
+        f"{source_digest(DATA_DIR / manifest['zones'])}|{version}".encode("utf-8")
+    ).hexdigest()[:12]
+    return build.ARTIFACT_DIR / f"zones_{manifest['name']}.{key}.parquet"
+
+
+def _load_zones(manifest, version):
+    """zones 도시: batch 점수 산출 결과를 샤드로 저장해 두고 읽기"""
+    import pandas as pd
+
+    from schoolzone import batch, scoring
+    from schoolzone.config import FACILITY_COLS
+
+    path = _zones_path(manifest, version)
+    if path.exists():
+        return pd.read_parquet(path)
+    raw = scoring.prepare_gwangmyung(read_table(manifest["zones"]), default_gu=manifest["name"])
+    frame = batch.score_zones(raw, batch.load_scoring_models())
+    frame["_시설합계"] = frame[FACILITY_COLS].sum(axis=1)
+    # 대시보드 CV 표기 컬럼 (CV 피처가 없는 도시는 빈 값 — CV 섹션이 건너뜀)
+    for src, col in scoring.CV_RENAME.items():
+        frame[col] = frame[src] if src in frame.columns else float("nan")
+    save_versioned(path, frame.to_parquet, f"zones_{manifest['name']}")
+    return frame
+
+
+def city_frame(name, registry=None):
+    """도시 점수 프레임 (프로세스 공유 LRU 경유, 처음이면 그 도시 샤드만 로드)"""
+    manifest = (registry or load_registry())[name]
+    version = build.artifact_version()
+    key = (name, version)
+    with _lock:
+        if key in _frames:
+            _frames.move_to_end(key)
+            _stats["hits"] += 1
+            return _frames[key][0]
+
+    if manifest["artifact"] == "build":
+        frame = build.load_city(name, version)
+        if frame is None:
+            try:
+                frame = build.build()[0][name]
+            except OSError:
+                # 읽기 전용 FS — 메모리에서만 산출
+                frame = build.run_pipeline()[0][name]
+    else:
+        frame = _load_zones(manifest, version)
+
+    nbytes = int(frame.memory_usage(deep=True).sum())
+    with _lock:
+        _stats["misses"] += 1
+        _frames[key] = (frame, nbytes)
+        # 버전이 바뀐 옛 프레임은 바로, 나머지는 상한을 넘는 동안 오래된 것부터
+        for old in [k for k in _frames if k[1] != version]:
+            del _frames[old]
+        while len(_frames) > 1 and (
+            len(_frames) > CITY_CACHE_MAX_CITIES or sum(b for _, b in _frames.values()) > CITY_CACHE_MAX_BYTES
+        ):
+            _frames.popitem(last=False)
+            _stats["evictions"] += 1
+    return frame
+
+
+def cache_stats():
+    """도시 프레임 LRU 상태 — 적중/미스/축출 수, 상주 도시, 바이트"""
+    with _lock:
+        return {
+            **_stats,
+            "cities": [k[0] for k in _frames],
+            "bytes": sum(b for _, b in _frames.values()),
+        }
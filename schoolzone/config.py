@@ -0,0 +1,12 @@
+"""
+공통 상수 — 시설 컬럼, 등급 라벨·색상
+"""
+
+GRADE_COLORS = {"A": "#27AE60", "B": "#F1C40F", "C": "#E67E22", "D": "#E74C3C"}
+GRADE_LABELS = {"A": "A (우수)", "B": "B (양호)", "C": "C (보통)", "D": "D (주의)"}
+
+FACILITY_COLS = [
+    "도로적색표면", "신호등", "횡단보도", "도로안전표지",
+    "생활안전CCTV", "무인교통단속카메라",
+    "보호구역표지판", "옐로카펫", "무단횡단방지펜스",
+]
@@ -0,0 +1,83 @@
+"""
+반사실 스윕 — 학교 × 시설 × 추가 수량(+0..+k) 사고확률 텐서
+
+정책 시뮬레이션은 학교를 고를 때마다 기본 행과 시설별 +1 행을 하나씩 모델에 넣었다.
+여기서는 모든 학교·시설·수량 조합을 한 배열로 쌓아 predict_proba 한 번으로 평가하고,
+결과 텐서를 (모델 해시 + 입력 해시 + k) 키로 data/.cache/sweep/ 에 저장해 둔다.
+화면의 용량-반응 곡선·히트맵은 이 텐서를 인덱싱만 한다.
+"""
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from schoolzone.config import FACILITY_COLS
+from schoolzone.models import frame_digest
+from schoolzone.optimize import integrated_inputs
+from schoolzone.store import CACHE_DIR, save_versioned
+
+SWEEP_CACHE_DIR = CACHE_DIR / "sweep"
+
+# 시설당 최대 추가 수량 (+0..+MAX_UNITS)
+MAX_UNITS = 10
+
+# 저장 포맷이 바뀌면 올려서 기존 텐서 무효화
+SWEEP_FORMAT_VERSION = 1
+
+
+def sweep(df, model, feats, max_units=MAX_UNITS):
+    """
+    (학교 n, 시설 F, 수량 k+1) 사고확률 텐서와 시설 목록
+
+    [:, :, 0] 은 현재 상태(모든 시설 공통)라 한 번만 계산해 채운다.
+    """
+    feats = list(feats)
+    cols = [c for c in FACILITY_COLS if c in feats]
+    X = integrated_inputs(df, feats).to_numpy(dtype=float)
+    n, F, K = len(X), len(cols), max_units
+    if n == 0:
+        return np.zeros((0, F, K + 1)), cols
+
+    # 행 순서 = (학교, 시설, 수량 1..K) — reshape(n, F, K) 로 바로 풀린다
+    rows = np.repeat(X, F * K, axis=0)
+    col_idx = np.array([feats.index(c) for c in cols])
+    rows[np.arange(len(rows)), np.tile(np.repeat(col_idx, K), n)] += np.tile(np.arange(1, K + 1), n * F)
+
+    stacked = np.vstack([X, rows])
+    prob = model.predict_proba(pd.DataFrame(stacked, columns=feats))[:, 1]
+    tensor = np.empty((n, F, K + 1))
+    tensor[:, :, 0] = prob[:n, None]
+    tensor[:, :, 1:] = prob[n:].reshape(n, F, K)
+    return tensor, cols
+
+
+def model_digest(model):
+    """학습된 모델 파라미터 해시 (모델 버전 키)"""
+    import joblib
+    import sklearn
+
+    return hashlib.sha1(f"{joblib.hash(model)}|{sklearn.__version__}".encode("utf-8")).hexdigest()[:12]
+
+
+def load_sweep(df, model, feats, max_units=MAX_UNITS, tag="sweep"):
+    """sweep 결과 (디스크 캐시 경유). tag 는 파일명 접두어 — 같은 tag 의 이전 버전은 지운다"""
+    feats = list(feats)
+    raw = f"{SWEEP_FORMAT_VERSION}|{model_digest(model)}|{frame_digest(integrated_inputs(df, feats))}|{max_units}|{feats}"
+    key = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+    path = SWEEP_CACHE_DIR / f"{tag}.{key}.npz"
+    if path.exists():
+        try:
+            with np.load(path) as z:
+                return z["tensor"], [str(c) for c in z["cols"]]
+        except (OSError, KeyError, ValueError):
+            pass
+
+    tensor, cols = sweep(df, model, feats, max_units)
+
+    def write(tmp):
+        with open(tmp, "wb") as f:
+            np.savez(f, tensor=tensor, cols=np.array(cols))
+
+    save_versioned(path, write, tag)
+    return tensor, cols
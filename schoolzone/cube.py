@@ -0,0 +1,80 @@
+"""
+(구 × 시설유형 × 등급) 집계 큐브 — KPI·인사이트 카드·등급/유형/구 통계용
+
+셀마다 가산 측정값(행 수 n, 측정값별 합 _sum · 제곱합 _sq · 비결측 수 _cnt)만 두므로
+사이드바 필터 조합은 행을 훑지 않고 해당 셀을 더해서 답한다. 평균은 합/비결측 수,
+분산은 제곱합으로 얻는다. 셀 수는 (구 × 유형 × 4등급) 이하라 학교 수가 늘어도
+필터·집계 비용이 일정하다.
+"""
+
+import numpy as np
+import pandas as pd
+
+from schoolzone.config import FACILITY_COLS
+
+DIMENSIONS = ["구", "시설유형", "등급"]
+MEASURES = ["활성_안전점수", "발생건수"] + FACILITY_COLS
+GRADES = ["A", "B", "C", "D"]
+
+
+def build_cube(df, measures=MEASURES):
+    """행 프레임 → 셀 프레임 (DIMENSIONS 컬럼 + n + 측정값별 _sum/_sq/_cnt)
+
+    차원 결측도 셀로 남긴다 — 필터(isin)에는 걸리지 않고, 차원 하나로 롤업할 때만
+    groupby 처럼 그 차원이 결측인 셀이 빠진다.
+    """
+    parts = {"n": np.ones(len(df), dtype=np.int64)}
+    for m in measures:
+        if m not in df.columns:
+            continue
+        v = df[m].astype(float)
+        parts[f"{m}_sum"] = v.fillna(0).to_numpy()
+        parts[f"{m}_sq"] = (v ** 2).fillna(0).to_numpy()
+        parts[f"{m}_cnt"] = v.notna().to_numpy(dtype=np.int64)
+    rows = pd.DataFrame(parts, index=df.index)
+    for d in DIMENSIONS:
+        rows[d] = df[d].astype(object)
+    return rows.groupby(DIMENSIONS, dropna=False, sort=True).sum().reset_index()
+
+
+def select(cells, gu=None, types=None, grades=None):
+    """필터에 해당하는 셀 (None 이면 그 차원 전체)"""
+    mask = np.ones(len(cells), dtype=bool)
+    for dim, values in zip(DIMENSIONS, (gu, types, grades)):
+        if values is not None:
+            mask &= cells[dim].isin(list(values)).to_numpy()
+    return cells[mask]
+
+
+def rollup(cells, by=()):
+    """셀 합산 — by 가 비면 전체 합계 Series, 아니면 by 차원별 DataFrame (결측 차원 제외)"""
+    measures = [c for c in cells.columns if c not in DIMENSIONS]
+    if not by:
+        return cells[measures].sum()
+    return cells.groupby(list(by), sort=True)[measures].sum()
+
+
+def mean(agg, measure):
+    """평균 (비결측 값 기준, 값이 없으면 NaN)"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.true_divide(agg[f"{measure}_sum"], agg[f"{measure}_cnt"])
+
+
+def std(agg, measure):
+    """표본 표준편차 (ddof=1, 값이 2개 미만이면 NaN)"""
+    s, sq, c = agg[f"{measure}_sum"], agg[f"{measure}_sq"], agg[f"{measure}_cnt"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        var = np.true_divide(sq - np.true_divide(s ** 2, c), c - 1)
+    return np.sqrt(np.clip(var, 0, None))
+
+
+def means(agg, measures):
+    """여러 측정값 평균 — agg 가 Series(한 셀 합계)면 Series, DataFrame 이면 DataFrame"""
+    if isinstance(agg, pd.Series):
+        return pd.Series({m: mean(agg, m) for m in measures}, dtype=float)
+    return pd.DataFrame({m: mean(agg, m) for m in measures}, index=agg.index)
+
+
+def by_grade(cells):
+    """등급별 롤업 (A~D 순서, 없는 등급은 NaN 행)"""
+    return rollup(cells, ["등급"]).reindex(GRADES)
@@ -0,0 +1,162 @@
+"""
+행정동 경계 GeoJSON 다해상도 단순화
+
+인접 행정동이 공유하는 경계선은 한 번만, 같은 방향으로 단순화해 양쪽에 그대로
+돌려 쓰므로 단순화 후에도 경계 사이에 틈·겹침이 생기지 않는다 (TopoJSON 의 arc 와
+같은 방식). 줌 단계별 허용오차로 만든 결과는 원본 해시 키로 data/.cache/geo/ 에 저장.
+
+    python -m schoolzone.geometry     # 모든 경계 파일 × 줌 단계 사전 생성
+"""
+
+import hashlib
+import json
+
+import numpy as np
+
+from schoolzone.store import CACHE_DIR, DATA_DIR, save_versioned, source_digest
+
+GEO_CACHE_DIR = CACHE_DIR / "geo"
+
+# 줌 단계 → Douglas-Peucker 허용오차(도). 해당 줌에서 대략 0.5px
+ZOOM_TOLERANCES = {10: 0.0006, 12: 0.00015, 14: 0.00004, 16: 0.00001}
+
+# 출력 좌표 소수 자릿수 (5자리 ≈ 1m)
+COORD_PRECISION = 5
+
+BOUNDARY_FILES = ["성남시_행정동_경계.geojson", "광명시_행정동_경계.geojson"]
+
+# 지도에 쓰는 속성만 남김
+KEEP_PROPERTIES = ["adm_nm"]
+
+
+def level_for_zoom(zoom):
+    """지도 줌 이하 가장 가까운 단계 (없으면 가장 거친 단계)"""
+    levels = sorted(ZOOM_TOLERANCES)
+    return max([z for z in levels if z <= zoom], default=levels[0])
+
+
+def _douglas_peucker(pts, tol):
+    """pts (N, 2) 양 끝점 고정 DP 단순화 → 유지할 인덱스 mask"""
+    keep = np.zeros(len(pts), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(pts) - 1)]
+    while stack:
+        i, j = stack.pop()
+        if j <= i + 1:
+            continue
+        a, b = pts[i], pts[j]
+        seg = b - a
+        norm = np.hypot(*seg)
+        mid = pts[i + 1:j]
+        if norm == 0:
+            d = np.hypot(*(mid - a).T)
+        else:
+            d = np.abs(seg[0] * (mid[:, 1] - a[1]) - seg[1] * (mid[:, 0] - a[0])) / norm
+        k = int(np.argmax(d))
+        if d[k] > tol:
+            k += i + 1
+            keep[k] = True
+            stack.extend([(i, k), (k, j)])
+    return keep
+
+
+def _rings(geom):
+    """Polygon/MultiPolygon → 폴리곤(ring 목록) 목록"""
+    return geom["coordinates"] if geom["type"] == "MultiPolygon" else [geom["coordinates"]]
+
+
+def simplify_geojson(geo, tolerance, precision=COORD_PRECISION, keep_properties=KEEP_PROPERTIES):
+    """공유 경계 보존 단순화. 원본 geo 는 건드리지 않고 새 FeatureCollection 반환"""
+    q = lambda c: (round(c[0], 7), round(c[1], 7))
+
+    # 1) 꼭짓점별로 그 점을 지나는 ring 집합
+    owners = {}
+    ring_id = 0
+    for ft in geo["features"]:
+        for poly in _rings(ft["geometry"]):
+            for ring in poly:
+                for c in ring:
+                    owners.setdefault(q(c), set()).add(ring_id)
+                ring_id += 1
+
+    # 2) ring 을 junction(소유 ring 집합이 바뀌는 점)에서 잘라 arc 단위로 단순화
+    arc_cache = {}
+
+    def simplify_arc(arc):
+        fwd = tuple(arc)
+        key = min(fwd, fwd[::-1])
+        if key not in arc_cache:
+            pts = np.asarray(key, dtype=float)
+            arc_cache[key] = [tuple(p) for p in pts[_douglas_peucker(pts, tolerance)]]
+        out = arc_cache[key]
+        return out if key == fwd else out[::-1]
+
+    def simplify_ring(ring):
+        pts = [q(c) for c in ring]
+        if pts[0] == pts[-1]:
+            pts = pts[:-1]
+        n = len(pts)
+        if n < 4:
+            return [list(p) for p in pts + pts[:1]]
+        junction = [
+            owners[pts[i]] != owners[pts[i - 1]] or owners[pts[i]] != owners[pts[(i + 1) % n]]
+            for i in range(n)
+        ]
+        cuts = [i for i in range(n) if junction[i]]
+        if not cuts:
+            # 인접 동이 없는 ring: 임의 시작점 + 가장 먼 점 고정
+            far = int(np.argmax(np.hypot(*(np.asarray(pts) - pts[0]).T)))
+            cuts = sorted({0, far})
+        out = []
+        for a, b in zip(cuts, cuts[1:] + [cuts[0] + n]):
+            arc = [pts[k % n] for k in range(a, b + 1)]
+            out.extend(simplify_arc(arc)[:-1])
+        if len(out) < 3:
+            out = pts
+        out.append(out[0])
+        return [[round(x, precision), round(y, precision)] for x, y in out]
+
+    features = []
+    for ft in geo["features"]:
+        geom = ft["geometry"]
+        polys = [[simplify_ring(r) for r in poly] for poly in _rings(geom)]
+        features.append({
+            "type": "Feature",
+            "properties": {k: ft["properties"].get(k) for k in keep_properties},
+            "geometry": {
+                "type": geom["type"],
+                "coordinates": polys if geom["type"] == "MultiPolygon" else polys[0],
+            },
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def load_simplified(name, zoom):
+    """경계 파일의 줌 단계 단순화본 (디스크 캐시 경유)"""
+    path = DATA_DIR / name
+    level = level_for_zoom(zoom)
+    tol = ZOOM_TOLERANCES[level]
+    key = hashlib.sha1(f"{source_digest(path)}|{tol}|{COORD_PRECISION}|{KEEP_PROPERTIES}".encode("utf-8")).hexdigest()[:12]
+    cache_path = GEO_CACHE_DIR / f"{path.stem}.z{level}.{key}.geojson"
+    if cache_path.exists():
+        with open(cache_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    with open(path, encoding="utf-8") as f:
+        geo = simplify_geojson(json.load(f), tol)
+
+    def write(tmp):
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(geo, f, ensure_ascii=False, separators=(",", ":"))
+
+    save_versioned(cache_path, write, f"{path.stem}.z{level}")
+    return geo
+
+
+if __name__ == "__main__":
+    for _name in BOUNDARY_FILES:
+        _raw = (DATA_DIR / _name).stat().st_size
+        for _zoom in sorted(ZOOM_TOLERANCES):
+            _geo = load_simplified(_name, _zoom)
+            _size = len(json.dumps(_geo, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+            print(f"{_name} z{_zoom}: {_size / 1024:.0f} KB (원본 {_raw / 1024:.0f} KB)")
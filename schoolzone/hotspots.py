@@ -0,0 +1,310 @@
+"""
+사고다발지 — 폴리곤 기하 저장소·학교 공간 조인, 대표점 근접 피처
+
+사고다발지 CSV 의 행마다 들어 있는 GeoJSON 문자열(사고다발지역폴리곤정보)을 한 번만 파싱해
+평탄한 numpy 배열(꼭짓점 좌표 · 고리 오프셋 · 파트별 고리 오프셋 · 파트 경계상자)로 두고,
+원본 파일 해시 키로 data/.cache/hotspots/ 에 저장한다.
+
+학교 조인은 (1) 경계상자를 거리만큼 넓혀 후보 (학교, 파트) 쌍을 벡터로 고르고
+(2) 후보 쌍의 모든 변을 한 배열로 펼쳐 반직선 교차(포함)와 점-선분 거리를 한 번에 계산한다.
+좌표는 학교 위치 기준 등장방형 근사(수 km 이내 오차 무시 가능)로 미터 환산한다.
+
+근접 피처(사고다발지_500m 등 오프라인 노트북 피처의 임의 반경판)는 다발지 대표점(위도·경도)
+haversine BallTree 하나로 반경 내 개수와 발생건수·사상자수·중상자수 합을 센다. 폴리곤을
+읽지 않으므로 전국 단위 수십만 행 파일에도 쓸 수 있다.
+"""
+
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+
+from schoolzone.spatial import EARTH_RADIUS_M, build_tree, to_radians
+from schoolzone.store import CACHE_DIR, DATA_DIR, read_table, save_versioned, source_digest
+
+HOTSPOT_CACHE_DIR = CACHE_DIR / "hotspots"
+
+# 저장 포맷이 바뀌면 올려서 기존 캐시 무효화
+HOTSPOT_FORMAT_VERSION = 1
+
+POLYGON_COL = "사고다발지역폴리곤정보"
+ATTRS = ["사고지역위치명", "사고유형구분", "사고년도", "발생건수", "사상자수", "중상자수", "사고심각도"]
+
+# 오프라인 피처(사고다발지_500m)와 같은 기본 반경
+DEFAULT_RADIUS_M = 500
+# 최근접 다발지 거리를 찾는 최대 범위 — 밖이면 NaN
+NEAREST_SEARCH_M = 2000
+# 이보다 낮은 줌에서는 폴리곤이 몇 픽셀이라 포인트로 표시 (view_geojson 이 None)
+MIN_POLYGON_ZOOM = 13
+
+M_PER_DEG = EARTH_RADIUS_M * np.pi / 180.0
+
+# 근접 피처 가중치 컬럼과 한 번에 query_radius 하는 학교 수 (이웃 인덱스 배열 메모리 제한)
+PROXIMITY_WEIGHTS = ["발생건수", "사상자수", "중상자수"]
+_QUERY_CHUNK = 2048
+
+# 후보 쌍 선별 시 (학교 × 파트) 경계상자 비교를 이 크기 단위로 나눠 메모리 제한
+_PAIR_CHUNK = 4_000_000
+# 후보 쌍의 변을 펼칠 때 한 번에 다루는 변 수
+_EDGE_CHUNK = 2_000_000
+
+
+def parse_polygons(geojson_strings):
+    """GeoJSON(Polygon/MultiPolygon) 문자열 → 평탄 배열 dict
+
+    coords (V, 2) 경도·위도 · ring_offsets (R+1) · part_rings (P+1) · part_feature (P) · bbox (P, 4)
+    파트 = 폴리곤 하나(외곽 고리 + 구멍), MultiPolygon 은 파트 여러 개가 한 행(feature)을 가리킨다.
+    """
+    coords, ring_offsets, part_rings, part_feature = [], [0], [0], []
+    for feature, text in enumerate(geojson_strings):
+        if not isinstance(text, str) or not text.strip():
+            continue
+        geom = json.loads(text)
+        polygons = [geom["coordinates"]] if geom["type"] == "Polygon" else geom["coordinates"]
+        for rings in polygons:
+            for ring in rings:
+                ring = [(float(x), float(y)) for x, y in ring]
+                if ring[0] != ring[-1]:
+                    ring.append(ring[0])
+                coords.extend(ring)
+                ring_offsets.append(len(coords))
+            part_rings.append(len(ring_offsets) - 1)
+            part_feature.append(feature)
+
+    coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+    ring_offsets = np.asarray(ring_offsets, dtype=np.int64)
+    part_rings = np.asarray(part_rings, dtype=np.int64)
+    starts, ends = ring_offsets[part_rings[:-1]], ring_offsets[part_rings[1:]]
+    bbox = np.array(
+        [[*coords[s:e].min(axis=0), *coords[s:e].max(axis=0)] for s, e in zip(starts, ends)]
+    ).reshape(-1, 4)
+    return {
+        "coords": coords,
+        "ring_offsets": ring_offsets,
+        "part_rings": part_rings,
+        "part_feature": np.asarray(part_feature, dtype=np.int64),
+        "bbox": bbox,
+    }
+
+
+def _with_edges(store):
+    """파트별로 연속된 변 목록 — 변 k 는 꼭짓점 k → k+1 (고리 마지막 꼭짓점 제외)"""
+    ro = store["ring_offsets"]
+    ring_edges = [np.arange(ro[r], ro[r + 1] - 1) for r in range(len(ro) - 1)]
+    edge_counts = (
+        np.add.reduceat(np.diff(ro) - 1, store["part_rings"][:-1])
+        if len(store["part_rings"]) > 1 else np.zeros(0, dtype=np.int64)
+    )
+    store["edges"] = np.concatenate(ring_edges) if ring_edges else np.zeros(0, dtype=np.int64)
+    store["part_edges"] = np.concatenate([[0], np.cumsum(edge_counts)]).astype(np.int64)
+    return store
+
+
+def load_store(name):
+    """사고다발지 파일 → 기하 저장소 dict (+ attrs: 행별 속성 DataFrame). 원본 해시별 디스크 캐시"""
+    attrs = read_table(name, columns=["위도", "경도"] + ATTRS)
+    raw = f"{HOTSPOT_FORMAT_VERSION}|{source_digest(DATA_DIR / name)}"
+    key = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+    stem = name.rsplit(".", 1)[0]
+    path = HOTSPOT_CACHE_DIR / f"{stem}.{key}.npz"
+    store = None
+    if path.exists():
+        try:
+            with np.load(path) as z:
+                store = {k: z[k] for k in z.files}
+        except (OSError, ValueError):
+            store = None
+    if store is None:
+        store = parse_polygons(read_table(name, columns=[POLYGON_COL])[POLYGON_COL])
+
+        def write(tmp):
+            with open(tmp, "wb") as f:
+                np.savez(f, **store)
+
+        save_versioned(path, write, stem)
+    store["attrs"] = attrs.reset_index(drop=True)
+    return _with_edges(store)
+
+
+def _candidate_pairs(store, lat, lon, pad_m):
+    """경계상자를 pad_m 만큼 넓혀 점이 들어가는 (학교 위치, 파트) 쌍"""
+    bbox = store["bbox"]
+    if len(bbox) == 0 or len(lat) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    pad_lat = pad_m / M_PER_DEG
+    pad_lon = pad_m / (M_PER_DEG * np.cos(np.radians(lat)))
+    step = max(1, _PAIR_CHUNK // len(bbox))
+    si, pi = [], []
+    for s in range(0, len(lat), step):
+        la, lo, pl = lat[s:s + step, None], lon[s:s + step, None], pad_lon[s:s + step, None]
+        hit = (
+            (lo >= bbox[:, 0] - pl) & (lo <= bbox[:, 2] + pl)
+            & (la >= bbox[:, 1] - pad_lat) & (la <= bbox[:, 3] + pad_lat)
+        )
+        a, b = np.nonzero(hit)
+        si.append(a + s)
+        pi.append(b)
+    return np.concatenate(si), np.concatenate(pi)
+
+
+def point_part_distance(store, lat, lon, si, pi):
+    """(점 si, 파트 pi) 쌍마다 (포함 여부, 경계까지 거리 m — 포함이면 0)"""
+    if len(si) == 0:
+        return np.zeros(0, dtype=bool), np.zeros(0)
+    pe = store["part_edges"]
+    counts = pe[pi + 1] - pe[pi]
+    starts = np.cumsum(counts) - counts
+    pair = np.repeat(np.arange(len(si)), counts)
+    k = store["edges"][np.repeat(pe[pi], counts) + (np.arange(counts.sum()) - np.repeat(starts, counts))]
+
+    plat, plon = lat[si][pair], lon[si][pair]
+    kx = M_PER_DEG * np.cos(np.radians(plat))
+    c = store["coords"]
+    x1, y1 = (c[k, 0] - plon) * kx, (c[k, 1] - plat) * M_PER_DEG
+    x2, y2 = (c[k + 1, 0] - plon) * kx, (c[k + 1, 1] - plat) * M_PER_DEG
+
+    # 포함: 점에서 +x 방향 반직선과의 교차 수 홀짝 (구멍 고리도 같은 규칙)
+    spans = (y1 > 0) != (y2 > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_at = x1 - y1 * (x2 - x1) / (y2 - y1)
+    crossings = np.bincount(pair, weights=spans & (x_at > 0), minlength=len(si))
+    inside = crossings % 2 == 1
+
+    # 거리: 원점에서 선분까지
+    dx, dy = x2 - x1, y2 - y1
+    length2 = dx * dx + dy * dy
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.clip(np.where(length2 > 0, -(x1 * dx + y1 * dy) / length2, 0.0), 0.0, 1.0)
+    dist = np.minimum.reduceat(np.hypot(x1 + t * dx, y1 + t * dy), starts)
+    return inside, np.where(inside, 0.0, dist)
+
+
+def join(store, lat, lon, radius_m):
+    """학교 × 다발지(행) 공간 조인 → DataFrame[school, hotspot, inside, distance_m] (거리 radius_m 이내)"""
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    si, pi = _candidate_pairs(store, lat, lon, radius_m)
+    # 펼친 변 배열이 _EDGE_CHUNK 개를 넘지 않도록 후보 쌍을 나눠 계산
+    pe = store["part_edges"]
+    cum = np.cumsum(pe[pi + 1] - pe[pi])
+    bounds = np.searchsorted(cum, np.arange(_EDGE_CHUNK, cum[-1] if len(cum) else 0, _EDGE_CHUNK))
+    inside, dist = [], []
+    for a, b in zip(np.r_[0, bounds], np.r_[bounds, len(si)]):
+        i, d = point_part_distance(store, lat, lon, si[a:b], pi[a:b])
+        inside.append(i)
+        dist.append(d)
+    inside = np.concatenate(inside) if inside else np.zeros(0, dtype=bool)
+    dist = np.concatenate(dist) if dist else np.zeros(0)
+    pairs = pd.DataFrame({
+        "school": si, "hotspot": store["part_feature"][pi], "inside": inside, "distance_m": dist,
+    })
+    # MultiPolygon 파트는 다발지 단위로 합침
+    pairs = pairs.groupby(["school", "hotspot"], sort=True).agg(inside=("inside", "max"), distance_m=("distance_m", "min"))
+    return pairs[pairs["distance_m"] <= radius_m].reset_index()
+
+
+def exposure(store, lat, lon, radius_m=DEFAULT_RADIUS_M):
+    """학교별 사고다발지 노출 — 한 번의 벡터 조인
+
+    사고다발지_포함 (학교 위치를 포함하는 다발지 수), 사고다발지_수 (경계가 radius_m 이내),
+    사고다발지_발생건수 · 사상자수 · 중상자수 · 심각도 (그 다발지들의 합), 사고다발지_최근접_m
+    """
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    n = len(lat)
+    pairs = join(store, lat, lon, max(radius_m, NEAREST_SEARCH_M))
+    near = pairs[pairs["distance_m"] <= radius_m]
+    attrs = store["attrs"]
+    out = pd.DataFrame({
+        "사고다발지_포함": np.bincount(near["school"], weights=near["inside"], minlength=n).astype(int),
+        "사고다발지_수": np.bincount(near["school"], minlength=n),
+    })
+    for col, label in [("발생건수", "발생건수"), ("사상자수", "사상자수"), ("중상자수", "중상자수"), ("사고심각도", "심각도")]:
+        w = attrs[col].to_numpy(dtype=float)[near["hotspot"].to_numpy()]
+        out[f"사고다발지_{label}"] = np.bincount(near["school"], weights=np.nan_to_num(w), minlength=n)
+    nearest = pairs.groupby("school")["distance_m"].min()
+    out["사고다발지_최근접_m"] = nearest.reindex(range(n)).to_numpy()
+    return out
+
+
+def view_geojson(store, bounds, zoom, budget):
+    """bounds 와 경계상자가 겹치는 다발지 폴리곤 FeatureCollection
+
+    MIN_POLYGON_ZOOM 미만이거나 budget 을 넘으면 None (호출 쪽이 포인트로 대체).
+    줌 15 미만에서는 꼭짓점을 솎아(14: 1/2, 13: 1/4) 페이로드를 줄인다.
+    """
+    if zoom < MIN_POLYGON_ZOOM:
+        return None
+    south, west, north, east = bounds
+    bbox = store["bbox"]
+    hit = np.nonzero((bbox[:, 2] >= west) & (bbox[:, 0] <= east) & (bbox[:, 3] >= south) & (bbox[:, 1] <= north))[0]
+    features = np.unique(store["part_feature"][hit])
+    if len(features) > budget:
+        return None
+    step = 1 if zoom >= 15 else (2 if zoom == 14 else 4)
+    c, ro, pr = store["coords"], store["ring_offsets"], store["part_rings"]
+    polygons = {}
+    for p in hit:
+        rings = []
+        for r in range(pr[p], pr[p + 1]):
+            ring = c[ro[r]:ro[r + 1] - 1][::step]
+            if len(ring) < 3:
+                ring = c[ro[r]:ro[r + 1] - 1]
+            rings.append(np.round(np.vstack([ring, ring[:1]]), 5).tolist())
+        polygons.setdefault(int(store["part_feature"][p]), []).append(rings)
+
+    attrs = store["attrs"]
+    out = []
+    for f, parts in polygons.items():
+        row = attrs.iloc[f]
+        geometry = (
+            {"type": "Polygon", "coordinates": parts[0]} if len(parts) == 1
+            else {"type": "MultiPolygon", "coordinates": parts}
+        )
+        out.append({
+            "type": "Feature",
+            "geometry": geometry,
+            "properties": {
+                "tip": f"사고다발지: {row['사고지역위치명']} · {row['사고유형구분']} {int(row['사고년도'])}"
+                       f" · 발생 {int(row['발생건수'])}건 · 사상자 {int(row['사상자수'])}명",
+                "severity": float(row["사고심각도"]),
+            },
+        })
+    return {"type": "FeatureCollection", "features": out}
+
+
+def build_point_index(points, weights=PROXIMITY_WEIGHTS):
+    """다발지 대표점 → (haversine BallTree, 가중치 행렬, 가중치 컬럼). 좌표 없는 행 제외, 가중치 결측은 0"""
+    pts = points.dropna(subset=["위도", "경도"])
+    tree = build_tree(pts["위도"].to_numpy(dtype=float), pts["경도"].to_numpy(dtype=float))
+    W = np.nan_to_num(pts.reindex(columns=weights).to_numpy(dtype=float))
+    return tree, W, list(weights)
+
+
+def proximity_features(index, lat, lon, radius_m):
+    """학교별 반경 radius_m 안 다발지 수와 가중 합
+
+    컬럼: 사고다발지_{r}m, 사고다발지_발생건수_{r}m, 사고다발지_사상자수_{r}m, 사고다발지_중상자수_{r}m
+    """
+    tree, W, weights = index
+    X = to_radians(lat, lon)
+    r = float(radius_m) / EARTH_RADIUS_M
+    n = len(X)
+    counts = np.zeros(n, dtype=np.int64)
+    sums = np.zeros((n, len(weights)))
+    for s in range(0, n, _QUERY_CHUNK):
+        neighbors = tree.query_radius(X[s:s + _QUERY_CHUNK], r)
+        lens = np.fromiter((len(i) for i in neighbors), dtype=np.int64, count=len(neighbors))
+        counts[s:s + len(neighbors)] = lens
+        if lens.sum() == 0:
+            continue
+        flat = np.concatenate(neighbors)
+        owner = np.repeat(np.arange(len(neighbors)), lens)
+        for j in range(len(weights)):
+            sums[s:s + len(neighbors), j] = np.bincount(owner, weights=W[flat, j], minlength=len(neighbors))
+    tag = f"{int(radius_m)}m"
+    out = pd.DataFrame({f"사고다발지_{tag}": counts})
+    for j, w in enumerate(weights):
+        out[f"사고다발지_{w}_{tag}"] = sums[:, j]
+    return out
@@ -0,0 +1,152 @@
+"""
+로드뷰 이미지 파생본 — 화면 슬롯별 크기의 WebP 썸네일
+
+data/roadview/*.jpg 원본(800px, 평균 80KB)을 그대로 브라우저로 보내지 않고,
+원본 내용 해시를 키로 크기별 파생본을 data/.cache/img/ 에 만들어 둔다.
+Pillow 에 WebP 인코더가 없으면 JPEG 로 만든다.
+
+    python -m schoolzone.images     # 모든 로드뷰 × 크기 사전 생성
+"""
+
+import difflib
+import hashlib
+import io
+import re
+import unicodedata
+from pathlib import Path
+
+from PIL import Image, features
+
+from schoolzone.store import CACHE_DIR, DATA_DIR, atomic_write, source_digest
+
+ROADVIEW_DIR = DATA_DIR / "roadview"
+IMAGE_CACHE_DIR = CACHE_DIR / "img"
+
+# 도시별 로드뷰 폴더 (파일명: <시설물명, 공백→_>_<방향>.jpg). 광명시는 아직 수집 전
+ROADVIEW_SOURCES = {"성남시": ROADVIEW_DIR}
+DEFAULT_DIRECTION = "북쪽"
+
+# 정규화 이름이 정확히 같지 않을 때 같은 시설로 볼 최소 유사도
+NAME_MATCH_CUTOFF = 0.9
+
+# 슬롯 → 최대 폭(px). 원본보다 크게 늘리지 않음
+IMAGE_SIZES = {"thumb": 240, "card": 480, "full": 800}
+
+IMAGE_QUALITY = 78
+
+# 인코딩 설정이 바뀌면 올려서 기존 파생본 무효화
+IMAGE_FORMAT_VERSION = 1
+
+
+def image_format():
+    return "webp" if features.check("webp") else "jpeg"
+
+
+def derivative_path(path, size="card"):
+    """원본 path 의 size 슬롯 파생본 캐시 경로 (원본 내용 해시 + 인코딩 설정 키)"""
+    fmt = image_format()
+    key = hashlib.sha1(
+        f"{source_digest(path)}|{IMAGE_SIZES[size]}|{fmt}|{IMAGE_QUALITY}|{IMAGE_FORMAT_VERSION}".encode("utf-8")
+    ).hexdigest()[:16]
+    return IMAGE_CACHE_DIR / f"{key}.{size}.{fmt}"
+
+
+def encode(path, size="card"):
+    """원본을 슬롯 폭으로 줄여 인코딩한 bytes"""
+    fmt = image_format()
+    with Image.open(path) as im:
+        im = im.convert("RGB")
+        width = IMAGE_SIZES[size]
+        if im.width > width:
+            im = im.resize((width, round(im.height * width / im.width)), Image.LANCZOS)
+        buf = io.BytesIO()
+        if fmt == "webp":
+            im.save(buf, format="WEBP", quality=IMAGE_QUALITY, method=4)
+        else:
+            im.save(buf, format="JPEG", quality=IMAGE_QUALITY, optimize=True, progressive=True)
+    return buf.getvalue()
+
+
+def derivative_bytes(path, size="card"):
+    """size 슬롯 파생본 bytes — 디스크 캐시에 있으면 읽고, 없으면 만들어 저장"""
+    out = derivative_path(path, size)
+    try:
+        return out.read_bytes()
+    except OSError:
+        pass
+    data = encode(path, size)
+    try:
+        atomic_write(out, lambda tmp: Path(tmp).write_bytes(data))
+    except OSError:
+        pass
+    return data
+
+
+def normalize_name(name):
+    """시설명 비교 키: NFC 정규화 + 공백·밑줄 제거 + 소문자"""
+    return re.sub(r"[\s_]+", "", unicodedata.normalize("NFC", str(name))).lower()
+
+
+def _scan(folder):
+    """폴더 → {정규화 이름: {방향: Path}}"""
+    assets = {}
+    for path in sorted(Path(folder).glob("*.jpg")):
+        stem = unicodedata.normalize("NFC", path.stem)
+        name, _, direction = stem.rpartition("_")
+        if not name:
+            name, direction = stem, DEFAULT_DIRECTION
+        assets.setdefault(normalize_name(name), {})[direction] = path
+    return assets
+
+
+def build_roadview_index(frames, sources=None):
+    """
+    {(도시, 시설물명): {방향: Path}} — 앱 시작 시 한 번 생성
+
+    frames 는 {도시: 시설물명 컬럼이 있는 DataFrame}. 정규화 이름이 같으면 바로 연결하고,
+    남은 시설은 아직 주인이 없는 이미지 중 가장 비슷한 이름(NAME_MATCH_CUTOFF 이상)과
+    한 번만 맞춰 둔다. 도시 키를 포함하므로 다른 도시의 동명 시설과 섞이지 않는다.
+    크기 변형은 IMAGE_SIZES 슬롯으로 derivative_bytes 에서 만든다.
+    """
+    sources = ROADVIEW_SOURCES if sources is None else sources
+    index = {}
+    for city, folder in sources.items():
+        if city not in frames:
+            continue
+        assets = _scan(folder)
+        names = list(dict.fromkeys(frames[city]["시설물명"].dropna()))
+        unmatched = []
+        for name in names:
+            key = normalize_name(name)
+            if key in assets:
+                index[(city, name)] = assets[key]
+            else:
+                unmatched.append(name)
+        claimed = {normalize_name(name) for name in names}
+        free = [k for k in assets if k not in claimed]
+        for name in unmatched:
+            close = difflib.get_close_matches(normalize_name(name), free, n=1, cutoff=NAME_MATCH_CUTOFF)
+            if close:
+                index[(city, name)] = assets[close[0]]
+                free.remove(close[0])
+    return index
+
+
+def warm_all():
+    """모든 로드뷰 × 크기 파생본 생성, 쓰이지 않는 옛 파생본 삭제 → (원본 bytes, 파생본 bytes 크기별)"""
+    live = set()
+    totals = {"원본": 0, **{size: 0 for size in IMAGE_SIZES}}
+    for path in sorted(ROADVIEW_DIR.glob("*.jpg")):
+        totals["원본"] += path.stat().st_size
+        for size in IMAGE_SIZES:
+            totals[size] += len(derivative_bytes(path, size))
+            live.add(derivative_path(path, size).name)
+    for old in IMAGE_CACHE_DIR.glob("*.*.*"):
+        if old.name not in live and not old.name.startswith("."):
+            old.unlink(missing_ok=True)
+    return totals
+
+
+if __name__ == "__main__":
+    for _name, _bytes in warm_all().items():
+        print(f"{_name}: {_bytes / 1024:.0f} KB")
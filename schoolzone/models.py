@@ -0,0 +1,177 @@
+"""
+모델 학습 — 안전점수 회귀, 1단계 구조 모델, 2단계 통합 모델
+
+train_* 는 입력 DataFrame 을 받아 학습 결과를 반환하는 순수 함수이고,
+load_or_train 은 그 결과(파이프라인·CV AUC·facility_risk·coef_df)를
+학습 데이터 해시 + 하이퍼파라미터 + 피처 목록 + 학습 코드 키로 data/.models/ 에 저장해 두었다가
+입력이 그대로면 학습 없이 바로 읽는다.
+"""
+
+import hashlib
+import inspect
+import json
+import pickle
+
+import pandas as pd
+
+from schoolzone.config import FACILITY_COLS
+from schoolzone.store import DATA_DIR, save_versioned
+
+MODEL_DIR = DATA_DIR / ".models"
+
+# 저장 포맷(반환 튜플 구성 등)이 바뀌면 올려서 기존 모델 파일 무효화
+MODEL_FORMAT_VERSION = 1
+
+SAFETY_FEATURES = FACILITY_COLS + ["발생건수", "어린이비율"]
+STRUCTURE_FEATURES = ["p_wide", "p_barrier_yes", "road_width_relative",
+                      "sidewalk_ratio", "parked_density"]
+INTEGRATED_FEATURES = ["structure_risk"] + FACILITY_COLS + ["어린이 비율(%)"]
+
+# 학습기별 입력 피처 — 모델 캐시 키에 포함 (목록이 바뀌면 다시 학습)
+TRAINER_FEATURES = {
+    "train_safety_model": SAFETY_FEATURES,
+    "train_structure_model": STRUCTURE_FEATURES,
+    "train_integrated_model": INTEGRATED_FEATURES,
+}
+
+STRUCTURE_PARAMS = {"max_iter": 1000, "random_state": 42, "cv": 5}
+INTEGRATED_PARAMS = {
+    "C": 1.0, "class_weight": "balanced", "solver": "lbfgs",
+    "max_iter": 2000, "random_state": 42, "cv": 5,
+}
+
+
+def train_safety_model(df, params=None):
+    """성남시 V6 안전점수 → LinearRegression (광명시 이식용)"""
+    from sklearn.linear_model import LinearRegression
+
+    feat = list(SAFETY_FEATURES)
+    valid = df.dropna(subset=feat + ["최종안전점수_V6"])
+    X = valid[feat]
+    y = valid["최종안전점수_V6"]
+    model = LinearRegression().fit(X, y)
+    r2 = model.score(X, y)
+    return model, feat, r2
+
+
+def train_structure_model(img_df, params=None):
+    """1단계: 도로 구조 → 사고 부근 여부 (로지스틱 회귀)"""
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.model_selection import cross_val_score
+
+    params = {**STRUCTURE_PARAMS, **(params or {})}
+    img_df = img_df.copy()
+    # accident_label이 데이터에 이미 포함된 경우 사용, 없으면 파일명 기반 추론
+    if "accident_label" not in img_df.columns:
+        img_df["accident_label"] = img_df["image"].str.contains("부근").astype(int)
+    img_df["accident_label"] = img_df["accident_label"].astype(int)
+
+    X = img_df[STRUCTURE_FEATURES].values
+    y = img_df["accident_label"].values
+
+    pipe = Pipeline([
+        ("scaler", StandardScaler()),
+        ("lr", LogisticRegression(max_iter=params["max_iter"], random_state=params["random_state"])),
+    ])
+    cv_auc = cross_val_score(pipe, X, y, cv=params["cv"], scoring="roc_auc")
+    pipe.fit(X, y)
+
+    # 시설물별 평균 structure_risk
+    img_df["structure_risk"] = pipe.predict_proba(X)[:, 1]
+    facility_risk = img_df.groupby("시설물명")["structure_risk"].mean().reset_index()
+
+    return pipe, float(cv_auc.mean()), facility_risk
+
+
+def train_integrated_model(ds, params=None):
+    """2차 통합 모델: 구조위험 + 시설 + 어린이비율 → 사고 발생 여부 (이진 분류, 개선)"""
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline as SkPipeline
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.model_selection import cross_val_score
+
+    params = {**INTEGRATED_PARAMS, **(params or {})}
+    ds = ds.copy()
+    ds["accident_label"] = (ds["발생건수"] >= 1).astype(int)
+
+    feat_cols = list(INTEGRATED_FEATURES)
+    X = ds[feat_cols].fillna(ds[feat_cols].median())
+    y = ds["accident_label"]
+
+    model = SkPipeline([
+        ("scaler", StandardScaler()),
+        ("lr", LogisticRegression(
+            C=params["C"], class_weight=params["class_weight"],
+            solver=params["solver"], max_iter=params["max_iter"],
+            random_state=params["random_state"],
+        )),
+    ])
+    cv_auc = cross_val_score(model, X, y, cv=params["cv"], scoring="roc_auc")
+    model.fit(X, y)
+
+    # 사고 발생 클래스(1) 계수
+    coef_df = pd.DataFrame({
+        "변수": feat_cols,
+        "계수": model.named_steps["lr"].coef_[0],
+    }).sort_values("계수")
+
+    auc_score = round(cv_auc.mean(), 2)
+    return model, feat_cols, auc_score, coef_df
+
+
+_DEFAULT_PARAMS = {
+    "train_safety_model": {},
+    "train_structure_model": STRUCTURE_PARAMS,
+    "train_integrated_model": INTEGRATED_PARAMS,
+}
+
+
+def frame_digest(df):
+    """DataFrame 내용 해시 (컬럼명·dtype·값·인덱스)"""
+    h = hashlib.sha1()
+    h.update(json.dumps([(str(c), str(t)) for c, t in df.dtypes.items()], ensure_ascii=False).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    return h.hexdigest()[:16]
+
+
+def trainer_digest(trainer):
+    """학습 함수 소스 해시 (전처리가 바뀌면 캐시 무효화, 소스를 못 읽으면 바이트코드)"""
+    try:
+        code = inspect.getsource(trainer).encode("utf-8")
+    except (OSError, TypeError):
+        code = trainer.__code__.co_code
+    return hashlib.sha1(code).hexdigest()[:12]
+
+
+def load_or_train(trainer, df, params=None):
+    """
+    trainer(df, params) 결과를 디스크 캐시 경유로 반환
+
+    키 = 학습 데이터 해시 + 하이퍼파라미터 + 입력 피처 목록 + 학습 함수 소스 해시
+    + scikit-learn 버전 + MODEL_FORMAT_VERSION. 파일이 깨졌거나 쓸 수 없는 환경이면
+    그냥 학습해서 반환한다.
+    """
+    import joblib
+    import sklearn
+
+    name = trainer.__name__
+    params = {**_DEFAULT_PARAMS.get(name, {}), **(params or {})}
+    raw = json.dumps({
+        "format": MODEL_FORMAT_VERSION, "sklearn": sklearn.__version__,
+        "data": frame_digest(df), "params": params,
+        "features": list(TRAINER_FEATURES.get(name, [])), "code": trainer_digest(trainer),
+    }, sort_keys=True, ensure_ascii=False)
+    key = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+    path = MODEL_DIR / f"{name}.{key}.joblib"
+
+    if path.exists():
+        try:
+            return joblib.load(path)
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError, AttributeError, ImportError):
+            pass  # 깨졌거나 다른 환경에서 저장된 파일 → 다시 학습
+
+    result = trainer(df, params)
+    save_versioned(path, lambda tmp: joblib.dump(result, tmp), name)
+    return result
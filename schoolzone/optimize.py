@@ -0,0 +1,246 @@
+"""
+예산 제약 시설 배치 최적화 — 어느 학교에 어떤 시설을 몇 개 설치할지
+
+두 가지 목표를 지원한다.
+
+- "prob": 통합 모델 예측 사고확률 합계 최소화. 학교 × 시설 +1 후보 전체를 한 번의
+  predict_proba 로 평가한 뒤, 비용 대비 감소량이 가장 큰 후보부터 고르는 lazy greedy.
+  후보를 채택하면 그 학교의 9개 후보만 다시 (한 번의 호출로) 평가한다.
+- "grade": D등급을 벗어나는 학교 수 최대화. 안전점수 회귀의 시설 1개당 증분으로
+  도시별 C등급 하한까지의 부족분을 메우는 정수계획(scipy.optimize.milp). scipy 가 없거나
+  규모가 크거나 시간 안에 해를 못 찾으면 학교별 최소 비용 순 greedy 로 대신한다.
+"""
+
+import heapq
+import math
+
+import numpy as np
+import pandas as pd
+
+from schoolzone.config import FACILITY_COLS
+
+# 시설 1개 설치 단가 기본값 (단위 없음 — 화면에서 실제 단가로 바꿔 입력)
+DEFAULT_UNIT_COSTS = {f: 1.0 for f in FACILITY_COLS}
+
+# 한 학교에 같은 시설을 최대 몇 개까지 추가할지
+DEFAULT_MAX_UNITS = 5
+
+# 정수계획 시간 제한과 규모 상한 (변수 수 초과 시 바로 greedy)
+ILP_TIME_LIMIT_S = 5.0
+ILP_MAX_VARS = 20000
+
+
+def integrated_inputs(df, feats):
+    """점수 프레임 → 통합 모델 입력 (어린이 비율(%) 은 어린이비율로, 결측은 0)"""
+    X = df.reindex(columns=feats).astype(float)
+    if "어린이 비율(%)" in feats and "어린이비율" in df.columns:
+        X["어린이 비율(%)"] = X["어린이 비율(%)"].fillna(df["어린이비율"])
+    return X.fillna(0).reset_index(drop=True)
+
+
+def _bumped(X, col_idx, units=1):
+    """X (n, d) 의 각 행 × col_idx 각 열 +units 를 쌓은 (n*k, d) 배열 (행 i, 시설 j 순)"""
+    k = len(col_idx)
+    rep = np.repeat(X, k, axis=0)
+    rep[np.arange(len(rep)), np.tile(col_idx, len(X))] += units
+    return rep
+
+
+def _plan_frame(df, picks, costs):
+    """(행 번호, 시설, 수량, 효과) 목록 → 학교별 설치안 DataFrame"""
+    if not picks:
+        return pd.DataFrame(columns=["시설물명", "시설물", "추가 수량", "비용", "효과"])
+    plan = pd.DataFrame(picks, columns=["_row", "시설물", "추가 수량", "효과"])
+    plan = plan.groupby(["_row", "시설물"], as_index=False).agg({"추가 수량": "sum", "효과": "sum"})
+    plan["시설물명"] = df["시설물명"].to_numpy()[plan["_row"]]
+    if "도시" in df.columns:
+        plan["도시"] = df["도시"].to_numpy()[plan["_row"]]
+    plan["비용"] = plan["시설물"].map(costs) * plan["추가 수량"]
+    lead = ["도시"] if "도시" in plan.columns else []
+    return plan[lead + ["시설물명", "시설물", "추가 수량", "비용", "효과"]].sort_values(
+        "효과", ascending=False
+    ).reset_index(drop=True)
+
+
+def minimize_accident_prob(df, model, feats, costs, budget, max_units=DEFAULT_MAX_UNITS):
+    """
+    예산 안에서 통합 모델 사고확률 합계를 최소화하는 설치안 (lazy greedy)
+
+    반환: (설치안 DataFrame, 요약 dict). 효과 = 사고확률 감소량(합계).
+    """
+    feats = list(feats)
+    cols = [c for c in FACILITY_COLS if c in feats and costs.get(c, 0) > 0]
+    X = integrated_inputs(df, feats)
+    n, k = len(X), len(cols)
+    base = model.predict_proba(X)[:, 1]
+    summary = {"대상 학교": n, "예산": budget, "사용": 0.0, "설치 수": 0,
+               "사고확률 합계(전)": float(base.sum()), "사고확률 합계(후)": float(base.sum())}
+    if n == 0 or k == 0:
+        return _plan_frame(df, [], costs), summary
+
+    # 모델 호출은 feats 이름을 단 프레임으로 (배열 조작은 numpy 로)
+    def proba(arr):
+        return model.predict_proba(pd.DataFrame(arr, columns=feats))[:, 1]
+
+    cur = X.to_numpy(dtype=float)
+    col_idx = np.array([feats.index(c) for c in cols])
+    prob = base.copy()
+    added = np.zeros((n, k), dtype=int)
+    cost = np.array([costs[c] for c in cols], dtype=float)
+    version = np.zeros(n, dtype=int)
+
+    gain = prob[:, None] - proba(_bumped(cur, col_idx)).reshape(n, k)
+    heap = [(-gain[i, j] / cost[j], i, j, 0) for i, j in zip(*np.nonzero(gain > 0))]
+    heapq.heapify(heap)
+
+    remaining = float(budget)
+    picks = []
+    while heap and remaining >= cost.min():
+        neg_ratio, i, j, ver = heapq.heappop(heap)
+        if ver != version[i] or cost[j] > remaining or added[i, j] >= max_units:
+            continue
+        g = -neg_ratio * cost[j]
+        remaining -= cost[j]
+        added[i, j] += 1
+        cur[i, col_idx[j]] += 1
+        prob[i] -= g
+        picks.append((i, cols[j], 1, g))
+
+        # 채택한 학교의 후보만 다시 평가 (한 번의 호출)
+        version[i] += 1
+        nxt = prob[i] - proba(_bumped(cur[i:i + 1], col_idx))
+        for jj in np.flatnonzero((nxt > 0) & (added[i] < max_units)):
+            heapq.heappush(heap, (-nxt[jj] / cost[jj], i, jj, version[i]))
+
+    summary.update({"사용": float(budget) - remaining, "설치 수": len(picks),
+                    "사고확률 합계(후)": float(prob.sum())})
+    return _plan_frame(df, picks, costs), summary
+
+
+def _score_gains(df, safety_model, safety_feats, cols):
+    """안전점수 회귀의 학교 × 시설 1개당 점수 증분 (n, k) — 한 번의 predict"""
+    safety_feats = list(safety_feats)
+    X = df.reindex(columns=safety_feats).astype(float)
+    X["어린이비율"] = X["어린이비율"].fillna(X["어린이비율"].median())
+    X = X.fillna(0).to_numpy()
+    col_idx = np.array([safety_feats.index(c) for c in cols])
+    base = safety_model.predict(pd.DataFrame(X, columns=safety_feats))
+    bumped = safety_model.predict(pd.DataFrame(_bumped(X, col_idx), columns=safety_feats))
+    return bumped.reshape(len(X), len(cols)) - base[:, None]
+
+
+def d_exit_cutoffs(df, score_col="활성_안전점수", grade_col="등급"):
+    """행별 D등급 탈출 점수 = 같은 도시 C등급 이상 최저 점수 (도시 컬럼이 없으면 프레임 전체)"""
+    upper = df[score_col].where(df[grade_col] != "D")
+    if "도시" in df.columns:
+        return upper.groupby(df["도시"]).transform("min").to_numpy(dtype=float)
+    return np.full(len(df), upper.min())
+
+
+def _min_cost_exit(need, gain, cost, max_units):
+    """한 학교가 점수 need 를 채우는 최소 비용 근사 → (비용, {열 번호: 수량}) / 불가면 (inf, {})"""
+    best = (math.inf, {})
+    usable = [j for j in range(len(cost)) if gain[j] > 0]
+    # 한 종류만으로 채우기
+    for j in usable:
+        units = math.ceil(need / gain[j])
+        if units <= max_units and units * cost[j] < best[0]:
+            best = (units * cost[j], {j: units})
+    # 효율 순으로 채우고 마지막 부족분은 그것만으로 메울 수 있는 가장 싼 시설로
+    left, spent, mix = need, 0.0, {}
+    for j in sorted(usable, key=lambda j: -gain[j] / cost[j]):
+        if left <= 0:
+            break
+        units = min(max_units, int(left // gain[j]))
+        if units:
+            mix[j] = units
+            spent += units * cost[j]
+            left -= units * gain[j]
+        if left > 0:
+            fill = [jj for jj in usable if mix.get(jj, 0) < max_units and gain[jj] >= left]
+            if fill:
+                jj = min(fill, key=lambda jj: cost[jj])
+                cand = dict(mix)
+                cand[jj] = cand.get(jj, 0) + 1
+                if spent + cost[jj] < best[0]:
+                    best = (spent + cost[jj], cand)
+    if left <= 0 and spent < best[0]:
+        best = (spent, mix)
+    return best
+
+
+def _exit_ilp(need, gain, cost, budget, max_units):
+    """정수계획: max Σ y_s  s.t. Σ_f gain·n ≥ need·y, Σ cost·n ≤ budget → (y, n) / 실패 시 None"""
+    try:
+        from scipy.optimize import Bounds, LinearConstraint, milp
+        from scipy.sparse import bmat, diags, hstack, kron, eye
+    except ImportError:
+        return None
+    m, k = gain.shape
+    if m * (k + 1) > ILP_MAX_VARS:
+        return None
+    # 변수 = [n (m*k), y (m)]
+    c = np.concatenate([np.zeros(m * k), -np.ones(m)])
+    cover = hstack([kron(eye(m), np.ones((1, k))).multiply(gain.reshape(1, -1)), diags(-need)])
+    spend = np.concatenate([np.tile(cost, m), np.zeros(m)]).reshape(1, -1)
+    res = milp(
+        c,
+        constraints=[LinearConstraint(bmat([[cover]]), lb=0), LinearConstraint(spend, ub=budget)],
+        integrality=np.ones(m * k + m),
+        bounds=Bounds(0, np.concatenate([np.full(m * k, max_units), np.ones(m)])),
+        options={"time_limit": ILP_TIME_LIMIT_S},
+    )
+    if res.x is None:
+        return None
+    x = np.round(res.x).astype(int)
+    return x[m * k:], x[:m * k].reshape(m, k)
+
+
+def maximize_grade_exit(df, safety_model, safety_feats, costs, budget,
+                        max_units=DEFAULT_MAX_UNITS, score_col="활성_안전점수", grade_col="등급"):
+    """
+    예산 안에서 D등급을 벗어나는 학교 수 최대화
+
+    점수 변화는 안전점수 회귀의 시설 1개당 증분을 현재 점수에 더해 근사하고,
+    탈출 기준은 d_exit_cutoffs (도시별 C등급 이상 최저 점수).
+    반환: (설치안 DataFrame, 요약 dict). 효과 = 안전점수 상승분.
+    """
+    cols = [c for c in FACILITY_COLS if c in safety_feats and costs.get(c, 0) > 0]
+    d_rows = np.flatnonzero(df[grade_col].to_numpy() == "D")
+    summary = {"대상 학교": len(d_rows), "예산": budget, "사용": 0.0, "설치 수": 0,
+               "D 탈출": 0, "방법": "-"}
+    if len(d_rows) == 0 or not cols:
+        return _plan_frame(df, [], costs), summary
+
+    sub = df.iloc[d_rows]
+    gain = _score_gains(sub, safety_model, safety_feats, cols)
+    # 기준 점수와 같으면 C등급이므로 부족분만 채우면 됨 (이미 넘은 학교도 최소 1개는 설치)
+    need = np.maximum(d_exit_cutoffs(df, score_col, grade_col)[d_rows]
+                      - sub[score_col].to_numpy(dtype=float), 1e-6)
+    cost = np.array([costs[c] for c in cols], dtype=float)
+
+    picks = []
+    solved = _exit_ilp(need, gain, cost, budget, max_units)
+    if solved is not None:
+        chosen, units = solved
+        for s in np.flatnonzero(chosen):
+            for j in np.flatnonzero(units[s]):
+                picks.append((d_rows[s], cols[j], int(units[s, j]), float(units[s, j] * gain[s, j])))
+        summary["방법"] = "정수계획"
+        summary["D 탈출"] = int(chosen.sum())
+    else:
+        options = [(_min_cost_exit(need[s], gain[s], cost, max_units), s) for s in range(len(d_rows))]
+        remaining = float(budget)
+        for (c, mix), s in sorted(options, key=lambda o: o[0][0]):
+            if c > remaining:
+                break
+            remaining -= c
+            summary["D 탈출"] += 1
+            for j, u in mix.items():
+                picks.append((d_rows[s], cols[j], u, float(u * gain[s, j])))
+        summary["방법"] = "greedy"
+
+    plan = _plan_frame(df, picks, costs)
+    summary["사용"] = float(plan["비용"].sum()) if len(plan) else 0.0
+    summary["설치 수"] = int(plan["추가 수량"].sum()) if len(plan) else 0
+    return plan, summary
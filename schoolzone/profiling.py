@@ -0,0 +1,204 @@
+"""
+실행 계측 (opt-in) — 구간 타이머 · 바이트 카운터 · 캐시 적중/미스
+
+켜는 법: 환경변수 SCHOOLZONE_PROFILE 또는 URL 쿼리 ?profile=
+    1 / panel : 사이드바 타이밍 워터폴
+    log       : 워터폴 + rerun 마다 구조화 로그 한 줄 (logger "schoolzone.profile", JSON)
+
+한 번의 스크립트 실행(rerun)마다 Recorder 하나가 스크립트 스레드에 붙는다.
+꺼져 있으면 모든 래퍼가 원래 함수를 그대로 부르고, 추가 비용은 스레드 로컬 조회 한 번이다.
+fragment 만 재실행될 때는 기록하지 않는다 (사이드바 패널이 전체 실행에서만 그려지므로).
+"""
+
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+ENV_VAR = "SCHOOLZONE_PROFILE"
+QUERY_PARAM = "profile"
+MODES = {"1": "panel", "true": "panel", "panel": "panel", "log": "log"}
+
+logger = logging.getLogger("schoolzone.profile")
+
+_local = threading.local()
+
+
+class Recorder:
+    """한 rerun 의 구간 기록 — start/end 는 실행 시작 기준 초"""
+
+    def __init__(self, mode):
+        self.mode = mode
+        self.t0 = time.perf_counter()
+        self.spans = []
+        self._stack = []
+        self._mark = None
+
+    def _now(self):
+        return time.perf_counter() - self.t0
+
+    def _open(self, name, kind, depth):
+        span = {"name": name, "kind": kind, "start": self._now(), "end": None, "depth": depth}
+        self.spans.append(span)
+        return span
+
+    @contextmanager
+    def section(self, name, kind="section"):
+        span = self._open(name, kind, len(self._stack) + (self._mark is not None))
+        self._stack.append(span)
+        try:
+            yield span
+        finally:
+            self._stack.pop()
+            span["end"] = self._now()
+
+    def mark(self, name):
+        """최상위 순차 구간 — 이전 mark 를 닫고 새 구간 시작 (들여쓰기 없이 모듈 코드 구획)"""
+        now = self._now()
+        if self._mark is not None:
+            self._mark["end"] = now
+        self._mark = self._open(name, "mark", 0) if name else None
+
+    def add_bytes(self, nbytes, name=None):
+        """현재(또는 이름이 같은 마지막) 구간에 바이트 수 누적"""
+        target = None
+        if name is not None:
+            target = next((s for s in reversed(self.spans) if s["name"] == name), None)
+        elif self._stack:
+            target = self._stack[-1]
+        if target is not None:
+            target["bytes"] = target.get("bytes", 0) + int(nbytes)
+
+    def finish(self):
+        """열린 mark 를 닫고 요약 dict 반환 (log 모드면 로그 한 줄)"""
+        self.mark(None)
+        summary = {
+            "total_s": round(self._now(), 4),
+            "spans": [
+                {**s, "start": round(s["start"], 4), "end": round(s["end"] if s["end"] is not None else self._now(), 4)}
+                for s in self.spans
+            ],
+            "caches": self.cache_stats(),
+        }
+        if self.mode == "log":
+            logger.info(json.dumps({"event": "rerun", **summary}, ensure_ascii=False))
+        return summary
+
+    def cache_stats(self):
+        """st.cache_* 함수별 {hits, misses, seconds}"""
+        stats = {}
+        for s in self.spans:
+            if s["kind"] != "cache":
+                continue
+            entry = stats.setdefault(s["name"], {"hits": 0, "misses": 0, "seconds": 0.0})
+            entry["misses" if s.get("miss") else "hits"] += 1
+            entry["seconds"] += (s["end"] or s["start"]) - s["start"]
+        return stats
+
+
+def resolve_mode(query_params=None):
+    """환경변수 > 쿼리 파라미터 순으로 계측 모드 ("panel" / "log" / None)"""
+    value = os.environ.get(ENV_VAR) or (query_params or {}).get(QUERY_PARAM)
+    return MODES.get(str(value).strip().lower()) if value else None
+
+
+def start(mode):
+    """이 스레드의 새 rerun 기록 시작 (mode 가 None 이면 계측 끔)"""
+    _local.recorder = Recorder(mode) if mode else None
+    return _local.recorder
+
+
+def finish():
+    """기록 종료 → 요약 (계측이 꺼져 있으면 None)"""
+    rec, _local.recorder = current(), None
+    return rec.finish() if rec else None
+
+
+def current():
+    return getattr(_local, "recorder", None)
+
+
+def section(name, kind="section"):
+    rec = current()
+    return rec.section(name, kind) if rec else nullcontext()
+
+
+def mark(name):
+    rec = current()
+    if rec:
+        rec.mark(name)
+
+
+def add_bytes(nbytes, name=None):
+    rec = current()
+    if rec:
+        rec.add_bytes(nbytes, name)
+
+
+def traced(fn=None, *, name=None, kind="call", payload=None):
+    """함수 호출 구간 기록. payload(결과, *args, **kwargs) → 바이트 수 (계측 켜졌을 때만 계산)
+
+    name 이 호출 가능하면 name(*args, **kwargs) 로 구간 이름을 정한다.
+    """
+    if fn is None:
+        return functools.partial(traced, name=name, kind=kind, payload=payload)
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        rec = current()
+        if rec is None:
+            return fn(*args, **kwargs)
+        label = name(*args, **kwargs) if callable(name) else (name or fn.__name__)
+        with rec.section(label, kind) as span:
+            result = fn(*args, **kwargs)
+        if payload is not None:
+            span["bytes"] = int(payload(result, *args, **kwargs))
+        return result
+
+    return wrapper
+
+
+def cached(cache_decorator):
+    """st.cache_data / st.cache_resource 대체 데코레이터 — 호출마다 적중/미스와 시간 기록
+
+        cache_data = profiling.cached(st.cache_data)
+
+        @cache_data(max_entries=512)
+        def load_x(...): ...
+
+    미스 판별은 캐시 안쪽 함수가 실제로 실행됐는지로 한다. 캐시 키는 원래 함수의
+    이름·소스 그대로라 계측을 켜고 꺼도 같은 캐시를 쓴다.
+    """
+
+    def decorate(fn=None, **kwargs):
+        if fn is None:
+            return functools.partial(decorate, **kwargs)
+
+        @functools.wraps(fn)
+        def compute(*args, **kw):
+            rec = current()
+            if rec is not None and rec._stack:
+                # 이 함수의 구간이 아직 열려 있으면 미스 (중첩된 다른 캐시 함수 구간은 건드리지 않음)
+                for span in reversed(rec._stack):
+                    if span["kind"] == "cache" and span["name"] == fn.__name__:
+                        span["miss"] = True
+                        break
+            return fn(*args, **kw)
+
+        cached_fn = cache_decorator(**kwargs)(compute) if kwargs else cache_decorator(compute)
+
+        @functools.wraps(fn)
+        def call(*args, **kw):
+            rec = current()
+            if rec is None:
+                return cached_fn(*args, **kw)
+            with rec.section(fn.__name__, "cache"):
+                return cached_fn(*args, **kw)
+
+        call.clear = cached_fn.clear
+        return call
+
+    return decorate
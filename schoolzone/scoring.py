@@ -0,0 +1,176 @@
+"""
+스쿨존 점수 산출 — 성남시(IM 우선 · V6 fallback) / 광명시(IM 우선 · LR 이식 fallback)
+
+app.py 5절 앞부분에서 매 rerun 마다 돌던 병합·추론을 그대로 옮긴 순수 함수 모음.
+"""
+
+import numpy as np
+import pandas as pd
+
+from schoolzone.config import FACILITY_COLS, GRADE_LABELS
+from schoolzone.models import SAFETY_FEATURES
+
+# 3_final_gm.csv 원본 CV 컬럼 → 대시보드 표기
+CV_RENAME = {
+    "p_wide": "CV_도로폭확률",
+    "p_barrier_yes": "CV_분리장치확률",
+    "road_width_relative": "CV_도로상대폭",
+    "sidewalk_ratio": "CV_보행공간비율",
+    "parked_density": "CV_주정차밀도",
+}
+
+
+def prepare_gwangmyung(gm, default_gu="광명시"):
+    """광명(또는 구 구분 없는 도시) 원본에 없는 시설/구/유형 컬럼 기본값 채우기"""
+    gm = gm.copy()
+    for _fc in FACILITY_COLS:
+        if _fc not in gm.columns:
+            gm[_fc] = 0
+    if "구" not in gm.columns:
+        gm["구"] = default_gu
+    if "시설유형" not in gm.columns:
+        gm["시설유형"] = "초등학교"
+    return gm
+
+
+def score_seongnam(sn_raw, cv_df, fac_risk, improved, integ_model, integ_feats):
+    """성남시 142개소: CV·structure_risk·개선 모델 병합 + 사고확률 + 활성 점수/등급"""
+    df_sn = sn_raw.copy()
+    df_sn = df_sn.merge(cv_df, on="시설물명", how="left")
+
+    for _fc in ["보호구역표지판", "옐로카펫", "무단횡단방지펜스"]:
+        if _fc in df_sn.columns:
+            df_sn[_fc] = df_sn[_fc].fillna(0)
+
+    df_sn = df_sn.merge(fac_risk, on="시설물명", how="left")
+    df_sn["structure_risk"] = df_sn["structure_risk"].fillna(df_sn["structure_risk"].median())
+
+    # 개선 모델 결과 병합 (117개소)
+    _imp_merge = improved[["시설물명", "risk_prob", "risk_prob_calibrated",
+                           "safety_score", "safety_grade"]].copy()
+    _imp_merge.columns = ["시설물명", "IM_risk_prob", "IM_사고확률",
+                          "IM_안전점수", "IM_등급"]
+    df_sn = df_sn.merge(_imp_merge, on="시설물명", how="left")
+
+    # 어린이 비율(%) 컬럼 호환 (2nd dataset은 '어린이 비율(%)', 팀통합은 '어린이비율')
+    if "어린이 비율(%)" not in df_sn.columns and "어린이비율" in df_sn.columns:
+        df_sn["어린이 비율(%)"] = df_sn["어린이비율"]
+
+    # 사고확률: 개선 모델 결과 사용 (117개소), 나머지는 inline 모델
+    _prob_valid = df_sn.dropna(subset=integ_feats)
+    if len(_prob_valid) > 0:
+        _inline_prob = integ_model.predict_proba(
+            _prob_valid[integ_feats].fillna(0).values
+        )[:, 1]
+        df_sn.loc[_prob_valid.index, "_inline_사고확률"] = _inline_prob
+    # 개선 모델 결과 우선, 없으면 inline fallback
+    df_sn["사고확률"] = df_sn["IM_사고확률"].fillna(df_sn.get("_inline_사고확률", np.nan))
+
+    df_sn["_시설합계"] = df_sn[FACILITY_COLS].sum(axis=1)
+    # 개선 모델 점수/등급 우선, 없으면 V6 fallback (117개소 → 142개소)
+    df_sn["활성_안전점수"] = df_sn["IM_안전점수"].fillna(df_sn["최종안전점수_V6"])
+    df_sn["등급"] = df_sn["IM_등급"].fillna(df_sn["등급_V6"])
+    df_sn["안전등급"] = df_sn["등급"].map(GRADE_LABELS)
+    return df_sn
+
+
+def grade_thresholds(df_sn):
+    """성남시 활성 안전점수 사분위 (q1, q2, q3) — 광명 LR 점수 등급 기준"""
+    return tuple(float(q) for q in df_sn["활성_안전점수"].quantile([0.25, 0.5, 0.75]).values)
+
+
+# searchsorted 결과(넘은 기준선 수 0~3) → 등급
+GRADE_ORDER = np.array(["D", "C", "B", "A"])
+
+
+def grade_scores(scores, thresholds):
+    """점수 배열 → 등급 배열. 기준선(gs_q1..q3)과 같은 점수는 상위 등급, NaN 은 D"""
+    scores = np.asarray(scores, dtype=float)
+    idx = np.searchsorted(np.asarray(thresholds, dtype=float), scores, side="right")
+    return np.where(np.isnan(scores), "D", GRADE_ORDER[np.minimum(idx, 3)])
+
+
+def predict_safety(df, safety_model, thresholds, feats=SAFETY_FEATURES, child_fill=None):
+    """
+    도시 프레임 전체를 한 번에 LR 점수·등급으로 변환 → (scores, grades)
+
+    시설·사고 건수 결측은 0, 어린이비율 결측은 child_fill (없으면 해당 도시 중앙값, 전부
+    결측이면 10.0) 으로 채운다.
+    """
+    X = df.reindex(columns=feats).astype(float)
+    if "어린이비율" in feats:
+        if child_fill is None:
+            child_fill = X["어린이비율"].median() if X["어린이비율"].notna().any() else 10.0
+        X["어린이비율"] = X["어린이비율"].fillna(child_fill)
+    X = X.fillna(0)
+    scores = np.clip(safety_model.predict(X), 0, 100)
+    return scores, grade_scores(scores, thresholds)
+
+
+def score_gwangmyung(gm_raw, safety_model, thresholds, gm_improved=None, gm_full=None):
+    """광명시 51개소: 성남 LR 이식 점수 + 개선 모델(IM) 병합 + CV·structure_risk 병합"""
+    df_gm = prepare_gwangmyung(gm_raw)
+    for _fc in FACILITY_COLS:
+        if _fc in df_gm.columns:
+            df_gm[_fc] = df_gm[_fc].fillna(0)
+    df_gm["_LR_안전점수"], df_gm["_LR_등급"] = predict_safety(df_gm, safety_model, thresholds)
+
+    # 광명시 개선 모델 결과 병합 (IM 우선, LR fallback)
+    if gm_improved is not None:
+        _gm_imp_merge = gm_improved[["시설물명", "risk_prob_calibrated",
+                                     "safety_score", "safety_grade"]].copy()
+        _gm_imp_merge.columns = ["시설물명", "IM_사고확률", "IM_안전점수", "IM_등급"]
+        _gm_imp_merge = _gm_imp_merge.drop_duplicates(subset=["시설물명"], keep="first")
+        df_gm = df_gm.merge(_gm_imp_merge, on="시설물명", how="left")
+        df_gm["활성_안전점수"] = df_gm["IM_안전점수"].fillna(df_gm["_LR_안전점수"])
+        df_gm["등급"] = df_gm["IM_등급"].fillna(df_gm["_LR_등급"])
+        df_gm["사고확률"] = df_gm["IM_사고확률"]
+    else:
+        df_gm["활성_안전점수"] = df_gm["_LR_안전점수"]
+        df_gm["등급"] = df_gm["_LR_등급"]
+
+    df_gm["안전등급"] = df_gm["등급"].map(GRADE_LABELS)
+    df_gm["_시설합계"] = df_gm[FACILITY_COLS].sum(axis=1)
+
+    # 광명시 CV 피처 + structure_risk 병합 (3_final_gm.csv)
+    if gm_full is not None:
+        _gm_cv_cols = ["시설물명", "structure_risk"] + list(CV_RENAME.keys())
+        _gm_cv = gm_full[[c for c in _gm_cv_cols if c in gm_full.columns]].copy()
+        _gm_cv.rename(columns=CV_RENAME, inplace=True)
+        _gm_cv = _gm_cv.drop_duplicates(subset=["시설물명"], keep="first")
+        df_gm = df_gm.merge(_gm_cv, on="시설물명", how="left")
+        if "structure_risk" in df_gm.columns:
+            df_gm["structure_risk"] = df_gm["structure_risk"].fillna(df_gm["structure_risk"].median())
+    return df_gm
+
+
+def rescore_with_counts(df, counts, safety_model, safety_feats, integ_model, integ_feats,
+                        thresholds, radius_m=None):
+    """
+    시설 수를 counts 로 바꾼 뒤 모델로 점수·등급·사고확률 재산출
+
+    원본 V6/IM 점수는 고정 집계 기준이므로, 재집계 시에는 광명시와 같은
+    LR 이식 점수(성남 V6 회귀) + 통합 모델 사고확률을 쓴다.
+    """
+    out = df.copy()
+    out[FACILITY_COLS] = counts[FACILITY_COLS].values
+    _child = out["어린이비율"].fillna(out["어린이비율"].median())
+    out["활성_안전점수"], out["등급"] = predict_safety(out, safety_model, thresholds, feats=safety_feats)
+    out["안전등급"] = out["등급"].map(GRADE_LABELS)
+    if "어린이 비율(%)" not in out.columns:
+        out["어린이 비율(%)"] = _child
+    out["사고확률"] = integ_model.predict_proba(out[integ_feats].fillna(0))[:, 1]
+    out["_시설합계"] = out[FACILITY_COLS].sum(axis=1)
+    out["_재집계반경"] = radius_m
+    return out
+
+
+def external_auc(df_sn):
+    """외부검증: structure_risk 만으로 성남 시설 데이터 사고 여부를 맞추는 AUC"""
+    from sklearn.metrics import roc_auc_score
+
+    _ext_valid = df_sn.dropna(subset=["structure_risk", "발생건수"])
+    _ext_y = (_ext_valid["발생건수"] > 0).astype(int)
+    if len(_ext_y.unique()) > 1:
+        return float(roc_auc_score(_ext_y, _ext_valid["structure_risk"]))
+    return 0.5
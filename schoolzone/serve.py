@@ -0,0 +1,221 @@
+"""
+로컬 점수 서버 — 대시보드 밖 도구(시설 계획 시트, GIS 플러그인)용 사고확률·안전점수 HTTP API
+
+    python -m schoolzone serve [--host 127.0.0.1] [--port 8765] [--max-batch 512] [--max-wait-ms 5]
+
+    POST /score    {"zones": [{"신호등": 3, "횡단보도": 2, ...}, ...]}  (객체 하나 또는 배열도 가능)
+                   → {"results": [{"structure_risk", "사고확률", "활성_안전점수", "등급", "안전등급"}, ...]}
+    GET  /metrics  처리량·지연(p50/p95/p99)·배치 크기
+    GET  /health
+
+입력 행 형식과 산출은 배치 점수(batch.score_zones)와 같다. 모델 묶음은 시작할 때 한 번
+읽어 메모리에 두고(data/.models/ 캐시 경유라 오프라인), 동시에 들어온 요청은 최대
+max_wait_ms 동안 모아 한 프레임으로 합쳐 predict_proba 를 한 번만 부른다.
+"""
+
+import json
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from schoolzone import batch
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_MAX_BATCH = 512
+DEFAULT_MAX_WAIT_MS = 5.0
+# 요청 하나의 최대 행 수 (더 큰 파일은 python -m schoolzone score 로)
+MAX_REQUEST_ROWS = 10_000
+# 지연 백분위·최근 처리량 계산에 쓰는 최근 요청/배치 수
+METRICS_WINDOW = 10_000
+
+logger = logging.getLogger("schoolzone.serve")
+
+
+def parse_zones(payload):
+    """요청 JSON → batch.INPUT_COLUMNS 스키마의 float 프레임 (형식 오류는 ValueError)
+
+    별칭은 여기서 풀고 컬럼을 고정해 두므로, 다른 요청과 한 배치로 합쳐져도
+    (concat 으로 상대 요청의 컬럼이 생겨도) 혼자 보낸 것과 점수가 같다.
+    """
+    zones = payload.get("zones") if isinstance(payload, dict) and "zones" in payload else payload
+    if isinstance(zones, dict):
+        zones = [zones]
+    if not isinstance(zones, list) or not zones or not all(isinstance(z, dict) for z in zones):
+        raise ValueError("zones 는 스쿨존 객체 배열이어야 합니다")
+    if len(zones) > MAX_REQUEST_ROWS:
+        raise ValueError(f"요청당 최대 {MAX_REQUEST_ROWS:,}행 (더 큰 입력은 python -m schoolzone score)")
+    df = pd.DataFrame.from_records(zones)
+    for col in df.columns.intersection(batch.NUMERIC_COLUMNS):
+        try:
+            df[col] = pd.to_numeric(df[col]).astype(float)
+        except (TypeError, ValueError):
+            raise ValueError(f"'{col}' 은 숫자여야 합니다") from None
+    return batch.resolve_aliases(df).reindex(columns=batch.INPUT_COLUMNS).astype(float)
+
+
+def _records(scored):
+    out = scored[batch.OUTPUT_COLUMNS].astype(object)
+    return out.where(out.notna(), None).to_dict("records")
+
+
+class MicroBatcher:
+    """요청 프레임을 큐로 모아 score_zones 한 번으로 처리하는 단일 워커"""
+
+    def __init__(self, bundle, max_batch=DEFAULT_MAX_BATCH, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        self.bundle = bundle
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.totals = {"requests": 0, "rows": 0, "batches": 0, "errors": 0}
+        self._requests = deque(maxlen=METRICS_WINDOW)   # (완료 시각, 지연 s, 행 수)
+        self._batches = deque(maxlen=METRICS_WINDOW)    # (행 수, 요청 수, 점수 산출 s)
+        self._worker = threading.Thread(target=self._run, name="score-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, df):
+        """프레임 하나 제출 → 결과 레코드 목록을 담을 Future"""
+        future = Future()
+        self._queue.put((df, future, time.perf_counter()))
+        return future
+
+    def score(self, df, timeout=30):
+        return self.submit(df).result(timeout)
+
+    def _collect(self):
+        items = [self._queue.get()]
+        rows = len(items[0][0])
+        deadline = time.perf_counter() + self.max_wait
+        while rows < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            items.append(item)
+            rows += len(item[0])
+        return items
+
+    def _run(self):
+        while True:
+            items = self._collect()
+            sizes = [len(df) for df, _, _ in items]
+            started = time.perf_counter()
+            try:
+                frame = items[0][0] if len(items) == 1 else pd.concat([df for df, _, _ in items], ignore_index=True)
+                results = _records(batch.score_zones(frame.reset_index(drop=True), self.bundle))
+            except Exception as e:
+                logger.exception("배치 점수 산출 실패 (%d행)", sum(sizes))
+                for _, future, _ in items:
+                    future.set_exception(e)
+                with self._lock:
+                    self.totals["errors"] += len(items)
+                continue
+            done = time.perf_counter()
+            elapsed = done - started
+            offset = 0
+            with self._lock:
+                self.totals["batches"] += 1
+                self._batches.append((sum(sizes), len(items), elapsed))
+                for (_, _, enqueued), n in zip(items, sizes):
+                    self.totals["requests"] += 1
+                    self.totals["rows"] += n
+                    self._requests.append((done, done - enqueued, n))
+            for (_, future, _), n in zip(items, sizes):
+                future.set_result(results[offset:offset + n])
+                offset += n
+
+    def metrics(self, recent_s=60):
+        """누적·최근 처리량, 요청 지연 백분위(ms), 배치 크기·산출 시간"""
+        with self._lock:
+            requests, batches, totals = list(self._requests), list(self._batches), dict(self.totals)
+        now = time.perf_counter()
+        uptime = time.time() - self.started
+        recent = [r for r in requests if now - r[0] <= recent_s]
+        window = min(recent_s, uptime) or 1.0
+        latency = np.array([r[1] for r in requests]) * 1000
+        pct = {f"p{q}": round(float(np.percentile(latency, q)), 2) for q in (50, 95, 99)} if len(latency) else {}
+        return {
+            "uptime_s": round(uptime, 1),
+            **totals,
+            "queue_depth": self._queue.qsize(),
+            "throughput": {
+                "rows_per_s": round(totals["rows"] / uptime, 1) if uptime else 0.0,
+                f"recent_{recent_s}s_requests_per_s": round(len(recent) / window, 2),
+                f"recent_{recent_s}s_rows_per_s": round(sum(r[2] for r in recent) / window, 1),
+            },
+            "latency_ms": {**pct, "max": round(float(latency.max()), 2) if len(latency) else None},
+            "batch": {
+                "mean_rows": round(float(np.mean([b[0] for b in batches])), 1) if batches else None,
+                "mean_requests": round(float(np.mean([b[1] for b in batches])), 2) if batches else None,
+                "mean_score_ms": round(float(np.mean([b[2] for b in batches])) * 1000, 2) if batches else None,
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait * 1000,
+            },
+        }
+
+
+class ScoreServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # 기본 listen 백로그(5)로는 동시 클라이언트가 몰릴 때 연결이 리셋됨
+    request_queue_size = 128
+
+
+class ScoreHandler(BaseHTTPRequestHandler):
+    batcher = None  # make_server 가 채움
+
+    def _send(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send(200, {"status": "ok"})
+        elif self.path == "/metrics":
+            self._send(200, self.batcher.metrics())
+        else:
+            self._send(404, {"error": f"없는 경로: {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/score":
+            self._send(404, {"error": f"없는 경로: {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            df = parse_zones(json.loads(self.rfile.read(length) or b"null"))
+        except (ValueError, UnicodeDecodeError) as e:
+            self._send(400, {"error": str(e)})
+            return
+        try:
+            results = self.batcher.score(df)
+        except Exception as e:
+            self._send(500, {"error": f"{type(e).__name__}: {e}"})
+            return
+        self._send(200, {"results": results})
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+def make_server(host=DEFAULT_HOST, port=DEFAULT_PORT, max_batch=DEFAULT_MAX_BATCH,
+                max_wait_ms=DEFAULT_MAX_WAIT_MS, bundle=None):
+    """모델 묶음을 읽어 두고(한 행 예열 추론까지) 바인딩된 서버 반환 — serve_forever 는 호출 쪽에서"""
+    bundle = bundle or batch.load_scoring_models()
+    batch.score_zones(pd.DataFrame([{}]), bundle)
+    handler = type("BoundScoreHandler", (ScoreHandler,), {"batcher": MicroBatcher(bundle, max_batch, max_wait_ms)})
+    return ScoreServer((host, port), handler)
@@ -0,0 +1,58 @@
+"""
+유사 도로환경 학교 — CV 지표 코사인 유사도 top-k 이웃 표
+
+행 벡터를 L2 정규화하면 유클리드 거리 d 와 코사인 유사도가 cos = 1 - d²/2 로
+단조 대응하므로, BallTree 로 학교마다 k 개 이웃만 찾는다 (n log n, n×n 행렬 없음).
+표는 데이터 버전(점수 아티팩트)당 한 번 만들고, 화면에서는 dict 조회만 한다.
+"""
+
+import numpy as np
+from sklearn.neighbors import BallTree
+
+from schoolzone.config import FACILITY_COLS
+
+CV_FEATURES = ["CV_도로폭확률", "CV_분리장치확률", "CV_도로상대폭", "CV_보행공간비율", "CV_주정차밀도"]
+
+DEFAULT_K = 5
+
+
+def _unit_rows(X):
+    norm = np.linalg.norm(X, axis=1, keepdims=True)
+    return np.divide(X, norm, out=np.zeros_like(X), where=norm > 0)
+
+
+def build_neighbor_table(df, features=CV_FEATURES, k=DEFAULT_K, with_facilities=False):
+    """
+    {시설물명: (이웃 행 index 라벨 배열, 코사인 유사도 배열)} — 유사도 내림차순, 자기 자신 제외
+
+    features 가 모두 있는 행만 대상. with_facilities=True 면 시설 수(열별 최대값으로
+    0~1 스케일)를 특성에 덧붙인다. 같은 이름의 행은 서로 이웃으로 치지 않는다.
+    """
+    cols = list(features) + (FACILITY_COLS if with_facilities else [])
+    valid = df.dropna(subset=list(features))
+    if len(valid) < 2:
+        return {}
+    X = valid.reindex(columns=cols).fillna(0).to_numpy(dtype=float)
+    if with_facilities:
+        fac = X[:, len(features):]
+        scale = fac.max(axis=0)
+        X[:, len(features):] = np.divide(fac, scale, out=np.zeros_like(fac), where=scale > 0)
+    U = _unit_rows(X)
+
+    names = valid["시설물명"].to_numpy()
+    labels = valid.index.to_numpy()
+    dup = int(valid["시설물명"].value_counts().max())
+    n_query = min(len(valid), k + dup)
+    dist, idx = BallTree(U).query(U, k=n_query)
+    sims = 1.0 - dist ** 2 / 2.0
+
+    table = {}
+    for row, name in enumerate(names):
+        if name in table:
+            continue
+        cand = idx[row][names[idx[row]] != name]
+        sim = sims[row][names[idx[row]] != name]
+        # 동점(같은 벡터)은 원래 행 순서대로
+        order = np.lexsort((cand, -np.round(sim, 12)))[:k]
+        table[name] = (labels[cand[order]], sim[order])
+    return table
@@ -0,0 +1,133 @@
+"""
+시설물 포인트 레이어 공간 인덱스 (haversine BallTree)
+
+시설 컬럼별 원본 포인트 CSV(도시 매니페스트 recount_layers)로 BallTree 를 한 번 만들어
+두고, 임의 반경(m) 안의 시설 수를 모든 학교에 대해 레이어당 한 번의 벡터화 쿼리로 센다.
+"""
+
+import numpy as np
+import pandas as pd
+
+from schoolzone.config import FACILITY_COLS
+from schoolzone.store import read_table
+
+EARTH_RADIUS_M = 6_371_008.8
+
+RADIUS_RANGE_M = (100, 1000)
+# 원본 집계값(스쿨존_팀통합_최종.csv)과 가장 가까운 반경
+DEFAULT_RADIUS_M = 300
+
+
+def to_radians(lat, lon):
+    return np.radians(np.column_stack([np.asarray(lat, dtype=float), np.asarray(lon, dtype=float)]))
+
+
+def build_tree(lat, lon):
+    from sklearn.neighbors import BallTree
+
+    return BallTree(to_radians(lat, lon), metric="haversine")
+
+
+def build_facility_index(layers):
+    """시설 컬럼 → BallTree ({시설 컬럼: 포인트 파일}, 도시 매니페스트 recount_layers). 좌표 없는 행은 제외"""
+    index = {}
+    for col, name in layers.items():
+        pts = read_table(name, columns=["위도", "경도"]).dropna()
+        index[col] = build_tree(pts["위도"].values, pts["경도"].values)
+    return index
+
+
+def count_within(index, lat, lon, radius_m):
+    """각 (lat, lon) 반경 radius_m 안의 레이어별 시설 수 — FACILITY_COLS 순서 DataFrame"""
+    X = to_radians(lat, lon)
+    r = float(radius_m) / EARTH_RADIUS_M
+    counts = {
+        col: index[col].query_radius(X, r, count_only=True) if col in index else np.zeros(len(X), dtype=int)
+        for col in FACILITY_COLS
+    }
+    return pd.DataFrame(counts)
+
+
+# ── 지도 뷰포트 스트리밍 ──
+TILE_SIZE_PX = 256
+CLUSTER_CELL_PX = 40
+
+
+def parse_bounds(bounds):
+    """st_folium bounds dict → (south, west, north, east). 값이 비어 있으면 None"""
+    try:
+        sw, ne = bounds["_southWest"], bounds["_northEast"]
+        south, west, north, east = float(sw["lat"]), float(sw["lng"]), float(ne["lat"]), float(ne["lng"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not (south < north and west < east):
+        return None
+    return south, west, north, east
+
+
+def approx_bounds(center, zoom, width_px=1000, height_px=550):
+    """초기 렌더처럼 브라우저 bounds 가 아직 없을 때 중심·줌으로 추정한 뷰포트"""
+    lat, lon = center
+    deg_per_px = 360.0 / (TILE_SIZE_PX * 2 ** zoom)
+    half_w = width_px / 2 * deg_per_px
+    half_h = height_px / 2 * deg_per_px * float(np.cos(np.radians(lat)))
+    return lat - half_h, lon - half_w, lat + half_h, lon + half_w
+
+
+def _tile_xy(lat, lon, zoom):
+    n = 2 ** zoom
+    x = (lon + 180.0) / 360.0 * n
+    lat_r = np.radians(np.clip(lat, -85.0511, 85.0511))
+    y = (1.0 - np.log(np.tan(lat_r) + 1.0 / np.cos(lat_r)) / np.pi) / 2.0 * n
+    return x, y
+
+
+def _tile_lat(y, zoom):
+    return float(np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * y / 2 ** zoom)))))
+
+
+def tile_bounds(bounds, zoom):
+    """뷰포트를 감싸는 웹 메르카토르 타일 경계로 확장 — 같은 타일 안의 이동은 같은 키"""
+    zoom = int(zoom)
+    south, west, north, east = bounds
+    x0, y0 = _tile_xy(north, west, zoom)
+    x1, y1 = _tile_xy(south, east, zoom)
+    x0, y0, x1, y1 = np.floor(x0), np.floor(y0), np.ceil(x1), np.ceil(y1)
+    n = 2 ** zoom
+    return (
+        round(_tile_lat(y1, zoom), 6), round(float(x0 / n * 360.0 - 180.0), 6),
+        round(_tile_lat(y0, zoom), 6), round(float(x1 / n * 360.0 - 180.0), 6),
+    )
+
+
+def viewport_points(pts, bounds, zoom, budget, name_col=None):
+    """
+    bounds 안의 포인트만 골라 반환. budget 개를 넘으면 서버에서 격자 클러스터링
+
+    격자 한 칸은 현재 줌에서 CLUSTER_CELL_PX 픽셀부터 시작해, 클러스터 수가
+    budget 이하가 될 때까지 두 배씩 키운다. 반환 컬럼: 위도, 경도, n, name
+    """
+    south, west, north, east = bounds
+    lat = pts["위도"].to_numpy(dtype=float)
+    lon = pts["경도"].to_numpy(dtype=float)
+    inside = (lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)
+    lat, lon = lat[inside], lon[inside]
+    names = pts[name_col].to_numpy()[inside] if name_col else np.full(len(lat), "", dtype=object)
+
+    if len(lat) <= budget:
+        return pd.DataFrame({"위도": lat, "경도": lon, "n": np.ones(len(lat), dtype=int), "name": names})
+
+    cell = CLUSTER_CELL_PX * 360.0 / (TILE_SIZE_PX * 2 ** int(zoom))
+    lat_scale = np.cos(np.radians((south + north) / 2))
+    while True:
+        gx = np.floor(lon / cell).astype(np.int64)
+        gy = np.floor(lat / (cell * lat_scale)).astype(np.int64)
+        grid = pd.DataFrame({"gx": gx, "gy": gy, "위도": lat, "경도": lon})
+        clusters = grid.groupby(["gx", "gy"], sort=False).agg(
+            위도=("위도", "mean"), 경도=("경도", "mean"), n=("위도", "size"),
+        )
+        if len(clusters) <= budget:
+            break
+        cell *= 2
+    clusters["name"] = ""
+    return clusters.reset_index(drop=True)
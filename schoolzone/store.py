@@ -0,0 +1,165 @@
+"""
+CSV → Parquet 컬럼 캐시
+
+data/*.csv 를 처음 읽을 때 한 번만 파싱해 타입이 고정된 Parquet 으로
+data/.cache/ 에 저장하고, 이후에는 원본 파일 내용 해시로 캐시를 찾아 읽는다.
+원본의 (크기, mtime) 이 그대로면 해시도 다시 계산하지 않는다.
+
+    python -m schoolzone.store      # 배포 전 data/*.csv 전체 사전 변환
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+CACHE_DIR = DATA_DIR / ".cache"
+MANIFEST_PATH = CACHE_DIR / "manifest.json"
+
+# 캐시 파일 포맷이 바뀌면 올려서 기존 캐시를 모두 무효화
+FORMAT_VERSION = 1
+
+_manifest = None
+# 예열 스레드들이 동시에 해시를 기록해도 manifest 직렬화 중 dict 가 바뀌지 않도록
+_manifest_lock = threading.Lock()
+
+
+def _load_manifest():
+    global _manifest
+    if _manifest is None:
+        try:
+            with open(MANIFEST_PATH, encoding="utf-8") as f:
+                _manifest = json.load(f)
+        except (OSError, ValueError):
+            _manifest = {}
+    return _manifest
+
+
+def atomic_write(path, write):
+    """임시 파일에 쓴 뒤 rename — 여러 워커가 동시에 써도 깨진 파일이 보이지 않음"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def drop_stale(path, prefix, key_pattern=r"[0-9a-f]+", keep=None):
+    """
+    path 와 같은 폴더의 이전 버전 '{prefix}.<키>{확장자}' 삭제 (path 자신과 keep(이름) 이 참인 파일 제외)
+
+    키가 key_pattern 에 완전히 일치하는 이름만 지우므로 접두어가 겹치는 다른 계열
+    (예: prefix '성남시' 와 '성남시.r300.<키>.npz') 은 건드리지 않는다.
+    """
+    path = Path(path)
+    pattern = re.compile(rf"{re.escape(prefix)}\.(?:{key_pattern}){re.escape(path.suffix)}")
+    for old in path.parent.glob(f"*{path.suffix}"):
+        if old == path or not pattern.fullmatch(old.name) or (keep and keep(old.name)):
+            continue
+        try:
+            old.unlink()
+        except OSError:
+            pass
+
+
+def save_versioned(path, write, prefix):
+    """버전 키가 붙은 캐시 파일 쓰기 + 같은 접두어의 이전 버전 정리 (쓸 수 없는 환경이면 조용히 넘어감)"""
+    try:
+        atomic_write(Path(path), write)
+        drop_stale(path, prefix)
+    except OSError:
+        pass
+
+
+def file_digest(path):
+    """원본 파일 내용 해시 (sha1 앞 16자리)"""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()[:16]
+
+
+def source_digest(path):
+    """(크기, mtime) 이 manifest 와 같으면 저장된 해시 재사용, 아니면 다시 계산"""
+    path = Path(path)
+    st = path.stat()
+    with _manifest_lock:
+        manifest = _load_manifest()
+        entry = manifest.get(path.name)
+    if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+        return entry["sha1"]
+
+    digest = file_digest(path)
+    with _manifest_lock:
+        manifest[path.name] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha1": digest}
+        text = json.dumps(manifest, ensure_ascii=False, indent=1)
+        try:
+            atomic_write(MANIFEST_PATH, lambda tmp: Path(tmp).write_text(text, encoding="utf-8"))
+        except OSError:
+            pass
+    return digest
+
+
+def _cache_name(path, read_kwargs):
+    """'<stem>.<원본 해시>.<읽기 옵션 해시>.parquet' — 원본 해시를 이름에 따로 두어 옵션별 캐시는 공존"""
+    opts = json.dumps(read_kwargs, sort_keys=True, ensure_ascii=False, default=str)
+    opts_key = hashlib.sha1(f"{FORMAT_VERSION}|{opts}".encode("utf-8")).hexdigest()[:16]
+    return f"{path.stem}.{source_digest(path)}.{opts_key}.parquet"
+
+
+def read_table(name, columns=None, encoding="utf-8-sig", **read_kwargs):
+    """
+    data/ 아래 CSV 를 Parquet 캐시 경유로 읽기
+
+    columns 를 주면 해당 컬럼만 디스크에서 읽는다 (column projection).
+    캐시를 쓸 수 없는 환경(읽기 전용 FS, pyarrow 미설치)에서는 CSV 를 직접 파싱한다.
+    """
+    path = DATA_DIR / name
+    columns = list(columns) if columns is not None else None
+    read_kwargs = dict(encoding=encoding, **read_kwargs)
+
+    try:
+        cache_path = CACHE_DIR / _cache_name(path, read_kwargs)
+        if cache_path.exists():
+            return pd.read_parquet(cache_path, columns=columns)
+
+        df = pd.read_csv(path, **read_kwargs)
+        atomic_write(cache_path, df.to_parquet)
+        # 원본 해시가 바뀐 캐시만 삭제 (같은 원본의 다른 읽기 옵션 캐시는 유지, 옛 단일 키 이름도 정리)
+        digest = source_digest(path)
+        drop_stale(
+            cache_path, path.stem, key_pattern=r"[0-9a-f]{16}(?:\.[0-9a-f]{16})?",
+            keep=lambda name: name.startswith(f"{path.stem}.{digest}."),
+        )
+    except (OSError, ImportError, ValueError, TypeError):
+        return pd.read_csv(path, usecols=columns, **read_kwargs)
+
+    return df[columns].copy() if columns is not None else df
+
+
+def warm_all():
+    """data/*.csv 전체를 캐시로 변환하고 (파일명, 행수) 목록 반환"""
+    done = []
+    for path in sorted(DATA_DIR.glob("*.csv")):
+        try:
+            done.append((path.name, len(read_table(path.name))))
+        except (UnicodeDecodeError, pd.errors.ParserError):
+            # 앱에서 쓰지 않는 비 UTF-8 원본 (예: 5_gwangmyung_final_dataset_renew.csv)
+            continue
+    return done
+
+
+if __name__ == "__main__":
+    for _name, _rows in warm_all():
+        print(f"{_name}: {_rows} rows")
@@ -0,0 +1,145 @@
+"""
+시작 시 데이터 예열 — 로더 전체를 스레드 풀에서 동시에 실행
+
+로더 대부분이 파일 읽기(pyarrow)·pandas·sklearn 작업이라 GIL 을 놓는 구간이 길어서
+스레드로 겹쳐 돌리면 직렬 합계보다 빨리 끝난다. 앱은 프로세스당 한 번 st.cache_* 로더를
+백그라운드로 예열해 두고(첫 실행을 막지 않음), 세션이 같은 캐시 키를 동시에 부르면
+Streamlit 의 키별 잠금으로 한 번만 계산된 값을 같이 받는다.
+
+    python -m schoolzone.warmup          # 서버 시작 전 디스크 캐시(Parquet·다발지·모델·빌드) 예열
+    python -m schoolzone.warmup -j 4     # 워커 수 지정
+
+끄기: 환경변수 SCHOOLZONE_WARMUP=0
+앱 시작 예열 도시: 기본은 첫 도시(기본 선택)만, SCHOOLZONE_WARM_CITIES=성남시,광명시 로 지정
+(나머지 도시는 처음 선택될 때 로드 — 도시 수가 늘어도 시작 시간·상주 메모리가 늘지 않게)
+"""
+
+import argparse
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+
+import pandas as pd
+
+ENV_VAR = "SCHOOLZONE_WARMUP"
+CITIES_ENV_VAR = "SCHOOLZONE_WARM_CITIES"
+DEFAULT_WORKERS = min(8, os.cpu_count() or 4)
+THREAD_PREFIX = "warmup"
+
+logger = logging.getLogger("schoolzone.warmup")
+
+
+def enabled():
+    return os.environ.get(ENV_VAR, "1").strip().lower() not in ("0", "false", "off", "no")
+
+
+def warm_cities(registry):
+    """앱 시작 때 예열할 도시 목록 — SCHOOLZONE_WARM_CITIES (쉼표 구분, 없는 이름은 무시), 없으면 첫 도시"""
+    names = [n.strip() for n in os.environ.get(CITIES_ENV_VAR, "").split(",") if n.strip()]
+    if not names:
+        return list(registry)[:1]
+    unknown = [n for n in names if n not in registry]
+    if unknown:
+        logger.warning("%s 에 없는 도시 무시: %s", CITIES_ENV_VAR, ", ".join(unknown))
+    return [n for n in names if n in registry]
+
+
+def in_worker():
+    """현재 스레드가 예열 스레드인지 (로그 필터용)"""
+    return threading.current_thread().name.startswith(THREAD_PREFIX)
+
+
+def _timed(name, fn, t0):
+    start = time.perf_counter()
+    result = {"name": name, "start": round(start - t0, 4), "seconds": None, "ok": True, "error": None}
+    try:
+        fn()
+    except Exception as e:  # 예열 실패는 해당 로더를 처음 부르는 쪽에서 다시 드러남
+        result.update(ok=False, error=f"{type(e).__name__}: {e}")
+    result["seconds"] = round(time.perf_counter() - start, 4)
+    return result
+
+
+def run(tasks, max_workers=None, state=None):
+    """(이름, 호출) 목록을 스레드 풀로 실행 → 작업별 {name, start, seconds, ok, error} (작업 순서)"""
+    state = state if state is not None else {"results": []}
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers or DEFAULT_WORKERS, thread_name_prefix=THREAD_PREFIX) as pool:
+        futures = {pool.submit(_timed, name, fn, t0): i for i, (name, fn) in enumerate(tasks)}
+        for future in as_completed(futures):
+            r = future.result()
+            state["results"].append({**r, "order": futures[future]})
+            if r["ok"]:
+                logger.info("예열 %s: %.2fs", r["name"], r["seconds"])
+            else:
+                logger.warning("예열 실패 %s: %s", r["name"], r["error"])
+    state["results"].sort(key=lambda r: r["order"])
+    state["total_s"] = round(time.perf_counter() - t0, 4)
+    logger.info(
+        "예열 완료: %d개 %.2fs (직렬 합계 %.2fs)",
+        len(tasks), state["total_s"], sum(r["seconds"] for r in state["results"]),
+    )
+    return state["results"]
+
+
+def start(tasks, max_workers=None):
+    """백그라운드 스레드에서 run — 진행 상태 dict {results, total_s, done} 즉시 반환"""
+    state = {"results": [], "total_s": None, "done": threading.Event()}
+
+    def target():
+        try:
+            run(tasks, max_workers, state)
+        finally:
+            state["done"].set()
+
+    threading.Thread(target=target, name=THREAD_PREFIX, daemon=True).start()
+    return state
+
+
+def _read_csv(name):
+    from schoolzone.store import read_table
+
+    try:
+        read_table(name)
+    except (UnicodeDecodeError, pd.errors.ParserError):
+        pass  # 앱에서 쓰지 않는 비 UTF-8 원본 (store.warm_all 과 같은 처리)
+
+
+def disk_tasks():
+    """서버 없이 채울 수 있는 디스크 캐시 — data/*.csv Parquet, 다발지 기하, 모델, 빌드 아티팩트"""
+    from schoolzone import build, cities, hotspots, models
+    from schoolzone.store import DATA_DIR, read_table
+
+    tasks = [(path.name, partial(_read_csv, path.name)) for path in sorted(DATA_DIR.glob("*.csv"))]
+    for city, cfg in cities.load_registry().items():
+        if cfg.get("hotspots"):
+            tasks.append((f"{city} 사고다발지 기하", partial(hotspots.load_store, cfg["hotspots"])))
+
+    def models_and_build():
+        # 빌드가 두 모델을 다시 쓰므로 한 작업 안에서 순서대로 (동시에 돌리면 같은 모델을 두 번 학습)
+        models.load_or_train(models.train_safety_model, read_table("스쿨존_팀통합_최종.csv"))
+        models.load_or_train(models.train_integrated_model, read_table("2_DatasetFor2ndData.csv"))
+        build.load_or_build()
+
+    # 가장 긴 작업을 먼저 넣어 나머지 읽기가 그 뒤에 겹치도록
+    return [("모델 · 빌드 아티팩트", models_and_build)] + tasks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m schoolzone.warmup", description="디스크 캐시 병렬 예열")
+    parser.add_argument("-j", "--workers", type=int, default=DEFAULT_WORKERS, help=f"워커 수 (기본 {DEFAULT_WORKERS})")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    results = run(disk_tasks(), args.workers)
+    for r in sorted(results, key=lambda r: -r["seconds"]):
+        status = "" if r["ok"] else f"  ✗ {r['error']}"
+        print(f"{r['seconds']:7.2f}s  {r['name']}{status}")
+    print(f"합계 {sum(r['seconds'] for r in results):.1f}s → 경과 {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""점수 서버 마이크로배치 — 함께 묶인 요청이 서로의 점수를 바꾸지 않는지"""
+
+import pandas as pd
+import pytest
+
+from schoolzone import batch, serve
+
+# 어린이 비율만 표기명으로, CV 피처도 대시보드 표기명으로 보내는 요청
+ALIASED = {"신호등": 2, "횡단보도": 3, "발생건수": 4, "어린이 비율(%)": 22.5,
+           "CV_도로폭확률": 0.7, "CV_분리장치확률": 0.2, "CV_도로상대폭": 1.1,
+           "CV_보행공간비율": 0.3, "CV_주정차밀도": 0.05}
+# 어린이 비율만 표기명인 요청 — 섞인 배치에서도 그 값을 써야 함 (child_fill 로 대체되면 안 됨)
+CHILD_ONLY = {"신호등": 2, "횡단보도": 3, "발생건수": 4, "어린이 비율(%)": 22.5}
+# 원본 이름을 쓰는 다른 요청 (concat 하면 어린이비율·p_wide 컬럼이 생김)
+CANONICAL = {"신호등": 1, "발생건수": 1, "어린이비율": 5.0, "p_wide": 0.1, "p_barrier_yes": 0.9,
+             "road_width_relative": 0.8, "sidewalk_ratio": 0.6, "parked_density": 0.2}
+
+
+@pytest.fixture(scope="module")
+def bundle():
+    return batch.load_scoring_models()
+
+
+def _same(got, expected):
+    """등급은 그대로, 확률·점수는 배치 크기에 따른 BLAS 반올림 차이만 허용"""
+    assert len(got) == len(expected)
+    for g, e in zip(got, expected):
+        assert (g["등급"], g["안전등급"]) == (e["등급"], e["안전등급"])
+        for col in ("structure_risk", "사고확률", "활성_안전점수"):
+            assert g[col] == pytest.approx(e[col], rel=1e-9)
+
+
+def _score(frames, bundle):
+    frame = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+    return serve._records(batch.score_zones(frame, bundle))
+
+
+def test_parse_zones_fixed_schema():
+    for payload in (ALIASED, CANONICAL, {"zones": [{}]}):
+        df = serve.parse_zones(payload)
+        assert list(df.columns) == batch.INPUT_COLUMNS
+        assert (df.dtypes == float).all()
+    assert serve.parse_zones(ALIASED)["어린이비율"].iloc[0] == 22.5
+
+
+@pytest.mark.parametrize("payload", [ALIASED, CHILD_ONLY])
+def test_cobatched_matches_alone(bundle, payload):
+    aliased, canonical = serve.parse_zones(payload), serve.parse_zones({"zones": [CANONICAL, {}]})
+    alone = _score([aliased], bundle) + _score([canonical], bundle)
+    _same(_score([aliased, canonical], bundle), alone)
+    _same(_score([canonical, aliased], bundle), _score([canonical], bundle) + _score([aliased], bundle))
+
+
+def test_micro_batcher_cobatched_matches_alone(bundle):
+    aliased, canonical = serve.parse_zones(ALIASED), serve.parse_zones(CANONICAL)
+    alone = serve.MicroBatcher(bundle, max_wait_ms=0)
+    expected = [alone.score(aliased), alone.score(canonical)]
+
+    batcher = serve.MicroBatcher(bundle, max_wait_ms=500)
+    futures = [batcher.submit(aliased), batcher.submit(canonical)]
+    for future, records in zip(futures, expected):
+        _same(future.result(30), records)
+    assert batcher.metrics()["batch"]["mean_requests"] == 2